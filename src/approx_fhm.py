@@ -0,0 +1,367 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+from bisect import bisect_right
+from itertools import accumulate
+from math import ceil, floor, sqrt
+from statistics import NormalDist
+from typing import Dict, List, Sequence, Tuple, Union
+from fhm import FHM
+from dataset import CACHE_SUFFIX, DBWriter, load
+from two_phase_utils import VerticalDB, iter_tids
+from instrument import Profiler, dump_profile, log_experiment
+from sinks import ApproxTextSink, CallbackSink, TextSink
+
+# default number of transactions in the sample
+DEFAULT_SAMPLE_SIZE = 10_000
+
+
+class SampledFHM(FHM):
+    """
+    FHM over a random sample of the transactions of a dataset, which estimates its high
+    utility itemsets in a fraction of the time of an exact run on large datasets.
+
+    The transactions are split into strata of consecutive tids, and each stratum contributes
+    a simple random sample in proportion to its size. The sample is mined at the minimum
+    utility scaled by the fraction of the transactions sampled, and the utility of each
+    itemset found is estimated by the stratified estimator, the utility in the sample of each
+    stratum scaled to the size of the stratum, with a normal confidence interval. Itemsets
+    whose utility is just below the minimum utility in the sample can be kept by lowering the
+    scaled minimum utility by a slack.
+
+    With verify, one more pass over the dataset computes the exact utility of the itemsets
+    found, and only the ones that reach the minimum utility are written, so that the result
+    file holds no false positives (but may miss itemsets that were not found in the sample).
+
+    Attributes:
+        sample_size: number of transactions to sample
+        strata: number of strata the transactions are split into
+        confidence: confidence level of the intervals
+        slack: fraction by which the scaled minimum utility is lowered
+        verify: whether the exact utility of the itemsets found is computed
+        seed: seed of the random sample
+        n_transacs: number of transactions in the dataset
+        sample_count: number of transactions sampled
+        sample_minutil: minimum utility the sample is mined with
+        estimates: (itemset, estimated utility, lower bound, upper bound) of each itemset
+            found in the sample
+        exact_utils: exact utility of each itemset found in the sample if verified, else None
+    """
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        minutil: int,
+        sample_size: int = DEFAULT_SAMPLE_SIZE,
+        strata: int = 1,
+        confidence: float = 0.95,
+        slack: float = 0.0,
+        verify: bool = False,
+        seed: int = 0,
+        workers: int = 1,
+        profiler: Union[Profiler, None] = None,
+    ) -> None:
+        """
+        Constructor for SampledFHM.
+
+        Parameters:
+            input_path: relative path to the data file
+            output_path: relative path to the output file
+            minutil: minimum utility
+            sample_size: number of transactions to sample
+            strata: number of strata of consecutive transactions to sample from
+            confidence: confidence level of the intervals, between 0 and 1
+            slack: fraction by which the minimum utility of the sample is lowered,
+                between 0 and 1
+            verify: compute the exact utility of the itemsets found and only write the ones
+                that reach minutil
+            seed: seed of the random sample
+            workers: number of processes that search the sample
+            profiler: profiler of the phases of the algorithm, or None for one
+                without counters per search depth
+        """
+        if sample_size < 1 or strata < 1:
+            raise ValueError("sample_size and strata must be positive")
+        if not 0 < confidence < 1 or not 0 <= slack < 1:
+            raise ValueError("confidence must be in (0, 1) and slack in [0, 1)")
+        sink = TextSink(output_path) if verify else ApproxTextSink(output_path)
+        super().__init__(
+            input_path, output_path, minutil, workers=workers, sink=sink, profiler=profiler
+        )
+        self.sample_size = sample_size
+        self.strata = strata
+        self.confidence = confidence
+        self.slack = slack
+        self.verify = verify
+        self.seed = seed
+        self.n_transacs = 0
+        self.sample_count = 0
+        self.sample_minutil = 0
+        self.estimates = []
+        self.exact_utils = None
+
+    def fhm(self) -> None:
+        """
+        Run FHM over a sample of the dataset and estimate the utility of the itemsets found.
+        """
+        start_time = time.time()  # start timing algorithm
+        self.profiler.phase("sample")
+        sample, stratum_sizes, stratum_sample_sizes = self.sample()
+
+        # FHM reads the sample from a binary dataset of its own
+        fd, sample_path = tempfile.mkstemp(suffix=CACHE_SUFFIX)
+        os.close(fd)
+        writer = DBWriter(sample_path)
+        for items, transac_util, utils in sample:
+            writer.add_transaction(items, transac_util, utils)
+        writer.close()
+
+        # mine the sample at the minimum utility scaled to its size, collecting the itemsets
+        itemsets = []
+        self.sample_count = len(sample)
+        input_path, minutil, sink = self.input_path, self.minutil, self.sink
+        total_trans_util = self.total_trans_util
+        self.sample_minutil = max(
+            1, floor((1 - self.slack) * minutil * len(sample) / self.n_transacs)
+        )
+        self.input_path = sample_path
+        self.minutil = self.sample_minutil
+        self.sink = CallbackSink(lambda itemset, util: itemsets.append(itemset))
+        try:
+            super().fhm()
+        finally:
+            self.input_path, self.minutil, self.sink = input_path, minutil, sink
+            self.total_trans_util = total_trans_util
+            os.remove(sample_path)
+
+        self.profiler.phase("estimate")
+        self.estimates = self.estimate(sample, itemsets, stratum_sizes, stratum_sample_sizes)
+        if self.verify:
+            self.profiler.phase("verify")
+            self.exact_utils = self.exact_utilities(itemsets)
+
+        self.profiler.phase("output")
+        self.hui_count = 0
+        self.sink.open()
+        for itemset, util, low, high in self.estimates:
+            if self.exact_utils is None:
+                self.sink.write(itemset, util, low, high)
+                self.hui_count += 1
+            elif self.exact_utils[itemset] >= self.minutil:
+                self.sink.write(itemset, self.exact_utils[itemset])
+                self.hui_count += 1
+        self.sink.close()
+        self.profiler.stop()
+
+        self.runtime = (time.time() - start_time) * 1_000  # stop timing algorithm
+
+    def sample(self) -> Tuple[List[Tuple[List[int], int, List[int]]], List[int], List[int]]:
+        """
+        Draw a stratified random sample of the transactions. The binary layout of the dataset
+        gives the number of transactions and each transaction by its tid, so only the sampled
+        transactions are read.
+
+        Returns:
+            the sampled transactions (items, transaction utility, utilities) in order of tid,
+            the number of transactions of each stratum and the number sampled from each
+        """
+        rng = random.Random(self.seed)
+        with load(self.input_path) as db:
+            n_transacs = self.n_transacs = len(db)
+            self.total_trans_util = sum(db.transac_utils)
+            n_strata = max(1, min(self.strata, n_transacs))
+            bounds = [n_transacs * h // n_strata for h in range(n_strata + 1)]
+            stratum_sizes = [bounds[h + 1] - bounds[h] for h in range(n_strata)]
+
+            # allocate the sample to the strata in proportion to their sizes,
+            # with at least one transaction per stratum
+            stratum_sample_sizes = [
+                min(size, max(1, round(self.sample_size * size / n_transacs)))
+                for size in stratum_sizes
+            ]
+            sample = []
+            for h in range(n_strata):
+                tids = rng.sample(range(bounds[h], bounds[h + 1]), stratum_sample_sizes[h])
+                tids.sort()
+                sample.extend([db.transaction(tid) for tid in tids])
+        return sample, stratum_sizes, stratum_sample_sizes
+
+    def estimate(
+        self,
+        sample: List[Tuple[List[int], int, List[int]]],
+        itemsets: List[Tuple[int, ...]],
+        stratum_sizes: List[int],
+        stratum_sample_sizes: List[int],
+    ) -> List[Tuple[Tuple[int, ...], int, int, int]]:
+        """
+        Estimate the utility of itemsets in the dataset from their utility in the sample.
+
+        The estimate is the sum over the strata of the utility of the itemset in the
+        transactions sampled from a stratum, times the size of the stratum over the number
+        sampled from it. Its variance is estimated from the variance of the utility of the
+        itemset in the sampled transactions of each stratum, with the finite population
+        correction, so that the interval of a stratum sampled entirely has no width.
+
+        Parameters:
+            sample: sampled transactions in order of tid, stratum by stratum
+            itemsets: itemsets to estimate
+            stratum_sizes: number of transactions of each stratum
+            stratum_sample_sizes: number of transactions sampled from each stratum
+
+        Returns:
+            (itemset, estimated utility, lower bound, upper bound) of each itemset
+        """
+        vertical_db = VerticalDB(sample)
+        # index in the sample of the first transaction of each stratum
+        starts = list(accumulate(stratum_sample_sizes))[:-1]
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+
+        estimates = []
+        for itemset in itemsets:
+            # sum and sum of squares of the utility of the itemset in each stratum
+            sums = [0] * len(stratum_sizes)
+            squares = [0] * len(stratum_sizes)
+            tid_utils = [vertical_db.item_utils[item] for item in itemset]
+            for tid in iter_tids(vertical_db.tids(itemset)):
+                util = sum([utils[tid] for utils in tid_utils])
+                h = bisect_right(starts, tid)
+                sums[h] += util
+                squares[h] += util * util
+
+            util = 0.0
+            variance = 0.0
+            for size, sample_size, total, square in zip(
+                stratum_sizes, stratum_sample_sizes, sums, squares
+            ):
+                util += size * total / sample_size
+                if 1 < sample_size < size:
+                    s2 = (square - total * total / sample_size) / (sample_size - 1)
+                    variance += size * size * (1 - sample_size / size) * s2 / sample_size
+            margin = z * sqrt(variance)
+            estimates.append(
+                (itemset, round(util), max(0, floor(util - margin)), ceil(util + margin))
+            )
+        return estimates
+
+    def exact_utilities(self, itemsets: Sequence[Tuple[int, ...]]) -> Dict[Tuple[int, ...], int]:
+        """
+        Compute the exact utility of itemsets in one pass over the dataset.
+
+        Parameters:
+            itemsets: itemsets to compute the utility of
+
+        Returns:
+            the utility of each itemset
+        """
+        exact_utils = dict.fromkeys(itemsets, 0)
+        # itemsets indexed by their first item, so that a transaction only checks
+        # the itemsets whose first item it contains
+        by_item = {}
+        for itemset in itemsets:
+            by_item.setdefault(itemset[0], []).append(itemset)
+
+        with load(self.input_path) as db:
+            for items, _, utils in db:
+                transac = None
+                for item in items:
+                    if item not in by_item:
+                        continue
+                    if transac is None:
+                        transac = dict(zip(items, utils))
+                    for itemset in by_item[item]:
+                        util = 0
+                        for other in itemset:
+                            other_util = transac.get(other)
+                            if other_util is None:
+                                break
+                            util += other_util
+                        else:
+                            exact_utils[itemset] += util
+        return exact_utils
+
+    def print_stats(self) -> None:
+        """
+        Print statistics for the sampled FHM algorithm.
+        """
+        super().print_stats()
+        print(f"transactions sampled: {self.sample_count} of {self.n_transacs}")
+        print(f"minimum utility of the sample: {self.sample_minutil}")
+        print(f"itemsets estimated: {len(self.estimates)}")
+        if self.exact_utils is not None:
+            print(f"itemsets verified: {self.hui_count} of {len(self.estimates)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Estimate the high utility itemsets of a dataset with FHM over a random"
+        " sample of its transactions."
+    )
+    parser.add_argument("input_path", help="relative path to the data file")
+    parser.add_argument("output_path", help="relative path to the output file")
+    parser.add_argument("minutil", type=int, help="minimum utility")
+    parser.add_argument(
+        "--sample-size",
+        type=int,
+        default=DEFAULT_SAMPLE_SIZE,
+        help="number of transactions to sample",
+    )
+    parser.add_argument(
+        "--strata",
+        type=int,
+        default=1,
+        help="number of strata of consecutive transactions to sample from in proportion",
+    )
+    parser.add_argument(
+        "--confidence", type=float, default=0.95, help="confidence level of the intervals"
+    )
+    parser.add_argument(
+        "--slack",
+        type=float,
+        default=0.0,
+        help="fraction by which the minimum utility of the sample is lowered,"
+        " to keep itemsets just below it",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="compute the exact utility of the itemsets found in one more pass over the"
+        " dataset and only write the ones that reach the minimum utility",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random sample")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="number of processes that search the sample"
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="path to a JSON file to write the time and memory of each phase"
+        " and the counters per search depth to",
+    )
+    parser.add_argument(
+        "--experiment-csv",
+        default=None,
+        help="path to a csv file of experiments to append the statistics of the run to",
+    )
+    args = parser.parse_args()
+    fhm = SampledFHM(
+        args.input_path,
+        args.output_path,
+        args.minutil,
+        sample_size=args.sample_size,
+        strata=args.strata,
+        confidence=args.confidence,
+        slack=args.slack,
+        verify=args.verify,
+        seed=args.seed,
+        workers=args.workers,
+        profiler=Profiler(depth_counters=args.profile is not None),
+    )
+    fhm.run()
+    fhm.print_stats()
+    if args.profile is not None:
+        dump_profile(args.profile, fhm)
+    if args.experiment_csv is not None:
+        log_experiment(args.experiment_csv, fhm)
@@ -0,0 +1,386 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import multiprocessing
+from typing import Dict, List, Tuple, Union
+from dataset import load
+from fhm import FHM
+from two_phase import TwoPhase
+from efim import EFIM
+from generate import Generator
+
+# engines that can be benchmarked: class and the method that runs the algorithm
+ENGINES = {
+    "fhm": (FHM, "fhm"),
+    "two_phase": (TwoPhase, "two_phase"),
+    "efim": (EFIM, "efim"),
+}
+
+# datasets and minimum utilities benchmarked when none are given; a minimum utility ending
+# with % is a percentage of the total transaction utility of the dataset
+DEFAULT_SUITE = [
+    "datasets/DB_Utility.txt:30",
+    "datasets/foodmart.txt:7206,12011",
+    "synthetic-20000:1%,2%",
+]
+
+# prefix of the name of a synthetic dataset, followed by its number of transactions
+SYNTHETIC_PREFIX = "synthetic-"
+
+
+def synthetic_dataset(n_transacs: int, seed: int = 0) -> str:
+    """
+    Get the path to a synthetic dataset in the SPMF format, generating it the first time
+    with the default parameters of generate.Generator. The same number of transactions
+    and seed always give the same dataset.
+
+    Parameters:
+        n_transacs: number of transactions
+        seed: seed of the random number generator
+
+    Returns:
+        path to the dataset in the temporary directory
+    """
+    directory = os.path.join(tempfile.gettempdir(), "huim-benchmark")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"synthetic_{n_transacs}_{seed}.txt")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        Generator(n_transacs, seed=seed).write(tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def parse_suite(specs: List[str], seed: int) -> List[Tuple[str, str, List[Tuple[str, int]]]]:
+    """
+    Resolve the datasets and minimum utilities to benchmark. Every spec is checked before
+    any dataset is generated or read, and a ValueError describes the first malformed one.
+
+    Parameters:
+        specs: "dataset:minutil,minutil,..." where dataset is a path to a dataset or
+            synthetic-N for a synthetic dataset of N transactions, and a minutil ending with %
+            is a percentage of the total transaction utility of the dataset
+        seed: seed of the synthetic datasets
+
+    Returns:
+        for each dataset, its name, its path and its (minutil as given, minutil) pairs
+    """
+    # check every spec before generating or reading any dataset
+    for spec in specs:
+        if ":" not in spec:
+            raise ValueError(f"{spec} is not of the form dataset:minutil,minutil,...")
+        name, minutil_specs = spec.rsplit(":", 1)
+        if name.startswith(SYNTHETIC_PREFIX):
+            if not name[len(SYNTHETIC_PREFIX) :].isdigit():
+                raise ValueError(f"{name} is not {SYNTHETIC_PREFIX}N for N transactions")
+        elif not os.path.exists(name):
+            raise ValueError(f"no dataset at {name}")
+        for minutil_spec in minutil_specs.split(","):
+            try:
+                float(minutil_spec[:-1]) if minutil_spec.endswith("%") else int(minutil_spec)
+            except ValueError:
+                raise ValueError(f"invalid minimum utility {minutil_spec!r} in {spec}") from None
+
+    suite = []
+    for spec in specs:
+        name, minutil_specs = spec.rsplit(":", 1)
+        if name.startswith(SYNTHETIC_PREFIX):
+            path = synthetic_dataset(int(name[len(SYNTHETIC_PREFIX) :]), seed)
+        else:
+            path = name
+            name = os.path.splitext(os.path.basename(name))[0]
+
+        with load(path) as db:
+            total_trans_util = sum(db.transac_utils)
+        minutils = []
+        for minutil_spec in minutil_specs.split(","):
+            if minutil_spec.endswith("%"):
+                minutil = int(total_trans_util * float(minutil_spec[:-1]) / 100)
+            else:
+                minutil = int(minutil_spec)
+            minutils.append((minutil_spec, minutil))
+        suite.append((name, path, minutils))
+    return suite
+
+
+def checksum(output_path: str) -> str:
+    """
+    Get a checksum of the itemsets in a result file in the text format that does not depend
+    on the order of the itemsets or of their items, so that all engines can be compared.
+
+    Parameters:
+        output_path: path to the result file
+
+    Returns:
+        hexadecimal BLAKE2 hash of the sorted itemsets
+    """
+    lines = []
+    with open(output_path) as f:
+        for line in f:
+            items, util = line.split("#UTIL:")
+            items = sorted([int(item) for item in items.split()])
+            lines.append(" ".join([str(item) for item in items]) + f" #UTIL: {int(util)}\n")
+    lines.sort()
+    hasher = hashlib.blake2b(digest_size=16)
+    for line in lines:
+        hasher.update(line.encode())
+    return hasher.hexdigest()
+
+
+def trial(engine_name: str, input_path: str, minutil: int, output_path: str) -> Dict:
+    """
+    Run an engine once and measure it. This runs in a fresh process so that the memory
+    its profiler reads is its own.
+
+    Parameters:
+        engine_name: key of the engine in ENGINES
+        input_path: path to the dataset
+        minutil: minimum utility
+        output_path: path to the result file
+
+    Returns:
+        the wall time, phase times, peak memory, counts and output checksum of the run
+    """
+    engine_class, method = ENGINES[engine_name]
+    engine = engine_class(input_path, output_path, minutil)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start_time = time.perf_counter()
+        getattr(engine, method)()
+        wall_time = (time.perf_counter() - start_time) * 1_000
+    return {
+        "wall_time_ms": wall_time,
+        "phase_times_ms": engine.profiler.phase_times,
+        "peak_memory_mb": engine.profiler.peak_memory_mb,
+        "hui_count": engine.hui_count,
+        "candidate_count": engine.candidate_count,
+        "prune_count": engine.prune_count,
+        "checksum": checksum(output_path),
+    }
+
+
+def _trial_process(conn, *args) -> None:
+    """
+    Run a trial in a child process and send its result, or its error, to the parent.
+    """
+    try:
+        conn.send(trial(*args))
+    except Exception as e:
+        conn.send({"error": repr(e)})
+    finally:
+        conn.close()
+
+
+def run_trials(
+    engine_name: str, input_path: str, minutil: int, trials: int, timeout: Union[float, None]
+) -> Dict:
+    """
+    Run an engine several times, each time in a new process, and summarize the runs.
+
+    Parameters:
+        engine_name: key of the engine in ENGINES
+        input_path: path to the dataset
+        minutil: minimum utility
+        trials: number of runs
+        timeout: number of seconds after which a run is stopped, or None
+
+    Returns:
+        the median wall and phase times, maximum peak memory, counts and output checksum
+        of the runs, or the error of the first run that failed
+    """
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    with tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, "output.txt")
+        for _ in range(trials):
+            parent_conn, child_conn = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_trial_process,
+                args=(child_conn, engine_name, input_path, minutil, output_path),
+            )
+            process.start()
+            child_conn.close()
+            if parent_conn.poll(timeout):
+                # the pipe is closed without a result when the process dies
+                # (e.g. killed for running out of memory)
+                try:
+                    run = parent_conn.recv()
+                except EOFError:
+                    process.join()
+                    run = {"error": f"exit code {process.exitcode}"}
+            else:
+                process.terminate()
+                run = {"error": f"timed out after {timeout} s"}
+            process.join()
+            if "error" in run:
+                return run
+            runs.append(run)
+
+    checksums = {run["checksum"] for run in runs}
+    if len(checksums) > 1:
+        return {"error": "the runs wrote different itemsets"}
+    phases = runs[0]["phase_times_ms"]
+    return {
+        "wall_time_ms": statistics.median([run["wall_time_ms"] for run in runs]),
+        "wall_times_ms": [run["wall_time_ms"] for run in runs],
+        "phase_times_ms": {
+            phase: statistics.median([run["phase_times_ms"][phase] for run in runs])
+            for phase in phases
+        },
+        "peak_memory_mb": max([run["peak_memory_mb"] for run in runs]),
+        "hui_count": runs[0]["hui_count"],
+        "candidate_count": runs[0]["candidate_count"],
+        "prune_count": runs[0]["prune_count"],
+        "checksum": checksums.pop(),
+    }
+
+
+def result_key(result: Dict) -> str:
+    return f"{result['engine']}/{result['dataset']}/{result['minutil']}"
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """
+    Compare benchmark results against a baseline.
+
+    Parameters:
+        results: results of this benchmark
+        baseline: results of a previous benchmark
+        tolerance: relative increase of wall time or peak memory over the baseline
+            that is flagged as a regression
+
+    Returns:
+        a description of each regression
+    """
+    baseline_results = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        key = result_key(result)
+        base = baseline_results.get(key)
+        if base is None or "error" in base:
+            continue
+        if "error" in result:
+            regressions.append(f"{key}: {result['error']}")
+            continue
+        if result["checksum"] != base["checksum"]:
+            regressions.append(f"{key}: the itemsets differ from the baseline")
+        for metric in ("wall_time_ms", "peak_memory_mb"):
+            if result[metric] > base[metric] * (1 + tolerance):
+                change = (result[metric] / base[metric] - 1) * 100
+                regressions.append(
+                    f"{key}: {metric} {result[metric]:.1f} is {change:.1f}% above"
+                    f" the baseline {base[metric]:.1f}"
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the high utility itemset mining engines and compare the results"
+        " against a baseline."
+    )
+    parser.add_argument(
+        "datasets",
+        nargs="*",
+        default=DEFAULT_SUITE,
+        help="datasets and minimum utilities as dataset:minutil,minutil,... where dataset is"
+        f" a path or {SYNTHETIC_PREFIX}N for N synthetic transactions and a minutil ending with"
+        " %% is a percentage of the total transaction utility (default: "
+        + " ".join(DEFAULT_SUITE)
+        + ")",
+    )
+    parser.add_argument(
+        "--engines",
+        type=lambda value: value.split(","),
+        default=list(ENGINES),
+        help=f"comma-separated engines to benchmark (default: {','.join(ENGINES)})",
+    )
+    parser.add_argument(
+        "--trials", type=int, default=3, help="number of runs of each benchmark (default: 3)"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="number of seconds after which a run is stopped and reported as an error",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of the synthetic datasets (default: 0)"
+    )
+    parser.add_argument(
+        "--output",
+        default="experiments/benchmark.json",
+        help="path to the JSON file the results are written to"
+        " (default: experiments/benchmark.json)",
+    )
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="relative increase of wall time or peak memory over the baseline"
+        " flagged as a regression (default: 0.1)",
+    )
+    args = parser.parse_args()
+    for engine_name in args.engines:
+        if engine_name not in ENGINES:
+            parser.error(f"unknown engine {engine_name}; choose from {', '.join(ENGINES)}")
+
+    try:
+        suite = parse_suite(args.datasets, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    results = []
+    for name, path, minutils in suite:
+        for minutil_spec, minutil in minutils:
+            for engine_name in args.engines:
+                result = {
+                    "engine": engine_name,
+                    "dataset": name,
+                    "minutil": minutil,
+                    "minutil_spec": minutil_spec,
+                    "trials": args.trials,
+                }
+                result.update(run_trials(engine_name, path, minutil, args.trials, args.timeout))
+                results.append(result)
+                if "error" in result:
+                    print(f"{result_key(result)}: {result['error']}")
+                else:
+                    print(
+                        f"{result_key(result)}: {result['wall_time_ms']:.1f} ms,"
+                        f" {result['peak_memory_mb']:.1f} MB, {result['hui_count']} itemsets"
+                    )
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline}")
@@ -0,0 +1,361 @@
+import argparse
+from array import array
+from itertools import combinations
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+from fhm import FHM
+from fhm_utils import UtilList, gallop
+from instrument import Profiler, dump_profile, log_experiment
+from sinks import ClosedTextSink, TextSink, read_closed_huis
+
+
+def recover_huis(
+    closed_huis: Iterable[Tuple[Sequence[int], int, int, Sequence[int]]], minutil: int
+) -> Iterator[Tuple[Tuple[int, ...], int]]:
+    """
+    Recover every high utility itemset from the closed high utility itemsets.
+
+    An itemset has the same transactions as its closure, the smallest closed itemset that
+    contains it, so its utility is the sum of the utilities of its items in its closure;
+    the closure is the closed superset with the highest support. Every high utility itemset
+    has a closed high utility closure, since adding items to an itemset without changing its
+    transactions can only increase its utility. This enumerates the subsets of the closed
+    itemsets, so it takes time exponential in their length.
+
+    Parameters:
+        closed_huis: (itemset, utility, support, utility of each item) of each closed
+            high utility itemset
+        minutil: minimum utility the closed itemsets were mined with
+
+    Returns:
+        an iterator of (itemset, utility) of each high utility itemset
+    """
+    seen = set()
+    for itemset, _, _, item_utils in sorted(closed_huis, key=lambda hui: hui[2], reverse=True):
+        for size in range(1, len(itemset) + 1):
+            for indices in combinations(range(len(itemset)), size):
+                subset = frozenset([itemset[index] for index in indices])
+                if subset in seen:
+                    continue
+                seen.add(subset)
+                util = sum([item_utils[index] for index in indices])
+                if util >= minutil:
+                    yield tuple([itemset[index] for index in indices]), util
+
+
+def contains_tids(tids: array, sub_tids: array) -> bool:
+    """
+    Check whether the sorted tids of a utility list hold every tid of other sorted tids.
+
+    Parameters:
+        tids: sorted transaction IDs
+        sub_tids: sorted transaction IDs to find in tids
+
+    Returns:
+        True if every tid of sub_tids is in tids
+    """
+    n = len(tids)
+    lo = 0
+    for tid in sub_tids:
+        lo = gallop(tids, tid, lo)
+        if lo == n or tids[lo] != tid:
+            return False
+        lo += 1
+    return True
+
+
+def utility_in(util_list: UtilList, tids: array) -> int:
+    """
+    Get the sum of the iutils of a utility list over some of its transactions.
+
+    Parameters:
+        util_list: utility list
+        tids: sorted transaction IDs, all of which are in the tids of util_list
+
+    Returns:
+        the sum of the iutils of util_list at tids
+    """
+    list_tids = util_list.tids
+    iutils = util_list.iutils
+    util = 0
+    lo = 0
+    for tid in tids:
+        lo = gallop(list_tids, tid, lo)
+        util += iutils[lo]
+        lo += 1
+    return util
+
+
+class ClosedFHM(FHM):
+    """
+    FHM that only outputs the closed high utility itemsets: the ones that no proper superset
+    has the same transactions as. With each of them, it outputs its support and the utility
+    of each of its items, from which recover_huis recovers all the high utility itemsets.
+
+    Closure is checked on the tids of the utility lists during the search, as in CHUD. An item
+    that is not in the itemset X and occurs in every transaction of X is in the closure of X
+    and of every itemset that extends X:
+        - if it precedes the last item of X in the order of the search (the tids of its
+          utility list hold the tids of X), no itemset of the branch of X contains it, so none
+          is closed and the branch is pruned;
+        - if it is an extension of X (the utility list of X U {y} has the same length as the
+          one of X), the itemsets of the branch without it are not closed, so it is added to
+          X right away and the search goes on from the closure of X.
+
+    Attributes:
+        closure_prune_count: number of branches pruned because none of their itemsets is closed
+        closure_jump_count: number of items added to an itemset because they are in its closure
+    """
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        minutil: int,
+        profiler: Union[Profiler, None] = None,
+    ) -> None:
+        """
+        Constructor for ClosedFHM.
+
+        Parameters:
+            input_path: relative path to the data file
+            output_path: relative path to the output file
+            minutil: minimum utility
+            profiler: profiler of the phases of the algorithm, or None for one
+                without counters per search depth
+        """
+        super().__init__(
+            input_path, output_path, minutil, sink=ClosedTextSink(output_path), profiler=profiler
+        )
+        self.closure_prune_count = 0
+        self.closure_jump_count = 0
+        self.rank_buffer = []
+
+    def search(
+        self,
+        prefix_UL: Union[UtilList, None],
+        prefix_ext_ULs: List[UtilList],
+        extensions: Union[Iterable[int], None] = None,
+        prefix_length: int = 0,
+    ) -> None:
+        """
+        Search all closed high utility itemsets that extend the prefix and output them to
+        self.sink. The items of the prefix are the ones in self.rank_buffer.
+
+        Parameters:
+            prefix_UL: utility list of the prefix itemset
+            prefix_ext_ULs: list of utility lists for each extension of the prefix itemset
+            extensions: indices in prefix_ext_ULs of the extensions whose branches are searched,
+                in order, or None to search all of them
+            prefix_length: length of the prefix itemset, for the counters per search depth
+        """
+        if extensions is None:
+            extensions = range(len(prefix_ext_ULs))
+        itemset_buffer = self.itemset_buffer
+        rank_buffer = self.rank_buffer
+        items = self.items
+        item_ULs = self.util_lists
+        counters = self.profiler.depth_counters
+        bound = "bound" in self.pruning
+        itemset_ranks = set(rank_buffer)
+
+        # each frame holds the utility list of a prefix, the utility lists of its extensions,
+        # the indices of the extensions left to search and the ranks of the items the prefix
+        # added to its own prefix (its item and the items of its closure)
+        stack = [(prefix_UL, prefix_ext_ULs, iter(extensions), ())]
+        while stack:
+            prefix_UL, ext_ULs, indices, _ = frame = stack[-1]
+            i = next(indices, None)
+
+            # every extension of the prefix has been searched: drop the prefix
+            if i is None:
+                stack.pop()
+                for rank in frame[3]:
+                    itemset_ranks.remove(rank)
+                    itemset_buffer.pop()
+                    rank_buffer.pop()
+                continue
+
+            # utility list for the itemset prefix U {x}
+            prefix_x_UL = ext_ULs[i]
+            if len(stack) > 1:
+                ext_ULs[i] = None
+
+            # no itemset of the branch has high utility
+            if prefix_x_UL.sum_iutils + prefix_x_UL.sum_rutils < self.minutil and bound:
+                self.count_prunes("bound")
+                if counters is not None:
+                    self.profiler.count("bound_prunes", prefix_length + len(stack))
+                continue
+
+            # an itemset that occurs in no transaction has no closed itemset in its branch
+            n_tids = len(prefix_x_UL)
+            if not n_tids:
+                continue
+
+            # an item that precedes x, is not in prefix U {x} and whose tids hold the tids of
+            # prefix U {x} is in the closure of every itemset of the branch; it co-occurs
+            # with x, so the EUCS rules out most items before their tids are compared
+            x = prefix_x_UL.item
+            tids = prefix_x_UL.tids
+            if any(
+                len(item_ULs[z]) >= n_tids
+                and z not in itemset_ranks
+                and self.EUCS.get(z, x) > 0
+                and contains_tids(item_ULs[z].tids, tids)
+                for z in range(x)
+            ):
+                self.closure_prune_count += 1
+                continue
+
+            # add the extensions in the closure of prefix U {x} to it
+            prefix_x_ext_ULs = self.extensions(
+                prefix_UL, prefix_x_UL, ext_ULs, i, prefix_length + len(stack) + 1
+            )
+            closure_ULs = [
+                util_list for util_list in prefix_x_ext_ULs if len(util_list) == n_tids
+            ]
+            if closure_ULs:
+                self.closure_jump_count += len(closure_ULs)
+                prefix_x_UL, prefix_x_ext_ULs = self.close(
+                    prefix_x_UL, prefix_x_ext_ULs, closure_ULs
+                )
+
+            # add item x and its closure to prefix in order to create new prefix
+            ranks = (x,) + tuple([util_list.item for util_list in closure_ULs])
+            for rank in ranks:
+                itemset_ranks.add(rank)
+                itemset_buffer.append(items[rank])
+                rank_buffer.append(rank)
+
+            # output the closed itemset if it has high utility
+            if prefix_x_UL.sum_iutils >= self.minutil:
+                self.output_closed(prefix_x_UL)
+
+            # search all itemsets with the prefix: prefix U {x} U closure
+            stack.append((prefix_x_UL, prefix_x_ext_ULs, iter(range(len(prefix_x_ext_ULs))), ranks))
+
+    def close(
+        self,
+        prefix_x_UL: UtilList,
+        prefix_x_ext_ULs: List[UtilList],
+        closure_ULs: List[UtilList],
+    ) -> Tuple[UtilList, List[UtilList]]:
+        """
+        Add the items of the closure of the itemset prefix U {x} that extend it to its
+        utility list and to the utility lists of its other extensions.
+
+        Parameters:
+            prefix_x_UL: utility list of the itemset prefix U {x}
+            prefix_x_ext_ULs: utility lists for the itemsets prefix U {x, y}
+            closure_ULs: utility lists for the itemsets prefix U {x, y} that have the same tids
+                as prefix U {x}, in ascending order of y
+
+        Returns:
+            the utility list of prefix U {x} U closure and the utility lists for the itemsets
+            prefix U {x} U closure U {y} of the other extensions y
+        """
+        # the utility of a closure item y in a transaction of prefix U {x} is the iutil of
+        # prefix U {x, y} less the one of prefix U {x}, as their tids are the same
+        x_iutils = prefix_x_UL.iutils
+        closure_utils = []
+        for prefix_x_y_UL in closure_ULs:
+            utils = [xy - x for xy, x in zip(prefix_x_y_UL.iutils, x_iutils)]
+            closure_utils.append((prefix_x_y_UL.item, utils))
+        closure_util = [sum(utils) for utils in zip(*[utils for _, utils in closure_utils])]
+
+        # the closure items follow x, so their utilities move from the rutils to the iutils
+        closed_UL = UtilList(prefix_x_UL.item)
+        for tid, iutil, rutil, util in zip(
+            prefix_x_UL.tids, prefix_x_UL.iutils, prefix_x_UL.rutils, closure_util
+        ):
+            closed_UL.add_elem(tid, iutil + util, rutil - util)
+
+        # the utilities of the closure items that follow y move from the rutils as well; the
+        # tids of prefix U {x, y} are a subset of those of prefix U {x}, whose positions
+        # index the utilities of the closure items
+        positions = {tid: k for k, tid in enumerate(prefix_x_UL.tids)}
+        closure_ranks = {rank for rank, _ in closure_utils}
+        closed_ext_ULs = []
+        for prefix_x_y_UL in prefix_x_ext_ULs:
+            y = prefix_x_y_UL.item
+            if y in closure_ranks:
+                continue
+            following = [utils for rank, utils in closure_utils if rank > y]
+            following_util = [sum(utils) for utils in zip(*following)] if following else None
+            closed_y_UL = UtilList(y)
+            for tid, iutil, rutil in zip(
+                prefix_x_y_UL.tids, prefix_x_y_UL.iutils, prefix_x_y_UL.rutils
+            ):
+                k = positions[tid]
+                if following_util is not None:
+                    rutil -= following_util[k]
+                closed_y_UL.add_elem(tid, iutil + closure_util[k], rutil)
+            closed_ext_ULs.append(closed_y_UL)
+        return closed_UL, closed_ext_ULs
+
+    def output_closed(self, util_list: UtilList) -> None:
+        """
+        Write the closed high utility itemset in self.itemset_buffer, its support and the
+        utility of each of its items to self.sink.
+
+        Parameters:
+            util_list: utility list of the itemset
+        """
+        item_utils = [
+            utility_in(self.util_lists[rank], util_list.tids) for rank in self.rank_buffer
+        ]
+        self.hui_count += 1
+        self.sink.write(list(self.itemset_buffer), util_list.sum_iutils, len(util_list), item_utils)
+
+    def print_stats(self) -> None:
+        """
+        Print statistics for the closed FHM algorithm.
+        """
+        super().print_stats()
+        print(f"branches pruned by closure: {self.closure_prune_count}")
+        print(f"items added by closure: {self.closure_jump_count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mine closed high utility itemsets with FHM, or recover all the high"
+        " utility itemsets from them."
+    )
+    parser.add_argument("input_path", help="relative path to the data file")
+    parser.add_argument("output_path", help="relative path to the output file")
+    parser.add_argument("minutil", type=int, help="minimum utility")
+    parser.add_argument(
+        "--recover",
+        default=None,
+        help="path to write all the high utility itemsets to, recovered from the closed ones",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="path to a JSON file to write the time and memory of each phase"
+        " and the counters per search depth to",
+    )
+    parser.add_argument(
+        "--experiment-csv",
+        default=None,
+        help="path to a csv file of experiments to append the statistics of the run to",
+    )
+    args = parser.parse_args()
+    fhm = ClosedFHM(
+        args.input_path,
+        args.output_path,
+        args.minutil,
+        profiler=Profiler(depth_counters=args.profile is not None),
+    )
+    fhm.run()
+    fhm.print_stats()
+    if args.profile is not None:
+        dump_profile(args.profile, fhm)
+    if args.experiment_csv is not None:
+        log_experiment(args.experiment_csv, fhm)
+    if args.recover is not None:
+        sink = TextSink(args.recover)
+        sink.open()
+        for itemset, util in recover_huis(read_closed_huis(args.output_path), args.minutil):
+            sink.write(itemset, util)
+        sink.close()
@@ -0,0 +1,540 @@
+import os
+import gzip
+import mmap
+import struct
+import hashlib
+import argparse
+import tempfile
+import shutil
+import multiprocessing
+from array import array
+from collections import deque
+from itertools import accumulate
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+# suffix of the binary cache written next to a dataset
+CACHE_SUFFIX = ".huimdb"
+
+# magic number, size, mtime (ns) and hash of the source file, number of transactions,
+# number of (item, utility) entries and number of distinct items
+MAGIC = b"HUIMDB02"
+HEADER = struct.Struct("<8sqq16sqqq")
+HEADER_SIZE = 64
+
+# first bytes of a gzip file
+GZIP_MAGIC = b"\x1f\x8b"
+
+# bytes of a dataset parsed at a time, by one worker process when they are parsed in parallel
+CHUNK_SIZE = 8 << 20
+
+# number of blocks of a compressed dataset parsed or waiting to be written per worker process,
+# which bounds the memory used to stream it
+BLOCKS_PER_WORKER = 2
+
+# compact arrays of the transactions of a chunk of a dataset: the number of items and the
+# utility of each transaction, the item IDs and the utilities of all of their items,
+# and the TWU of each item over the chunk
+Chunk = Tuple[array, array, array, array, Dict[int, int]]
+
+
+class TransactionDB:
+    """
+    Memory-mapped binary (CSR) layout of a dataset in the SPMF format
+    "items:transaction utility:utilities".
+
+    The file starts with a header followed by six arrays, each starting at a multiple of 8 bytes:
+    the offsets of the transactions into the entry arrays (n + 1 int64), the transaction
+    utilities (n int64), the item IDs of the entries (int32), the utilities of the entries (int64),
+    and the distinct item IDs in order of first appearance (int32) with their TWUs (int64).
+
+    Attributes:
+        path: path to the binary file
+        offsets: offsets of the transactions into items and utils
+        transac_utils: utility of each transaction
+        items: item IDs of all transactions
+        utils: utilities of the items of all transactions
+        TWU_items: distinct item IDs in order of first appearance
+        TWUs: TWU of each item of TWU_items
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Constructor for TransactionDB.
+
+        Parameters:
+            path: path to a binary file written by DBWriter
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, _, _, n_transacs, n_entries, n_items = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC:
+            self.mmap.close()
+            raise ValueError(f"{path} is not a binary dataset")
+        view = memoryview(self.mmap)
+        pos = HEADER_SIZE
+        self.offsets, pos = _section(view, pos, "q", n_transacs + 1)
+        self.transac_utils, pos = _section(view, pos, "q", n_transacs)
+        self.items, pos = _section(view, pos, "i", n_entries)
+        self.utils, pos = _section(view, pos, "q", n_entries)
+        self.TWU_items, pos = _section(view, pos, "i", n_items)
+        self.TWUs, pos = _section(view, pos, "q", n_items)
+        view.release()
+
+    def __len__(self) -> int:
+        return len(self.transac_utils)
+
+    def __iter__(self) -> Iterator[Tuple[List[int], int, List[int]]]:
+        """
+        Iterate over the transactions in order of tid.
+
+        Returns:
+            an iterator of (items, transaction utility, utilities) for each transaction
+        """
+        offsets, items, utils = self.offsets, self.items, self.utils
+        start = offsets[0]
+        for tid, transac_util in enumerate(self.transac_utils):
+            end = offsets[tid + 1]
+            yield items[start:end].tolist(), transac_util, utils[start:end].tolist()
+            start = end
+
+    def transaction(self, tid: int) -> Tuple[List[int], int, List[int]]:
+        """
+        Get a transaction by its tid.
+
+        Parameters:
+            tid: position of the transaction in the dataset
+
+        Returns:
+            the items, transaction utility and utilities of the transaction
+        """
+        start, end = self.offsets[tid], self.offsets[tid + 1]
+        return self.items[start:end].tolist(), self.transac_utils[tid], self.utils[start:end].tolist()
+
+    def item_TWUs(self) -> Dict[int, int]:
+        """
+        Get the TWU of each item without scanning the transactions.
+
+        Returns:
+            dictionary of items and their TWU, in order of first appearance
+        """
+        return dict(zip(self.TWU_items.tolist(), self.TWUs.tolist()))
+
+    def close(self) -> None:
+        sections = (self.offsets, self.transac_utils, self.items, self.utils)
+        for view in sections + (self.TWU_items, self.TWUs):
+            view.release()
+        self.mmap.close()
+
+    def __enter__(self) -> "TransactionDB":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class DBWriter:
+    """
+    Write transactions one at a time to the binary layout read by TransactionDB.
+
+    The sections are spooled to temporary files and concatenated on close(),
+    so the memory used does not grow with the number of transactions.
+    """
+
+    def __init__(self, path: str, source_key: Tuple[int, int, bytes] = (0, 0, bytes(16))) -> None:
+        """
+        Constructor for DBWriter.
+
+        Parameters:
+            path: path to the binary file to write
+            source_key: size, mtime (ns) and hash of the source file the binary file caches
+        """
+        self.path = path
+        self.source_key = source_key
+        self.n_transacs = 0
+        self.n_entries = 0
+        self.item_TWUs = {}
+        self.transac_utils = tempfile.TemporaryFile()
+        self.offsets = tempfile.TemporaryFile()
+        self.items = tempfile.TemporaryFile()
+        self.utils = tempfile.TemporaryFile()
+        self.offsets.write(struct.pack("<q", 0))
+
+    def add_transaction(self, items: List[int], transac_util: int, utils: List[int]) -> None:
+        """
+        Append a transaction.
+
+        Parameters:
+            items: item IDs of the transaction
+            transac_util: utility of the transaction
+            utils: utility of each item of the transaction
+        """
+        self.n_transacs += 1
+        self.n_entries += len(items)
+        self.transac_utils.write(struct.pack("<q", transac_util))
+        self.offsets.write(struct.pack("<q", self.n_entries))
+        self.items.write(array("i", items).tobytes())
+        self.utils.write(array("q", utils).tobytes())
+        item_TWUs = self.item_TWUs
+        for item in items:
+            item_TWUs[item] = item_TWUs.get(item, 0) + transac_util
+
+    def add_chunk(
+        self,
+        lengths: array,
+        transac_utils: array,
+        items: array,
+        utils: array,
+        item_TWUs: Dict[int, int],
+    ) -> None:
+        """
+        Append the transactions of a chunk parsed by parse_chunk.
+
+        Parameters:
+            lengths: number of items of each transaction
+            transac_utils: utility of each transaction
+            items: item IDs of all the transactions
+            utils: utilities of the items of all the transactions
+            item_TWUs: TWU of each item over the transactions
+        """
+        offsets = array("q", accumulate(lengths, initial=self.n_entries))
+        self.n_transacs += len(lengths)
+        self.n_entries = offsets[-1]
+        self.transac_utils.write(transac_utils.tobytes())
+        self.offsets.write(offsets[1:].tobytes())
+        self.items.write(items.tobytes())
+        self.utils.write(utils.tobytes())
+        for item, TWU in item_TWUs.items():
+            self.item_TWUs[item] = self.item_TWUs.get(item, 0) + TWU
+
+    def close(self) -> None:
+        """
+        Write the header and the sections to self.path.
+        """
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as out:
+                size, mtime, digest = self.source_key
+                header = HEADER.pack(
+                    MAGIC,
+                    size,
+                    mtime,
+                    digest,
+                    self.n_transacs,
+                    self.n_entries,
+                    len(self.item_TWUs),
+                )
+                out.write(header.ljust(HEADER_SIZE, b"\0"))
+                for section in (self.offsets, self.transac_utils, self.items, self.utils):
+                    section.seek(0)
+                    shutil.copyfileobj(section, out)
+                    section.close()
+                    out.write(bytes(-out.tell() % 8))
+                out.write(array("i", self.item_TWUs.keys()).tobytes())
+                out.write(bytes(-out.tell() % 8))
+                out.write(array("q", self.item_TWUs.values()).tobytes())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def source_key(path: str, with_hash: bool = True) -> Tuple[int, int, bytes]:
+    """
+    Get the key a binary cache of a dataset is checked against.
+
+    Parameters:
+        path: path to the dataset
+        with_hash: whether to hash the contents of the dataset
+
+    Returns:
+        the size, mtime (ns) and BLAKE2 hash (or zeros if with_hash is False) of the dataset
+    """
+    stat = os.stat(path)
+    digest = bytes(16)
+    if with_hash:
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(chunk)
+        digest = hasher.digest()
+    return stat.st_size, stat.st_mtime_ns, digest
+
+
+def parse_transactions(db: BinaryIO) -> Iterator[Tuple[List[int], int, List[int]]]:
+    """
+    Parse the transactions of a dataset in the SPMF format, skipping blank lines.
+
+    Parameters:
+        db: dataset opened in binary mode
+
+    Returns:
+        an iterator of (items, transaction utility, utilities) for each transaction
+    """
+    for transac in db:
+        transac_data = transac.split(b":")
+        if len(transac_data) < 3:
+            continue
+        items = [int(item) for item in transac_data[0].split()]
+        utils = [int(util) for util in transac_data[2].split()]
+        yield items, int(transac_data[1]), utils
+
+
+def parse_chunk(data: bytes) -> Chunk:
+    """
+    Parse the transactions of a newline-aligned block of a dataset in the SPMF format into
+    compact arrays, skipping blank lines.
+
+    Parameters:
+        data: lines of the dataset
+
+    Returns:
+        the number of items and the utility of each transaction, the item IDs and the utilities
+        of all of their items, and the TWU of each item over the transactions
+    """
+    lengths = array("q")
+    transac_utils = array("q")
+    items = array("i")
+    utils = array("q")
+    # TWUs are added up by the bytes of the items, which are only parsed once
+    item_TWUs = {}
+    for transac in data.split(b"\n"):
+        transac_data = transac.split(b":")
+        if len(transac_data) < 3:
+            continue
+        transac_items = transac_data[0].split()
+        transac_util = int(transac_data[1])
+        lengths.append(len(transac_items))
+        transac_utils.append(transac_util)
+        items.extend(map(int, transac_items))
+        utils.extend(map(int, transac_data[2].split()))
+        for item in transac_items:
+            item_TWUs[item] = item_TWUs.get(item, 0) + transac_util
+
+    # the same item may be written in different ways (e.g. with leading zeros)
+    parsed_TWUs = {}
+    for item, TWU in item_TWUs.items():
+        item = int(item)
+        parsed_TWUs[item] = parsed_TWUs.get(item, 0) + TWU
+    return lengths, transac_utils, items, utils, parsed_TWUs
+
+
+def chunk_bounds(path: str, chunk_size: int = CHUNK_SIZE) -> List[int]:
+    """
+    Split a dataset into byte ranges of about chunk_size bytes that start at a line.
+
+    Parameters:
+        path: path to the dataset
+        chunk_size: number of bytes of a range
+
+    Returns:
+        the offset of the start of each range and the size of the dataset
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        while bounds[-1] + chunk_size < size:
+            f.seek(bounds[-1] + chunk_size)
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    return bounds
+
+
+def iter_blocks(db: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Read a dataset as a stream of blocks of about chunk_size bytes that end with a line.
+
+    Parameters:
+        db: dataset opened in binary mode, e.g. a gzip file decompressed as it is read
+        chunk_size: number of bytes of a block
+
+    Returns:
+        an iterator of the blocks
+    """
+    while True:
+        block = db.read(chunk_size)
+        if not block:
+            return
+        yield block + db.readline()
+
+
+def _parse_range(byte_range: Tuple[str, int, int]) -> Chunk:
+    """
+    Parse the transactions of a byte range of a dataset in a worker process.
+
+    Parameters:
+        byte_range: path to the dataset, offset of the range and offset after it
+    """
+    path, start, end = byte_range
+    with open(path, "rb") as f:
+        f.seek(start)
+        return parse_chunk(f.read(end - start))
+
+
+def write_chunks(
+    writer: "DBWriter",
+    parse: Callable[[object], Chunk],
+    chunks: Iterable[object],
+    workers: int = 1,
+) -> None:
+    """
+    Parse chunks of a dataset, in a pool of worker processes if workers > 1, and append their
+    transactions to a DBWriter in order, so that the tids are the same as in the dataset.
+
+    Parameters:
+        writer: writer of the binary layout
+        parse: function that parses a chunk into compact arrays
+        chunks: chunks of the dataset, in order
+        workers: number of processes that parse chunks
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            writer.add_chunk(*parse(chunk))
+        return
+
+    # a bounded number of chunks are parsed ahead of the one written next,
+    # so that the chunks of a stream are not all read at once
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(parse, (chunk,)))
+            if len(pending) >= workers * BLOCKS_PER_WORKER:
+                writer.add_chunk(*pending.popleft().get())
+        while pending:
+            writer.add_chunk(*pending.popleft().get())
+
+
+def convert(
+    input_path: str,
+    output_path: str,
+    key: Tuple[int, int, bytes] = None,
+    workers: Union[int, None] = None,
+) -> None:
+    """
+    Convert a dataset in the SPMF format, optionally gzip-compressed, to the binary layout
+    read by TransactionDB. An uncompressed dataset is split into byte ranges that the workers
+    read and parse themselves; a compressed one is decompressed as it is read, in blocks that
+    the workers parse.
+
+    Parameters:
+        input_path: path to the dataset
+        output_path: path to the binary file to write
+        key: size, mtime (ns) and hash of the dataset stored in the header
+        workers: number of processes that parse the dataset, or None for the number of CPUs
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    writer = DBWriter(output_path, key if key is not None else source_key(input_path))
+    with open(input_path, "rb") as f:
+        compressed = f.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    if compressed:
+        with gzip.open(input_path, "rb") as db:
+            write_chunks(writer, parse_chunk, iter_blocks(db), workers)
+    else:
+        bounds = chunk_bounds(input_path)
+        byte_ranges = [(input_path, start, end) for start, end in zip(bounds, bounds[1:])]
+        write_chunks(writer, _parse_range, byte_ranges, min(workers, len(byte_ranges)))
+    writer.close()
+
+
+def is_cache_valid(input_path: str, cache_path: str) -> bool:
+    """
+    Check whether the binary cache of a dataset was written for its current contents.
+    The cache is valid if the size and mtime of the dataset match the header,
+    or if the size and hash match when only the mtime changed.
+
+    Parameters:
+        input_path: path to the dataset
+        cache_path: path to the binary cache
+
+    Returns:
+        True if the cache can be used in place of the dataset
+    """
+    try:
+        with open(cache_path, "rb") as f:
+            magic, size, mtime, digest, _, _, _ = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return False
+    cur_size, cur_mtime, _ = source_key(input_path, with_hash=False)
+    if magic != MAGIC or size != cur_size:
+        return False
+    return mtime == cur_mtime or source_key(input_path)[2] == digest
+
+
+def load(input_path: str, workers: Union[int, None] = None) -> TransactionDB:
+    """
+    Memory-map the binary cache of a dataset, converting the dataset first if there is no
+    valid cache next to it. If the cache cannot be written next to the dataset,
+    it is written to a temporary file instead.
+
+    Parameters:
+        input_path: path to a dataset in the SPMF format (optionally gzip-compressed)
+            or to a binary file
+        workers: number of processes that parse the dataset if it is converted,
+            or None for the number of CPUs
+
+    Returns:
+        the memory-mapped transactions of the dataset
+    """
+    with open(input_path, "rb") as f:
+        magic = f.read(len(MAGIC))
+    if magic == MAGIC:
+        return TransactionDB(input_path)
+    if magic[:-2] == MAGIC[:-2]:
+        raise ValueError(f"{input_path} is a binary dataset of an older layout, generate it again")
+
+    cache_path = input_path + CACHE_SUFFIX
+    if not is_cache_valid(input_path, cache_path):
+        try:
+            convert(input_path, cache_path, workers=workers)
+        except OSError:
+            fd, cache_path = tempfile.mkstemp(suffix=CACHE_SUFFIX)
+            os.close(fd)
+            convert(input_path, cache_path, workers=workers)
+            db = TransactionDB(cache_path)
+            os.remove(cache_path)
+            return db
+    return TransactionDB(cache_path)
+
+
+def _section(view: memoryview, pos: int, typecode: str, length: int) -> Tuple[memoryview, int]:
+    """
+    Get an array of the binary layout as a typed memoryview.
+
+    Parameters:
+        view: memoryview of the whole file
+        pos: offset of the array
+        typecode: typecode of the array elements
+        length: number of elements in the array
+
+    Returns:
+        the typed memoryview and the offset of the next array
+    """
+    end = pos + length * struct.calcsize(typecode)
+    section = view[pos:end].cast(typecode)
+    return section, end + (-end % 8)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert datasets to their binary cache once so that later runs skip"
+        " text parsing."
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="paths to datasets in the SPMF format, optionally gzip-compressed"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of processes that parse a dataset (default: the number of CPUs)",
+    )
+    args = parser.parse_args()
+    for path in args.paths:
+        db = load(path, workers=args.workers)
+        print(f"{path}: {len(db)} transactions cached in {db.path}")
+        db.close()
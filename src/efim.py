@@ -0,0 +1,340 @@
+import time
+import argparse
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Tuple, Union
+from dataset import load
+from instrument import Profiler, dump_profile, log_experiment
+
+# a transaction of a projected database: the ranks of its items in ascending order,
+# the utility of each of those items and the utility of the prefix itemset in the transaction
+Transaction = Tuple[Tuple[int, ...], List[int], int]
+
+
+class EFIM:
+    """
+    Class for EFIM.
+
+    Attributes:
+        input_path: relative path to the data file
+        output_path: relative path to the output file
+        minutil: minimum utility
+        output_file: output file to write high utility itemsets
+        itemset_buffer: buffer for itemsets
+        items: items with TWU >= minutil in order of ascending TWU, indexed by their rank
+        mem_usage: maximum memory usage of algorithm
+        hui_count: number of high utility itemsets
+        candidate_count: number of candidate high utility itemsets
+        prune_count: number of itemsets pruned
+        runtime: total runtime of the algorithm
+        profiler: wall time, CPU time and peak memory of each phase of the algorithm
+            ("TWU scan", "database build" and "search"), and optionally counters
+            per search depth
+        total_trans_util: total transaction utility of the dataset
+    """
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        minutil: int,
+        profiler: Union[Profiler, None] = None,
+    ) -> None:
+        """
+        Constructor for EFIM.
+
+        Parameters:
+            input_path: relative path to the data file
+            output_path: relative path to the output file
+            minutil: minimum utility
+            profiler: profiler of the phases of the algorithm, or None for one
+                without counters per search depth
+        """
+        self.input_path = input_path
+        self.output_path = output_path
+        self.minutil = minutil
+        self.output_file = None
+        self.itemset_buffer = []
+        self.items = []
+        self.mem_usage = 0
+        self.hui_count = 0
+        self.candidate_count = 0
+        self.prune_count = 0
+        self.runtime = 0
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.total_trans_util = 0
+
+    def run(self) -> None:
+        """
+        Wrapper of the efim() method that records the maximum memory usage.
+        """
+        # max memory usage of the phases of one run of EFIM
+        self.efim()
+        self.mem_usage = self.profiler.peak_memory_mb
+
+    def efim(self) -> None:
+        """
+        Run the EFIM algorithm.
+        """
+        start_time = time.time()  # start timing algorithm
+        self.profiler.phase("TWU scan")
+        self.itemset_buffer = []
+
+        # TWU of each item, which is its local utility for the empty prefix; the binary layout
+        # of DB already holds them, so DB is not scanned for them
+        with load(self.input_path) as db:
+            item_TWU_dict = db.item_TWUs()  # dictionary of items and their TWU
+
+        # recode the items with TWU >= minutil to their ranks in order of ascending TWU,
+        # the same total order FHM uses, so that both write itemsets in the same order
+        self.profiler.phase("database build")
+        promising_items = []
+        for item, TWU in item_TWU_dict.items():
+            if TWU >= self.minutil:
+                promising_items.append(item)
+            else:
+                self.prune_count += 1
+        promising_items.sort(key=lambda item: item_TWU_dict[item])
+        self.items = promising_items
+        item_rank_dict = {item: rank for rank, item in enumerate(promising_items)}
+
+        # second DB scan to build the database of the empty prefix, keeping only the items
+        # with TWU >= minutil sorted by rank and merging identical transactions
+        merged_db = {}
+        with load(self.input_path) as db:
+            for items, transac_util, item_utils in db:
+                self.total_trans_util += transac_util
+                rank_pairs = []
+                for item, util in zip(items, item_utils):
+                    rank = item_rank_dict.get(item)
+                    if rank is not None:
+                        rank_pairs.append((rank, util))
+                if rank_pairs:
+                    rank_pairs.sort()
+                    self.merge(
+                        merged_db,
+                        tuple([rank for rank, _ in rank_pairs]),
+                        [util for _, util in rank_pairs],
+                        0,
+                    )
+        transacs = [(ranks, utils, 0) for ranks, (utils, _) in merged_db.items()]
+
+        # sub-tree utility of each item for the empty prefix
+        secondary = list(range(len(promising_items)))
+        sub_tree_utils, _ = self.utility_bins(transacs)
+        primary = []
+        for rank in secondary:
+            if sub_tree_utils.get(rank, 0) >= self.minutil:
+                primary.append(rank)
+            else:
+                self.prune_count += 1
+                if self.profiler.depth_counters is not None:
+                    self.profiler.count("bound_prunes", 1)
+
+        # recursively search for itemsets
+        self.profiler.phase("search")
+        with open(self.output_path, "w") as out:
+            self.output_file = out
+            self.search(transacs, primary, secondary)
+        self.profiler.stop()
+
+        self.runtime = (time.time() - start_time) * 1_000  # stop timing algorithm
+
+    def search(self, transacs: List[Transaction], primary: List[int], secondary: List[int]) -> None:
+        """
+        Recursive method to search all high utility itemsets and output them into a file.
+
+        Parameters:
+            transacs: database projected on the prefix itemset
+            primary: items whose sub-tree utility for the prefix is >= minutil,
+                i.e. the extensions of the prefix whose sub-trees are explored
+            secondary: items whose local utility for the prefix is >= minutil,
+                i.e. the items that may appear in any extension of the prefix
+        """
+        counters = self.profiler.depth_counters
+
+        # for each extension x of the prefix
+        for x in primary:
+            self.candidate_count += 1
+
+            # project the database on prefix U {x}, keeping the items after x,
+            # and calculate the utility of prefix U {x}
+            util = 0
+            projected_transacs = []
+            for ranks, utils, prefix_util in transacs:
+                index = bisect_left(ranks, x)
+                if index == len(ranks) or ranks[index] != x:
+                    continue
+                prefix_x_util = prefix_util + utils[index]
+                util += prefix_x_util
+                if index + 1 < len(ranks):
+                    projected_transacs.append(
+                        (ranks[index + 1 :], utils[index + 1 :], prefix_x_util)
+                    )
+
+            self.itemset_buffer.append(self.items[x])
+            if counters is not None:
+                depth = len(self.itemset_buffer)
+                self.profiler.count("joins", depth)
+                self.profiler.count("elements", depth, len(projected_transacs))
+
+            # output itemset if it has high utility
+            if util >= self.minutil:
+                self.output(util)
+
+            # calculate the sub-tree and local utilities of the items after x
+            # for the prefix U {x} with utility-bin arrays
+            sub_tree_utils, local_utils = self.utility_bins(projected_transacs)
+            x_primary = []
+            x_secondary = []
+            prune_count = self.prune_count
+            for y in secondary[bisect_right(secondary, x) :]:
+                # skip items that never occur after x
+                if y not in local_utils:
+                    continue
+                if local_utils[y] >= self.minutil:
+                    x_secondary.append(y)
+                if sub_tree_utils[y] >= self.minutil:
+                    x_primary.append(y)
+                else:
+                    self.prune_count += 1
+            if counters is not None:
+                self.profiler.count("bound_prunes", depth + 1, self.prune_count - prune_count)
+
+            # recursive search to find all itemsets with the prefix: prefix U {x}
+            if x_primary:
+                self.search(self.reduce(projected_transacs, x_secondary), x_primary, x_secondary)
+
+            self.itemset_buffer.pop()
+
+    @staticmethod
+    def utility_bins(transacs: List[Transaction]) -> Tuple[Dict[int, int], Dict[int, int]]:
+        """
+        Calculate the sub-tree utility and the local utility of each item of a projected
+        database in one pass.
+
+        Parameters:
+            transacs: database projected on the prefix itemset
+
+        Returns:
+            dictionaries of the sub-tree utility and the local utility of each item
+        """
+        sub_tree_utils = {}
+        local_utils = {}
+        for ranks, utils, prefix_util in transacs:
+            # the sub-tree utility of an item adds the utilities of the items after it
+            remaining_util = prefix_util
+            for index in range(len(ranks) - 1, -1, -1):
+                rank = ranks[index]
+                remaining_util += utils[index]
+                sub_tree_utils[rank] = sub_tree_utils.get(rank, 0) + remaining_util
+            # the local utility of an item adds the utilities of all the items
+            for rank in ranks:
+                local_utils[rank] = local_utils.get(rank, 0) + remaining_util
+        return sub_tree_utils, local_utils
+
+    def reduce(self, transacs: List[Transaction], secondary: List[int]) -> List[Transaction]:
+        """
+        Remove the items that are not secondary items from a projected database
+        and merge the transactions that become identical.
+
+        Parameters:
+            transacs: database projected on the prefix itemset
+            secondary: secondary items of the prefix itemset in ascending order
+
+        Returns:
+            the reduced projected database
+        """
+        secondary_set = set(secondary)
+        merged_db = {}
+        for ranks, utils, prefix_util in transacs:
+            kept_ranks = []
+            kept_utils = []
+            for rank, util in zip(ranks, utils):
+                if rank in secondary_set:
+                    kept_ranks.append(rank)
+                    kept_utils.append(util)
+            if kept_ranks:
+                self.merge(merged_db, tuple(kept_ranks), kept_utils, prefix_util)
+        return [(ranks, utils, prefix_util) for ranks, (utils, prefix_util) in merged_db.items()]
+
+    @staticmethod
+    def merge(
+        merged_db: Dict[Tuple[int, ...], list],
+        ranks: Tuple[int, ...],
+        utils: List[int],
+        prefix_util: int,
+    ) -> None:
+        """
+        Add a transaction to a database keyed by item ranks, adding up the item utilities
+        and prefix utilities of transactions with the same items.
+
+        Parameters:
+            merged_db: dictionary of item ranks and their [utilities, prefix utility]
+            ranks: ranks of the items of the transaction in ascending order
+            utils: utility of each item of the transaction
+            prefix_util: utility of the prefix itemset in the transaction
+        """
+        merged = merged_db.get(ranks)
+        if merged is None:
+            merged_db[ranks] = [utils, prefix_util]
+        else:
+            merged_utils = merged[0]
+            for index in range(len(utils)):
+                merged_utils[index] += utils[index]
+            merged[1] += prefix_util
+
+    def output(self, util: int) -> None:
+        """
+        Write the itemset in the itemset buffer and it's utility to self.output_file.
+
+        Parameters:
+            util: utility of the itemset
+        """
+        self.hui_count += 1
+        line = [str(item) for item in self.itemset_buffer]
+        line.append("#UTIL:")
+        line.append(str(util))
+        self.output_file.write(" ".join(line) + "\n")
+
+    def print_stats(self) -> None:
+        """
+        Print statistics for the EFIM algorithm.
+        """
+        print("===============EFIM ALGORITHM STATS===============")
+        print(f"total runtime (ms): {self.runtime}")
+        print(f"high utility itemset count: {self.hui_count}")
+        print(f"candidate itemset count: {self.candidate_count}")
+        print(f"pruned itemset count: {self.prune_count}")
+        print(f"maximum memory used (MB): {self.mem_usage}")
+        print(f"total transaction utility: {self.total_trans_util}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mine high utility itemsets with EFIM.")
+    parser.add_argument("input_path", help="relative path to the data file")
+    parser.add_argument("output_path", help="relative path to the output file")
+    parser.add_argument("minutil", type=int, help="minimum utility")
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="path to a JSON file to write the time and memory of each phase"
+        " and the counters per search depth to",
+    )
+    parser.add_argument(
+        "--experiment-csv",
+        default=None,
+        help="path to a csv file of experiments to append the statistics of the run to",
+    )
+    args = parser.parse_args()
+    efim = EFIM(
+        args.input_path,
+        args.output_path,
+        args.minutil,
+        profiler=Profiler(depth_counters=args.profile is not None),
+    )
+    efim.run()
+    efim.print_stats()
+    if args.profile is not None:
+        dump_profile(args.profile, efim)
+    if args.experiment_csv is not None:
+        log_experiment(args.experiment_csv, efim)
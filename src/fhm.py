@@ -1,10 +1,133 @@
 import os
-import sys
 import time
 import csv
-from memory_profiler import memory_usage
-from typing import Union, List
-from fhm_utils import UtilList, UtilListElem, ItemUtilPair
+import shutil
+import tempfile
+import argparse
+import multiprocessing
+import heapq
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, Union, List, Tuple
+from fhm_utils import UtilList, LazyUtilList, EUCS, GALLOP_RATIO, gallop
+from dataset import load
+from instrument import Profiler, dump_profile
+from sinks import (
+    ResultSink,
+    TextSink,
+    BinarySink,
+    QueueSink,
+    ThresholdSink,
+    SinkClosed,
+    read_part,
+)
+
+# pruning strategies of the search, each of which can be switched off:
+#   twu: drop the items whose TWU is below minutil
+#   eucs: skip the extensions y of prefix U {x} whose pair {x, y} has a TWU below minutil
+#   la: abandon the construction of the utility list of prefix U {x, y} as soon as the
+#       elements of prefix U {x} not matched in prefix U {y} leave too little utility (LA-prune)
+#   bound: skip the extensions of an itemset whose iutils plus rutils are below minutil
+PRUNING_STRATEGIES = ("twu", "eucs", "la", "bound")
+
+# FHM instance searched by the worker processes of a parallel search, the event that stops
+# their searches and the directory of their part files; it is set before the pool is forked so
+# that workers inherit its utility lists and EUCS instead of unpickling them
+_shared_fhm = None
+
+# sink of the current worker process, writing to its own part file
+_worker_sink = None
+
+# number of iterations of the search between two checks of its deadline and cancellation token
+# and of whether progress is due
+CHECK_INTERVAL = 256
+
+
+class SearchStopped(Exception):
+    """
+    Raised by the search of FHM to stop before it has searched every itemset.
+
+    Attributes:
+        reason: "time budget" if its time budget is spent, "max huis" if it has found
+            max_huis itemsets, or "cancelled" if its cancellation token is set
+    """
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AnyEvent:
+    """
+    Cancellation token that is set once any of several tokens is set.
+    """
+
+    def __init__(self, *events: threading.Event) -> None:
+        self.events = events
+
+    def is_set(self) -> bool:
+        return any(event.is_set() for event in self.events)
+
+
+class Progress:
+    """
+    Progress of the search of FHM over its top-level branches (the itemsets that start with
+    each promising item), passed to its progress callback.
+
+    Attributes:
+        branches_done: number of top-level branches searched
+        branch_count: number of top-level branches
+        bound_done: sum of the upper bounds (iutils plus rutils) of the branches searched
+        bound_total: sum of the upper bounds of all the branches
+        hui_count: number of high utility itemsets found
+        elapsed: seconds since the search started
+        done: whether the search is over
+        stop_reason: reason the search stopped early (see SearchStopped), or None
+    """
+
+    def __init__(
+        self,
+        branches_done: int,
+        branch_count: int,
+        bound_done: int,
+        bound_total: int,
+        hui_count: int,
+        elapsed: float,
+        done: bool = False,
+        stop_reason: Union[str, None] = None,
+    ) -> None:
+        self.branches_done = branches_done
+        self.branch_count = branch_count
+        self.bound_done = bound_done
+        self.bound_total = bound_total
+        self.hui_count = hui_count
+        self.elapsed = elapsed
+        self.done = done
+        self.stop_reason = stop_reason
+
+    @property
+    def fraction(self) -> float:
+        """
+        Fraction of the search done, weighting each branch by its upper bound.
+        """
+        return self.bound_done / self.bound_total if self.bound_total else 1.0
+
+    @property
+    def hui_rate(self) -> float:
+        """
+        High utility itemsets found per second.
+        """
+        return self.hui_count / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        line = (
+            f"{self.branches_done}/{self.branch_count} branches"
+            f" ({self.fraction:.1%} of the upper bound), {self.hui_count} high utility itemsets"
+            f" ({self.hui_rate:.0f}/s) in {self.elapsed:.1f} s"
+        )
+        if self.stop_reason is not None:
+            line += f", stopped early ({self.stop_reason})"
+        return line
 
 
 class FHM:
@@ -15,276 +138,853 @@ class FHM:
         input_path: relative path to the data file
         output_path: relative path to the output file
         minutil: minimum utility
-        output_file: output file to write high utility itemsets
-        itemset_buffer_size: size for itemset buffer
-        itemset_buffer: buffer for itemsets
-        EUCS: Estimated Utility Co-Occurrence Structure
+        sink: destination of the high utility itemsets, by default a text file at output_path
+        itemset_buffer: items of the prefix currently being extended
+        items: items with TWU >= minutil in order of ascending TWU, indexed by their rank
+        EUCS: Estimated Utility Co-Occurrence Structure over the ranks of the items
         mem_usage: maximum memory usage of algorithm
         hui_count: number of high utility itemsets
         candidate_count: number of candidate high utility itemsets
         prune_count: number of itemsets pruned
+        pruning: pruning strategies of PRUNING_STRATEGIES that are enabled
+        prune_counts: number of itemsets pruned by each strategy of PRUNING_STRATEGIES
         runtime: total runtime of the algorithm
+        profiler: wall time, CPU time and peak memory of each phase of the algorithm
+            ("TWU scan", "list/EUCS build", "search" and "output"), and optionally counters
+            per search depth
         total_trans_util: total transaction utility of the dataset
+        workers: number of processes used to search the top-level branches
+        util_lists: utility lists of the items in order of ascending TWU
+        top_k: number of itemsets with the highest utility to mine instead of all the
+            itemsets with utility >= minutil, or None
+        top_huis: min-heap of (utility, discovery order, itemset) for the best itemsets found
+        max_memory: budget (MB) for the utility lists held by the search, or None; past it,
+            the utility lists of extensions are constructed when they are visited
+        live_bytes: bytes held by the utility lists on the search stack
+        time_budget: seconds the run may take before its search stops, or None
+        max_huis: number of high utility itemsets after which the search stops, or None
+        cancel: cancellation token (e.g. a threading.Event) that stops the search once set,
+            or None
+        progress: callback called with a Progress every progress_interval seconds
+            of the search and once it is over, or None
+        progress_interval: seconds between two calls of the progress callback
+        stop_reason: reason the last search stopped early (see SearchStopped),
+            or None if it searched every itemset
+        finished_branches: items whose top-level branches the last search finished
     """
 
-    def __init__(self, input_path: str, output_path: str, minutil: int) -> None:
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        minutil: int,
+        workers: int = 1,
+        top_k: Union[int, None] = None,
+        sink: Union[ResultSink, None] = None,
+        max_memory: Union[float, None] = None,
+        profiler: Union[Profiler, None] = None,
+        pruning: Union[Iterable[str], None] = None,
+        time_budget: Union[float, None] = None,
+        max_huis: Union[int, None] = None,
+        cancel: Union[threading.Event, None] = None,
+        progress: Union[Callable[[Progress], None], None] = None,
+        progress_interval: float = 1.0,
+    ) -> None:
         """
         Constructor for FHM.
 
         Parameters:
             input_path: relative path to the data file
             output_path: relative path to the output file
-            minutil: minimum utility
+            minutil: minimum utility; in top-k mode, the threshold the search starts from
+            workers: number of processes used to search the top-level branches
+            top_k: number of itemsets with the highest utility to mine, or None to mine
+                all the itemsets with utility >= minutil
+            sink: destination of the high utility itemsets, or None to write them
+                to output_path in the text format
+            max_memory: budget (MB) for the utility lists held by the search, or None
+                to always construct the utility lists of all the extensions of a prefix
+            profiler: profiler of the phases of the algorithm, or None for one
+                without counters per search depth
+            pruning: pruning strategies of PRUNING_STRATEGIES to enable, or None for all of them
+            time_budget: seconds the run may take, or None; past it, the search stops
+                and the itemsets found so far are kept
+            max_huis: number of high utility itemsets after which the search stops, or None;
+                not available in top-k mode
+            cancel: cancellation token (e.g. a threading.Event) that stops the search once set
+            progress: callback called with a Progress every progress_interval seconds
+                of the search and once it is over, or None
+            progress_interval: seconds between two calls of the progress callback
         """
+        if max_huis is not None and top_k is not None:
+            raise ValueError("max_huis cannot be used in top-k mode")
+        if pruning is None:
+            pruning = PRUNING_STRATEGIES
+        for strategy in pruning:
+            if strategy not in PRUNING_STRATEGIES:
+                raise ValueError(f"unknown pruning strategy {strategy}")
         self.input_path = input_path
         self.output_path = output_path
         self.minutil = minutil
-        self.output_file = None
-        self.itemset_buffer_size = 200
+        self.workers = workers
+        self.top_k = top_k
+        self.top_huis = []
+        self.util_lists = []
+        self.sink = sink if sink is not None else TextSink(output_path)
         self.itemset_buffer = []
-        self.EUCS = {}
+        self.max_memory = max_memory
+        self.live_bytes = 0
+        self.items = []
+        self.EUCS = None
         self.mem_usage = 0
         self.hui_count = 0
         self.candidate_count = 0
         self.prune_count = 0
+        self.pruning = frozenset(pruning)
+        self.prune_counts = dict.fromkeys(PRUNING_STRATEGIES, 0)
         self.runtime = 0
+        self.profiler = profiler if profiler is not None else Profiler()
         self.total_trans_util = 0
+        self.time_budget = time_budget
+        self.max_huis = max_huis
+        self.cancel = cancel
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.deadline = None
+        self.stop_reason = None
+        self.finished_branches = []
+        self.branch_count = 0
+        self.bound_done = 0
+        self.bound_total = 0
+        self.search_start = 0.0
+        self.next_progress = 0.0
 
     def run(self) -> None:
         """
-        Wrapper of the fhm() method that tracks memory usage.
+        Wrapper of the fhm() method that records the maximum memory usage.
         """
-        # get max memory usage for one run of FHM
-        self.mem_usage = memory_usage(self.fhm, max_usage=True, max_iterations=1)
+        # max memory usage of the phases of one run of FHM, including the worker processes
+        self.fhm()
+        self.mem_usage = self.profiler.peak_memory_mb
 
     def fhm(self) -> None:
         """
         Run the FHM algorithm.
         """
         start_time = time.time()  # start timing algorithm
+        if self.time_budget is not None:
+            self.deadline = time.monotonic() + self.time_budget
+        self.stop_reason = None
+        self.profiler.phase("TWU scan")
 
-        # initialize buffer to store itemsets;
+        # initialize buffer to store the prefix itemset;
         # we can use such a buffer because FHM is a depth first search algorithm
-        self.itemset_buffer = [0] * self.itemset_buffer_size
-
-        # first DB scan to get TWU of each item
-        item_TWU_dict = {}  # dictionary of items and their TWU
-        with open(self.input_path) as db:
-            for transac in db:
-                transac_data = transac.split(":")
-                items = transac_data[0].split()
-                transac_util = int(transac_data[1])
-                for item in items:
-                    item = int(item)
-                    if item in item_TWU_dict:
-                        item_TWU_dict[item] += transac_util
-                    else:
-                        item_TWU_dict[item] = transac_util
+        self.itemset_buffer = []
+        self.live_bytes = 0
+
+        # first DB scan to get TWU of each item; the binary layout of DB already holds them,
+        # so DB is only scanned in top-k mode, for the utility of each item
+        item_util_dict = {}  # dictionary of items and their utility (top-k mode only)
+        with load(self.input_path) as db:
+            item_TWU_dict = db.item_TWUs()  # dictionary of items and their TWU
+            if self.top_k is not None:
+                for items, _, item_utils in db:
+                    for item, util in zip(items, item_utils):
+                        item_util_dict[item] = item_util_dict.get(item, 0) + util
 
-        # initialize list of utility lists and dictionary of itemsets and their utility lists
-        # that only contain items with TWU >= minutil
-        util_lists = []
-        item_util_list_dict = {}
+        # in top-k mode, there are at least k itemsets with utility >= the k-th highest
+        # utility of a 1-itemset, so it is a safe starting threshold
+        if self.top_k is not None:
+            self.raise_minutil(item_util_dict.values())
+
+        # recode the items with TWU >= minutil to their ranks in order of ascending TWU
+        # and initialize their utility lists
+        self.profiler.phase("list/EUCS build")
+        promising_items = []
         for item, TWU in item_TWU_dict.items():
-            if TWU >= self.minutil:
-                util_list = UtilList(item)
-                util_lists.append(util_list)
-                item_util_list_dict[item] = util_list
+            if TWU >= self.minutil or "twu" not in self.pruning:
+                promising_items.append(item)
             else:
-                self.prune_count += 1
-
-        # sort util_lists in order of ascending TWU
-        util_lists.sort(key=lambda ul: item_TWU_dict[ul.item])
+                self.count_prunes("twu")
+        promising_items.sort(key=lambda item: item_TWU_dict[item])
+        self.items = promising_items
+        item_rank_dict = {item: rank for rank, item in enumerate(promising_items)}
+        util_lists = [UtilList(rank) for rank in range(len(promising_items))]
+        self.EUCS = EUCS(len(promising_items))
 
         # second DB scan to populate utility lists and EUCS
-        with open(self.input_path) as db:
-            for tid, transac in enumerate(db):
-                transac_data = transac.split(":")
-                items = transac_data[0].split()
-                transac_util = int(transac_data[1])
+        pair_util_dict = {}  # dictionary of pairs of ranks x * n + y and their utility (top-k mode)
+        n_items = len(promising_items)
+        with load(self.input_path) as db:
+            for tid, (items, transac_util, item_utils) in enumerate(db):
                 self.total_trans_util += transac_util
-                item_utils = transac_data[2].split()
 
-                # get items that have TWU >= minutil
-                item_pairs = []
+                # get (rank, util) pairs of items that have TWU >= minutil
+                rank_pairs = []
                 rutil = 0
-                for i in range(len(items)):
-                    item_util_pair = ItemUtilPair(int(items[i]), int(item_utils[i]))
-                    if item_TWU_dict[item_util_pair.item] >= self.minutil:
-                        item_pairs.append(item_util_pair)
-                        rutil += item_util_pair.util
-
-                # sort item_pairs in order of ascending TWU
-                item_pairs.sort(key=lambda p: item_TWU_dict[p.item])
-
-                # populate the utility lists in item_util_list_dict with elements
-                for i in range(len(item_pairs)):
-                    rutil -= item_pairs[i].util
-                    util_list_elem = UtilListElem(tid, item_pairs[i].util, rutil)
-                    item_util_list_dict[item_pairs[i].item].add_elem(util_list_elem)
-
-                    # populate EUCS
-                    for j in range(i + 1, len(item_pairs)):
-                        item = item_pairs[i].item
-                        next_item = item_pairs[j].item
-                        if item in self.EUCS:
-                            if next_item in self.EUCS[item]:
-                                self.EUCS[item][next_item] += transac_util
-                            else:
-                                self.EUCS[item][next_item] = transac_util
-                        else:
-                            self.EUCS[item] = {next_item: transac_util}
-
-        # recursively search for itemsets
-        with open(self.output_path, "w") as out:
-            self.output_file = out
-            self.search(0, None, util_lists)
+                for item, util in zip(items, item_utils):
+                    rank = item_rank_dict.get(item)
+                    if rank is not None:
+                        rank_pairs.append((rank, util))
+                        rutil += util
+
+                # sort rank_pairs in order of ascending TWU
+                rank_pairs.sort()
+
+                # append (tid, iutil, rutil) to the utility lists of the items
+                for rank, util in rank_pairs:
+                    rutil -= util
+                    util_lists[rank].add_elem(tid, util, rutil)
+
+                # populate EUCS
+                self.EUCS.add_transaction(tuple([rank for rank, _ in rank_pairs]), transac_util)
+
+                # in top-k mode, add up the utility of each pair of items;
+                # unlike their EUCS values, these are utilities and not upper bounds
+                if self.top_k is not None:
+                    for i in range(len(rank_pairs)):
+                        rank, util = rank_pairs[i]
+                        base = rank * n_items
+                        for next_rank, next_util in rank_pairs[i + 1 :]:
+                            key = base + next_rank
+                            pair_util_dict[key] = pair_util_dict.get(key, 0) + util + next_util
+        self.EUCS.finalize()
+
+        # search for itemsets depth first
+        self.profiler.phase("search")
+        self.util_lists = util_lists
+        self.start_progress(util_lists)
+        if self.top_k is None:
+            self.sink.open()
+        try:
+            if self.top_k is not None:
+                item_utils = [util_list.sum_iutils for util_list in util_lists]
+                pair_utils = list(pair_util_dict.values())
+                del pair_util_dict
+                self.search_top_k(util_lists, item_utils + pair_utils)
+            elif self.workers > 1:
+                self.parallel_search()
+            else:
+                self.search(None, util_lists)
+        except SearchStopped as stop:
+            # the itemsets found so far are kept
+            self.stop_reason = stop.reason
+        finally:
+            self.profiler.phase("output")
+            if self.top_k is None:
+                self.sink.close()
+
+        # in top-k mode, write the best itemsets found once the search is over
+        if self.top_k is not None:
+            self.output_top_huis()
+        self.profiler.stop()
+        if self.progress is not None:
+            self.report_progress(self.hui_count, done=True)
 
         self.runtime = (time.time() - start_time) * 1_000  # stop timing algorithm
 
     def search(
         self,
-        prefix_len: int,
         prefix_UL: Union[UtilList, None],
-        prefix_ext_ULs: List[UtilList],
+        prefix_ext_ULs: List[Union[UtilList, LazyUtilList]],
+        extensions: Union[Iterable[int], None] = None,
+        prefix_length: int = 0,
     ) -> None:
         """
-        Recursive method to search all high utility itemsets and output them into a file.
+        Search all high utility itemsets that extend the prefix and output them to self.sink.
+        The search is depth first with an explicit stack, so its depth is not bounded by the
+        recursion limit, and the utility list of an extension is released once its branch
+        has been searched.
 
         Parameters:
-            prefix_len: length of the prefix itemset
             prefix_UL: utility list of the prefix itemset
             prefix_ext_ULs: list of utility lists for each extension of the prefix itemset
+            extensions: indices in prefix_ext_ULs of the extensions whose branches are searched,
+                in order, or None to search all of them
+            prefix_length: length of the prefix itemset, for the counters per search depth
         """
-        # for each extension x of the prefix
-        for i in range(len(prefix_ext_ULs)):
-            prefix_x_UL = prefix_ext_ULs[i]  # utility list for the itemset prefix U {x}
+        if extensions is None:
+            extensions = range(len(prefix_ext_ULs))
+        itemset_buffer = self.itemset_buffer
+        items = self.items
+        counters = self.profiler.depth_counters
+        bound = "bound" in self.pruning
+        checks = self.deadline is not None or self.cancel is not None or self.progress is not None
+        countdown = 1
+
+        # the branches of the items of a search from the empty prefix are the top-level ones
+        top_level = prefix_UL is None
+        branch = None
+
+        # each frame holds the utility list of a prefix, the utility lists of its extensions,
+        # the indices of the extensions left to search and the bytes held by the prefix's list;
+        # the lists of the first frame belong to the caller and are never released
+        stack = [(prefix_UL, prefix_ext_ULs, iter(extensions), 0)]
+        while stack:
+            if checks:
+                countdown -= 1
+                if countdown == 0:
+                    countdown = CHECK_INTERVAL
+                    self.checkpoint()
+
+            prefix_UL, ext_ULs, indices, _ = frame = stack[-1]
+            i = next(indices, None)
+
+            # back at the first frame, the previous top-level branch has been searched
+            if top_level and len(stack) == 1:
+                if branch is not None:
+                    self.finish_branch(prefix_ext_ULs[branch])
+                branch = i
+
+            # every extension of the prefix has been searched: drop the prefix
+            if i is None:
+                stack.pop()
+                if stack:
+                    itemset_buffer.pop()
+                    self.live_bytes -= frame[3]
+                continue
+
+            # utility list for the itemset prefix U {x}
+            prefix_x_UL = ext_ULs[i]
+            if len(stack) > 1:
+                ext_ULs[i] = None
+                if isinstance(prefix_x_UL, LazyUtilList):
+                    prefix_x_UL = self.resolve(prefix_x_UL, prefix_length + len(stack))
+                    self.live_bytes += prefix_x_UL.nbytes()
+                x_bytes = prefix_x_UL.nbytes()
+            else:
+                x_bytes = 0
 
             # output itemset if it has high utility
             if prefix_x_UL.sum_iutils >= self.minutil:
-                self.output(prefix_len, prefix_x_UL.item, prefix_x_UL.sum_iutils)
+                self.output(items[prefix_x_UL.item], prefix_x_UL.sum_iutils)
 
             # condition to explore extensions of prefix U {x}
-            if prefix_x_UL.sum_iutils + prefix_x_UL.sum_rutils >= self.minutil:
-                prefix_x_ext_ULs = []  # utility lists for the extensions of prefix U {x}
-
-                # for each extension y of the prefix such that y > x
-                for j in range(i + 1, len(prefix_ext_ULs)):
-                    prefix_y_UL = prefix_ext_ULs[j]  # utility list for the itemset prefix U {y}
-                    if (
-                        prefix_x_UL.item in self.EUCS
-                        and prefix_y_UL.item in self.EUCS[prefix_x_UL.item]
-                    ):
-                        # condition to explore extensions of prefix U {x, y}
-                        if self.EUCS[prefix_x_UL.item][prefix_y_UL.item] >= self.minutil:
-                            self.candidate_count += 1
-
-                            # construct utility list for the itemset prefix U {x, y}
-                            # and append it to the utility lists for the extensions of prefix U {x}
-                            prefix_x_y_UL = self.construct(prefix_UL, prefix_x_UL, prefix_y_UL)
-                            prefix_x_ext_ULs.append(prefix_x_y_UL)
-                        else:
-                            self.prune_count += 1
-
-                # add item x to prefix in order to create new prefix
-                try:
-                    self.itemset_buffer[prefix_len] = prefix_x_UL.item
-                except IndexError:
-                    sys.exit(
-                        f"Error: itemset_buffer_size ({self.itemset_buffer_size}) is too small"
+            if prefix_x_UL.sum_iutils + prefix_x_UL.sum_rutils >= self.minutil or not bound:
+                prefix_x_ext_ULs = self.extensions(
+                    prefix_UL, prefix_x_UL, ext_ULs, i, prefix_length + len(stack) + 1
+                )
+                if prefix_x_ext_ULs:
+                    # add item x to prefix in order to create new prefix
+                    # and search all itemsets with the prefix: prefix U {x}
+                    itemset_buffer.append(items[prefix_x_UL.item])
+                    stack.append(
+                        (prefix_x_UL, prefix_x_ext_ULs, iter(range(len(prefix_x_ext_ULs))), x_bytes)
                     )
+                    continue
+            else:
+                self.count_prunes("bound")
+                if counters is not None:
+                    self.profiler.count("bound_prunes", prefix_length + len(stack))
+            self.live_bytes -= x_bytes
 
-                # recursive search to find all itemsets with the prefix: prefix U {x, y}
-                self.search(prefix_len + 1, prefix_x_UL, prefix_x_ext_ULs)
+    def extensions(
+        self,
+        prefix_UL: Union[UtilList, None],
+        prefix_x_UL: UtilList,
+        prefix_ext_ULs: List[Union[UtilList, LazyUtilList, None]],
+        i: int,
+        depth: int,
+    ) -> List[Union[UtilList, LazyUtilList]]:
+        """
+        Get the utility lists for the extensions of the itemset prefix U {x}, where x is the
+        i-th extension of prefix. If constructing them would exceed self.max_memory, they are
+        returned as LazyUtilLists that are constructed when their branch is searched.
 
-            else:
-                self.prune_count += 1
+        Parameters:
+            prefix_UL: utility list of the prefix itemset
+            prefix_x_UL: utility list of the itemset prefix U {x}
+            prefix_ext_ULs: list of utility lists for each extension of the prefix itemset
+            i: index of the extension x in prefix_ext_ULs
+            depth: length of the itemsets prefix U {x, y}, for the counters per search depth
+
+        Returns:
+            utility lists for the itemsets prefix U {x, y} whose TWU is >= minutil
+        """
+        counters = self.profiler.depth_counters
+        minutil = self.minutil if "eucs" in self.pruning else 1
+
+        # utility lists for the itemsets prefix U {y} with y > x that may extend prefix U {x}
+        candidate_ULs = []
+        eucs_prunes = 0
+        for j in range(i + 1, len(prefix_ext_ULs)):
+            prefix_y_UL = prefix_ext_ULs[j]  # utility list for the itemset prefix U {y}
+            x_y_TWU = self.EUCS.get(prefix_x_UL.item, prefix_y_UL.item)
+            if x_y_TWU > 0:
+                # condition to explore extensions of prefix U {x, y}
+                if x_y_TWU >= minutil:
+                    self.candidate_count += 1
+                    candidate_ULs.append(prefix_y_UL)
+                else:
+                    eucs_prunes += 1
+        if eucs_prunes:
+            self.count_prunes("eucs", eucs_prunes)
+        if counters is not None:
+            self.profiler.count("eucs_prunes", depth, eucs_prunes)
+
+        # the tids of prefix U {x, y} are a subset of the tids of prefix U {x}, which bounds
+        # the size of its utility list
+        if self.max_memory is not None:
+            estimate = prefix_x_UL.nbytes() * len(candidate_ULs)
+            if self.live_bytes + estimate > self.max_memory * 1024 * 1024:
+                return [
+                    LazyUtilList(prefix_UL, prefix_x_UL, prefix_y_UL)
+                    for prefix_y_UL in candidate_ULs
+                ]
+
+        # construct utility list for each itemset prefix U {x, y}; with LA-prune, the
+        # itemsets whose construction is abandoned are dropped along with their extensions
+        la_minutil = self.minutil if "la" in self.pruning else None
+        prefix_x_ext_ULs = []
+        for prefix_y_UL in candidate_ULs:
+            if isinstance(prefix_y_UL, LazyUtilList):
+                prefix_y_UL = self.resolve(prefix_y_UL, depth - 1)
+            prefix_x_y_UL = self.construct(prefix_UL, prefix_x_UL, prefix_y_UL, la_minutil)
+            if prefix_x_y_UL is None:
+                continue
+            self.live_bytes += prefix_x_y_UL.nbytes()
+            prefix_x_ext_ULs.append(prefix_x_y_UL)
+        la_prunes = len(candidate_ULs) - len(prefix_x_ext_ULs)
+        if la_prunes:
+            self.count_prunes("la", la_prunes)
+        if counters is not None:
+            self.profiler.count("la_prunes", depth, la_prunes)
+            self.profiler.count("joins", depth, len(candidate_ULs))
+            self.profiler.count("elements", depth, sum(map(len, prefix_x_ext_ULs)))
+        return prefix_x_ext_ULs
+
+    def resolve(self, util_list: Union[UtilList, LazyUtilList], depth: int) -> UtilList:
+        """
+        Construct a utility list that was deferred, along with the deferred utility lists
+        it is constructed from.
+
+        Parameters:
+            util_list: utility list, constructed or not
+            depth: length of the itemset of util_list, for the counters per search depth
+
+        Returns:
+            the constructed utility list
+        """
+        deferred = []
+        while isinstance(util_list, LazyUtilList):
+            deferred.append(util_list)
+            util_list = util_list.prefix_y_UL
+        # the k-th deferred list is for an itemset of length depth - k
+        for k in range(len(deferred) - 1, -1, -1):
+            lazy_UL = deferred[k]
+            util_list = self.construct(lazy_UL.prefix_UL, lazy_UL.prefix_x_UL, util_list)
+            if self.profiler.depth_counters is not None:
+                self.profiler.count("joins", depth - k)
+                self.profiler.count("elements", depth - k, len(util_list))
+        return util_list
+
+    def parallel_search(self) -> None:
+        """
+        Search the top-level branches (the itemsets that start with each promising item)
+        in a pool of self.workers processes and merge their outputs into self.sink. Each
+        worker writes the itemsets of its branches to a part file in a temporary directory,
+        which is removed once the outputs are merged.
+        """
+        global _shared_fhm
+        util_lists = self.util_lists
+        n = len(util_lists)
+
+        # hand out the most expensive branches first, estimating the cost of a branch
+        # as the length of its utility list times the number of extensions it is joined with
+        branches = sorted(range(n), key=lambda i: len(util_lists[i]) * (n - i), reverse=True)
+
+        # fork the workers so that they inherit this FHM instance and the event that stops
+        # their searches; once it is set, they return the branches they are searching
+        # as they stand and the remaining branches right away
+        context = multiprocessing.get_context("fork")
+        stop = context.Event()
+        part_dir = tempfile.mkdtemp(prefix="fhm-parts-")
+        _shared_fhm = (self, stop, part_dir)
+        results = []
+        try:
+            with context.Pool(self.workers) as pool:
+                hui_count = 0
+                for result in pool.imap_unordered(_search_branch, branches):
+                    results.append(result)
+                    hui_count += result[4]
+                    if result[8] is None:
+                        self.finish_branch(util_lists[result[0]])
+                    reason = self.stop_check() or result[8]
+                    if reason is None and self.max_huis is not None and hui_count >= self.max_huis:
+                        reason = "max huis"
+                    if reason is not None and self.stop_reason is None:
+                        self.stop_reason = reason
+                        stop.set()
+                    if self.progress is not None and time.monotonic() >= self.next_progress:
+                        self.report_progress(hui_count)
+        except BaseException:
+            shutil.rmtree(part_dir, ignore_errors=True)
+            raise
+        finally:
+            _shared_fhm = None
+
+        # write the itemsets of the branches in order so that the result
+        # is the same as the one written by a single process
+        results.sort()
+        self.finished_branches = []
+        self.bound_done = 0
+        part_files = {}
+        try:
+            for result in results:
+                i, part_path, start, end, hui_count, candidate_count, prune_counts, counters = (
+                    result[:8]
+                )
+                stop_reason = result[8]
+                if part_path not in part_files:
+                    part_files[part_path] = open(part_path, "rb")
+                huis = read_part(part_files[part_path], start, end)
+                if self.max_huis is not None and self.hui_count + hui_count > self.max_huis:
+                    hui_count = self.max_huis - self.hui_count
+                    huis = huis[:hui_count]
+                    stop_reason = "max huis"
+                for itemset, util in huis:
+                    self.sink.write(itemset, util)
+                if stop_reason is None:
+                    self.finish_branch(util_lists[i])
+                self.hui_count += hui_count
+                self.candidate_count += candidate_count
+                for strategy, count in prune_counts.items():
+                    self.count_prunes(strategy, count)
+                self.profiler.merge_counters(counters)
+        finally:
+            for part_file in part_files.values():
+                part_file.close()
+            shutil.rmtree(part_dir, ignore_errors=True)
+
+        # in top-k mode, each worker kept the best itemsets of its own branches with its own
+        # threshold, so the k best itemsets overall are among the ones the workers returned
+        if self.top_k is not None:
+            worker_top_huis = {}
+            for result in results:
+                for util, _, itemset in result[-1]:
+                    worker_top_huis[itemset] = util
+            self.top_huis = []
+            for itemset, util in worker_top_huis.items():
+                self.keep_top_hui(itemset, util)
 
-    def output(self, prefix_len: int, item: int, util: int) -> None:
+    def output(self, item: int, util: int) -> None:
         """
-        Write the given high utility itemset and it's utility to self.output_file.
+        Write the given high utility itemset and it's utility to self.sink.
 
         Parameters:
-            prefix_len: length of the prefix itemset
-            item: item extension of the prefix itemset
+            item: item extension of the prefix itemset in self.itemset_buffer
             util: utility of the itemset
         """
+        # in top-k mode, keep the itemset in the heap of the best itemsets instead
+        if self.top_k is not None:
+            self.keep_top_hui(tuple(self.itemset_buffer) + (item,), util)
+            return
+
         self.hui_count += 1
-        line = []
-        for i in range(prefix_len):
-            line.append(str(self.itemset_buffer[i]))
-        line.append(str(item))
-        line.append("#UTIL:")
-        line.append(str(util))
-        self.output_file.write(" ".join(line) + "\n")
+        itemset = self.itemset_buffer + [item]
+        self.sink.write(itemset, util)
+        if self.max_huis is not None and self.hui_count >= self.max_huis:
+            raise SearchStopped("max huis")
+
+    def search_top_k(
+        self,
+        util_lists: List[UtilList],
+        utils: Iterable[int],
+        ranks: Union[Iterable[int], None] = None,
+    ) -> None:
+        """
+        Search the k itemsets with the highest utility from the utility lists of the promising
+        items, keeping them in self.top_huis. The threshold starts at the k-th highest of the
+        utilities of itemsets known before the search, and the top-level branches are
+        independent, so the ones with the highest upper bound are searched first to raise it
+        sooner.
+
+        Parameters:
+            util_lists: utility list of each promising item, indexed by rank
+            utils: utilities of distinct itemsets (e.g. of the 1- and 2-itemsets)
+            ranks: ranks of the items whose branches are searched, or None for all of them;
+                a search in a pool of workers searches all of them
+        """
+        self.raise_minutil(utils)
+        if self.workers > 1:
+            self.parallel_search()
+            return
+        if ranks is None:
+            ranks = range(len(util_lists))
+        branches = sorted(
+            ranks,
+            key=lambda i: util_lists[i].sum_iutils + util_lists[i].sum_rutils,
+            reverse=True,
+        )
+        self.search(None, util_lists, branches)
+
+    def raise_minutil(self, utils: Iterable[int]) -> None:
+        """
+        Raise minutil to the k-th highest of the utilities of distinct itemsets, if there are
+        at least k of them, since the k itemsets with the highest utility must reach it.
+
+        Parameters:
+            utils: utilities of distinct itemsets
+        """
+        best_utils = heapq.nlargest(self.top_k, utils)
+        if len(best_utils) == self.top_k and best_utils[-1] > self.minutil:
+            self.minutil = best_utils[-1]
+
+    def keep_top_hui(self, itemset: tuple, util: int) -> None:
+        """
+        Add an itemset to the heap of the k best itemsets found, evicting the worst one when
+        the heap is full, and raise minutil to the lowest utility in a full heap so that the
+        search immediately prunes with it.
+
+        Parameters:
+            itemset: items of the itemset
+            util: utility of the itemset
+        """
+        heapq.heappush(self.top_huis, (util, -self.hui_count, itemset))
+        self.hui_count += 1
+        if len(self.top_huis) > self.top_k:
+            heapq.heappop(self.top_huis)
+        if len(self.top_huis) == self.top_k and self.top_huis[0][0] > self.minutil:
+            self.minutil = self.top_huis[0][0]
+
+    def output_top_huis(self) -> None:
+        """
+        Write the k best itemsets found to self.sink in order of descending utility.
+        """
+        self.hui_count = len(self.top_huis)
+        self.sink.open()
+        try:
+            for util, _, itemset in sorted(self.top_huis, reverse=True):
+                self.sink.write(itemset, util)
+        finally:
+            self.sink.close()
+
+    def iter_huis(self) -> Iterator[Tuple[Tuple[int, ...], int]]:
+        """
+        Run FHM in a background thread and yield the high utility itemsets as they are found,
+        without writing them to a file. Closing the iterator early stops the search, through
+        a cancellation token that is set along with self.cancel while the search runs.
+
+        Returns:
+            an iterator of (itemset, utility) for each high utility itemset
+        """
+        results = queue.Queue(maxsize=16)
+        sink = QueueSink(results, batch_size=256)
+        closed = threading.Event()
+        previous_sink, previous_cancel = self.sink, self.cancel
+        self.sink = sink
+        self.cancel = closed if previous_cancel is None else AnyEvent(previous_cancel, closed)
+        done = object()
+        errors = []
+
+        def mine() -> None:
+            try:
+                self.fhm()
+            except SinkClosed:
+                pass
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                sink.put(done)
+
+        thread = threading.Thread(target=mine, daemon=True)
+        thread.start()
+        try:
+            while True:
+                batch = results.get()
+                if batch is done:
+                    break
+                yield from batch
+        finally:
+            closed.set()
+            sink.cancelled.set()
+            thread.join()
+            self.sink, self.cancel = previous_sink, previous_cancel
+        if errors:
+            raise errors[0]
+
+    def stop_check(self) -> Union[str, None]:
+        """
+        Check whether the search must stop because it was cancelled or its time budget is spent.
+
+        Returns:
+            the reason to stop (see SearchStopped), or None to go on
+        """
+        if self.cancel is not None and self.cancel.is_set():
+            return "cancelled"
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "time budget"
+        return None
+
+    def checkpoint(self) -> None:
+        """
+        Stop the search if it was cancelled or its time budget is spent,
+        and report its progress if it is due.
+        """
+        reason = self.stop_check()
+        if reason is not None:
+            raise SearchStopped(reason)
+        if self.progress is not None and time.monotonic() >= self.next_progress:
+            self.report_progress(self.hui_count)
+
+    def start_progress(self, util_lists: List[UtilList]) -> None:
+        """
+        Start tracking the progress of a search over the top-level branches of the items.
+
+        Parameters:
+            util_lists: utility lists of the promising items
+        """
+        self.finished_branches = []
+        self.branch_count = len(util_lists)
+        self.bound_done = 0
+        self.bound_total = sum(
+            [util_list.sum_iutils + util_list.sum_rutils for util_list in util_lists]
+        )
+        self.search_start = time.monotonic()
+        self.next_progress = self.search_start + self.progress_interval
+
+    def finish_branch(self, util_list: UtilList) -> None:
+        """
+        Record that the top-level branch of an item has been searched.
+
+        Parameters:
+            util_list: utility list of the item
+        """
+        self.finished_branches.append(self.items[util_list.item])
+        self.bound_done += util_list.sum_iutils + util_list.sum_rutils
+
+    def report_progress(self, hui_count: int, done: bool = False) -> None:
+        """
+        Call the progress callback with the progress of the search.
+
+        Parameters:
+            hui_count: number of high utility itemsets found
+            done: whether the search is over
+        """
+        now = time.monotonic()
+        self.next_progress = now + self.progress_interval
+        self.progress(
+            Progress(
+                len(self.finished_branches),
+                self.branch_count,
+                self.bound_done,
+                self.bound_total,
+                hui_count,
+                now - self.search_start,
+                done=done,
+                stop_reason=self.stop_reason,
+            )
+        )
+
+    def count_prunes(self, strategy: str, n: int = 1) -> None:
+        """
+        Count itemsets pruned by a pruning strategy.
+
+        Parameters:
+            strategy: pruning strategy of PRUNING_STRATEGIES
+            n: number of itemsets pruned
+        """
+        self.prune_count += n
+        self.prune_counts[strategy] += n
 
     def construct(
-        self, prefix_UL: Union[UtilList, None], prefix_x_UL: UtilList, prefix_y_UL: UtilList
-    ) -> UtilList:
+        self,
+        prefix_UL: Union[UtilList, None],
+        prefix_x_UL: UtilList,
+        prefix_y_UL: UtilList,
+        minutil: Union[int, None] = None,
+    ) -> Union[UtilList, None]:
         """
         Construct the utility list for the itemset prefix U {x, y},
         where x and y are item extension of prefix.
 
+        With minutil (LA-prune), the construction is abandoned as soon as the iutils and
+        rutils of the elements of prefix U {x} that are not matched in prefix U {y} bring the
+        iutils plus rutils of prefix U {x} below minutil: the rest bounds the utility of
+        prefix U {x, y} and of every itemset of the branch of prefix U {x} that contains it.
+
         Parameters:
             prefix_UL: utility list of the prefix itemset
             prefix_x_UL: utility list of the itemset prefix U {x}
             prefix_y_UL: utility list of the itemset prefix U {y}
+            minutil: minimum utility for LA-prune, or None to always construct the list
 
         Returns:
-            utility list of the itemset prefix U {x, y}
+            utility list of the itemset prefix U {x, y}, or None if its construction
+            was abandoned
         """
         # initialize utility list for the itemset prefix U {x, y}
         prefix_x_y_UL = UtilList(prefix_y_UL.item)
+        append_tid = prefix_x_y_UL.tids.append
+        append_iutil = prefix_x_y_UL.iutils.append
+        append_rutil = prefix_x_y_UL.rutils.append
+        sum_iutils = 0
+        sum_rutils = 0
 
-        # for each element ex in the utility list of prefix U {x}
-        for ex in prefix_x_UL.elems:
-            # get element ey in the utility list of prefix U {y} with the same tid
-            ey = self.get_elem_with_tid(prefix_y_UL, ex.tid)
-            if ey is None:
-                continue
+        x_tids, x_iutils, x_rutils = prefix_x_UL.tids, prefix_x_UL.iutils, prefix_x_UL.rutils
+        y_tids, y_iutils, y_rutils = prefix_y_UL.tids, prefix_y_UL.iutils, prefix_y_UL.rutils
+        len_x = len(x_tids)
+        len_y = len(y_tids)
 
-            # case when prefix is the empty set and x and y are 1-itemsets
-            if prefix_UL is None:
-                # create utility list element for prefix U {x, y}
-                # and add it to the utility list of prefix U {x, y}
-                exy = UtilListElem(ex.tid, ex.iutil + ey.iutil, ey.rutil)
-                prefix_x_y_UL.add_elem(exy)
+        # gallop through a list instead of stepping through it when it is much longer
+        # than the list it is being joined with
+        gallop_x = len_x > GALLOP_RATIO * len_y
+        gallop_y = len_y > GALLOP_RATIO * len_x
 
-            # case when prefix is non-empty
-            else:
-                # get element e in the utility list of prefix with the same tid
-                e = self.get_elem_with_tid(prefix_UL, ex.tid)
-                if e is not None:
-                    # create utility list element for prefix U {x, y}
-                    # and add it to the utility list of prefix U {x, y}
-                    exy = UtilListElem(ex.tid, ex.iutil + ey.iutil - e.iutil, ey.rutil)
-                    prefix_x_y_UL.add_elem(exy)
+        # the tids of prefix U {x} and prefix U {y} are both subsets of the tids of prefix,
+        # so the element e of prefix with the same tid is found by moving forward from the last one
+        if prefix_UL is not None:
+            tids, iutils = prefix_UL.tids, prefix_UL.iutils
+            gallop_prefix = len(tids) > GALLOP_RATIO * min(len_x, len_y)
 
-        return prefix_x_y_UL
+        # iutils plus rutils of prefix U {x} left for prefix U {x, y} (LA-prune)
+        if minutil is not None:
+            budget = prefix_x_UL.sum_iutils + prefix_x_UL.sum_rutils
 
-    @staticmethod
-    def get_elem_with_tid(util_list: UtilList, tid: int) -> Union[UtilListElem, None]:
-        """
-        Get the element in util_list that has tid as its transaction ID via binary search.
+        # merge the utility lists of prefix U {x} and prefix U {y} (and prefix) in one pass
+        i = j = k = 0
+        while i < len_x and j < len_y:
+            tid = x_tids[i]
+            y_tid = y_tids[j]
+            if tid < y_tid:
+                next_i = gallop(x_tids, y_tid, i + 1) if gallop_x else i + 1
+                if minutil is not None:
+                    if next_i == i + 1:
+                        budget -= x_iutils[i] + x_rutils[i]
+                    else:
+                        budget -= sum(x_iutils[i:next_i]) + sum(x_rutils[i:next_i])
+                    if budget < minutil:
+                        return None
+                i = next_i
+            elif tid > y_tid:
+                j = gallop(y_tids, tid, j + 1) if gallop_y else j + 1
+            else:
+                # case when prefix is the empty set and x and y are 1-itemsets
+                if prefix_UL is None:
+                    iutil = x_iutils[i] + y_iutils[j]
 
-        Parameters:
-            util_list: utility list to find element with tid
-            tid: transaction ID to find
+                # case when prefix is non-empty
+                else:
+                    if gallop_prefix:
+                        k = gallop(tids, tid, k)
+                    else:
+                        while tids[k] < tid:
+                            k += 1
+                    iutil = x_iutils[i] + y_iutils[j] - iutils[k]
 
-        Returns:
-            the element in the utility list with the given tid or None if no such element is found
-        """
-        elems = util_list.elems
-        first = 0
-        last = len(elems) - 1
-        while first <= last:
-            mid = (first + last) // 2
-            if elems[mid].tid < tid:
-                first = mid + 1
-            elif elems[mid].tid > tid:
-                last = mid - 1
-            else:
-                return elems[mid]
+                # add element for prefix U {x, y} to its utility list
+                rutil = y_rutils[j]
+                append_tid(tid)
+                append_iutil(iutil)
+                append_rutil(rutil)
+                sum_iutils += iutil
+                sum_rutils += rutil
+                i += 1
+                j += 1
+
+        prefix_x_y_UL.sum_iutils = sum_iutils
+        prefix_x_y_UL.sum_rutils = sum_rutils
+        return prefix_x_y_UL
 
     def print_stats(self) -> None:
         """
@@ -295,8 +995,19 @@ class FHM:
         print(f"high utility itemset count: {self.hui_count}")
         print(f"candidate itemset count: {self.candidate_count}")
         print(f"pruned itemset count: {self.prune_count}")
+        print(
+            "pruned itemset count by strategy: "
+            + ", ".join([f"{strategy} {n}" for strategy, n in self.prune_counts.items()])
+        )
         print(f"maximum memory used (MB): {self.mem_usage}")
         print(f"total transaction utility: {self.total_trans_util}")
+        if self.top_k is not None:
+            print(f"minimum utility of the top-{self.top_k} itemsets: {self.minutil}")
+        if self.stop_reason is not None:
+            print(
+                f"search stopped early ({self.stop_reason}): {len(self.finished_branches)}"
+                f" of {self.branch_count} top-level branches finished"
+            )
 
     # initializes csv file by adding column names if csv file does not exist
     def initialize_csv(self, filename) -> None:
@@ -337,14 +1048,190 @@ class FHM:
             _writer.writerows(rows)
 
 
+def _search_branch(i: int) -> tuple:
+    """
+    Search the i-th top-level branch in a worker process of a parallel search.
+
+    Parameters:
+        i: index of the branch's item in the utility lists of the promising items
+
+    Returns:
+        the branch index, the path of the worker output file, the start and end offsets
+        of the branch's output in that file, the branch's hui and candidate counts, its prune
+        counts by pruning strategy,
+        its counters per search depth if they are enabled, the reason the branch was stopped
+        before it was searched entirely (see SearchStopped) or None and, in top-k mode,
+        the best itemsets the worker has found so far
+    """
+    global _worker_sink
+    fhm, stop, part_dir = _shared_fhm
+    if _worker_sink is None:
+        _worker_sink = BinarySink(os.path.join(part_dir, f"{os.getpid()}.part"), header=False)
+        _worker_sink.open()
+        fhm.sink = _worker_sink
+        # the parent process reports progress, and stops the workers for its own cancellation
+        # token or once they have found max_huis itemsets together
+        fhm.progress = None
+        fhm.cancel = stop
+    fhm.hui_count = 0
+    fhm.candidate_count = 0
+    fhm.prune_count = 0
+    fhm.prune_counts = dict.fromkeys(PRUNING_STRATEGIES, 0)
+    fhm.profiler.reset_counters()
+    start = _worker_sink.file.tell()
+    stop_reason = None
+    try:
+        fhm.search(None, fhm.util_lists, [i])
+    except SearchStopped as stop:
+        stop_reason = stop.reason
+        # drop the prefix the search stopped at
+        fhm.itemset_buffer.clear()
+        fhm.live_bytes = 0
+    _worker_sink.flush()
+    _worker_sink.file.flush()
+    end = _worker_sink.file.tell()
+    return (
+        i,
+        _worker_sink.path,
+        start,
+        end,
+        fhm.hui_count,
+        fhm.candidate_count,
+        fhm.prune_counts,
+        fhm.profiler.depth_counters,
+        stop_reason,
+        list(fhm.top_huis),
+    )
+
+
 if __name__ == "__main__":
-    args = sys.argv
-    input_path = args[1]
-    output_path = args[2]
-    minutil = int(args[3])
-    fhm = FHM(input_path, output_path, minutil)
+    parser = argparse.ArgumentParser(description="Mine high utility itemsets with FHM.")
+    parser.add_argument("input_path", help="relative path to the data file")
+    parser.add_argument("output_path", help="relative path to the output file")
+    parser.add_argument(
+        "minutil",
+        type=int,
+        nargs="?",
+        help="minimum utility (optional with --top-k, where it is the starting threshold)",
+    )
+    parser.add_argument(
+        "--minutils",
+        type=lambda value: sorted({int(minutil) for minutil in value.split(",")}),
+        default=None,
+        help="comma-separated minimum utilities to mine in one search at the lowest of them,"
+        " writing one output file and one csv row per minimum utility",
+    )
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        default=None,
+        help="mine the K itemsets with the highest utility instead of a fixed minimum utility",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["text", "binary"],
+        default="text",
+        help="format of the output file (default: text)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes used to search the top-level branches (default: 1)",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=float,
+        default=None,
+        help="memory budget (MB) for the utility lists held by the search; past it, the utility"
+        " lists of extensions are constructed when they are visited instead of up front",
+    )
+    parser.add_argument(
+        "--pruning",
+        type=lambda value: [strategy for strategy in value.split(",") if strategy],
+        default=list(PRUNING_STRATEGIES),
+        help="comma-separated pruning strategies to enable, or an empty string for none"
+        f" (default: {','.join(PRUNING_STRATEGIES)})",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=None,
+        help="seconds the run may take; past it, the search stops and the itemsets found so far"
+        " are written",
+    )
+    parser.add_argument(
+        "--max-huis",
+        type=int,
+        default=None,
+        help="number of high utility itemsets after which the search stops",
+    )
+    parser.add_argument(
+        "--progress",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="print the progress of the search every SECONDS seconds",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="path to a JSON file to write the time and memory of each phase"
+        " and the counters per search depth to",
+    )
+    args = parser.parse_args()
+    if args.max_huis is not None and args.top_k is not None:
+        parser.error("--max-huis cannot be used with --top-k")
+    for strategy in args.pruning:
+        if strategy not in PRUNING_STRATEGIES:
+            parser.error(
+                f"unknown pruning strategy {strategy}; choose from {', '.join(PRUNING_STRATEGIES)}"
+            )
+    if args.minutils is not None:
+        if args.minutil is not None or args.top_k is not None:
+            parser.error("--minutils replaces minutil and cannot be used with --top-k")
+    elif args.minutil is None and args.top_k is None:
+        parser.error("minutil is required unless --top-k or --minutils is given")
+    input_path = args.input_path
+    sink_class = BinarySink if args.output_format == "binary" else TextSink
+
+    # in a sweep, the itemsets of each minimum utility go to the output path suffixed with it
+    if args.minutils is not None:
+        minutil = args.minutils[0]
+        output_root, output_ext = os.path.splitext(args.output_path)
+        output_paths = [f"{output_root}_{minutil}{output_ext}" for minutil in args.minutils]
+        sink = ThresholdSink(args.minutils, [sink_class(path) for path in output_paths])
+    else:
+        minutil = args.minutil if args.minutil is not None else 1
+        sink = sink_class(args.output_path)
+    fhm = FHM(
+        input_path,
+        args.output_path,
+        minutil,
+        workers=args.workers,
+        top_k=args.top_k,
+        sink=sink,
+        max_memory=args.max_memory,
+        profiler=Profiler(depth_counters=args.profile is not None),
+        pruning=args.pruning,
+        time_budget=args.time_budget,
+        max_huis=args.max_huis,
+        progress=(lambda progress: print(f"progress: {progress}")) if args.progress else None,
+        progress_interval=args.progress or 1.0,
+    )
     fhm.run()
     fhm.print_stats()
+    if args.profile is not None:
+        dump_profile(args.profile, fhm)
+
+    # one csv row per minimum utility; in a sweep, the rows share the runtime, memory usage
+    # and candidate and prune counts of the search at the lowest minimum utility
+    if args.minutils is not None:
+        rows = list(zip(args.minutils, sink.counts))
+        for (minutil, hui_count), output_path in zip(rows, output_paths):
+            print(f"minimum utility {minutil}: {hui_count} high utility itemsets in {output_path}")
+    else:
+        rows = [(fhm.minutil, fhm.hui_count)]
 
     # initializes csv file by adding column names if csv file does not exist
     # adds rows to the csv file
@@ -357,25 +1244,27 @@ if __name__ == "__main__":
         os.mkdir("/".join(cur_path1) + "/experiments")
     os.chdir("/".join(cur_path1) + "/experiments")
 
-    if "DB_Utility.txt" in input_path:
-        if not os.path.exists("experiment_DB_Utility.csv"):
-            fhm.initialize_csv("experiment_DB_Utility.csv")
-        fhm.experiment("experiment_DB_Utility.csv")
-
-    if "chess.txt" in input_path:
-        if not os.path.exists("experiment_chess.csv"):
-            fhm.initialize_csv("experiment_chess.csv")
-        fhm.experiment("experiment_chess.csv")
-
-    if "foodmart.txt" in input_path:
-        if not os.path.exists("experiment_food_mart.csv"):
-            fhm.initialize_csv("experiment_food_mart.csv")
-        fhm.experiment("experiment_food_mart.csv")
-
-    if "BMS.txt" in input_path:
-        if not os.path.exists("experiment_BMS.csv"):
-            fhm.initialize_csv("experiment_BMS.csv")
-        fhm.experiment("experiment_BMS.csv")
+    for minutil, hui_count in rows:
+        fhm.minutil, fhm.hui_count = minutil, hui_count
+        if "DB_Utility.txt" in input_path:
+            if not os.path.exists("experiment_DB_Utility.csv"):
+                fhm.initialize_csv("experiment_DB_Utility.csv")
+            fhm.experiment("experiment_DB_Utility.csv")
+
+        if "chess.txt" in input_path:
+            if not os.path.exists("experiment_chess.csv"):
+                fhm.initialize_csv("experiment_chess.csv")
+            fhm.experiment("experiment_chess.csv")
+
+        if "foodmart.txt" in input_path:
+            if not os.path.exists("experiment_food_mart.csv"):
+                fhm.initialize_csv("experiment_food_mart.csv")
+            fhm.experiment("experiment_food_mart.csv")
+
+        if "BMS.txt" in input_path:
+            if not os.path.exists("experiment_BMS.csv"):
+                fhm.initialize_csv("experiment_BMS.csv")
+            fhm.experiment("experiment_BMS.csv")
 
     # return to the original directory so the shell script can correctly find the path
     cur_path = os.getcwd().split("/")[:-1]
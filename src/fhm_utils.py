@@ -1,24 +1,199 @@
-class UtilListElem:
-    def __init__(self, tid: int, iutil: int, rutil: int) -> None:
-        self.tid = tid
-        self.iutil = iutil
-        self.rutil = rutil
+from bisect import bisect_left
+from array import array
+from typing import Tuple, Union
 
 
 class UtilList:
+    """
+    Columnar utility list: the tids, iutils and rutils of its elements are kept in three
+    parallel typed arrays instead of one object per element.
+    """
+
     def __init__(self, item: int) -> None:
         self.item = item
         self.sum_iutils = 0
         self.sum_rutils = 0
-        self.elems = []
+        self.tids = array("q")
+        self.iutils = array("q")
+        self.rutils = array("q")
 
-    def add_elem(self, elem: UtilListElem) -> None:
-        self.elems.append(elem)
-        self.sum_iutils += elem.iutil
-        self.sum_rutils += elem.rutil
+    def __len__(self) -> int:
+        return len(self.tids)
 
+    def add_elem(self, tid: int, iutil: int, rutil: int) -> None:
+        self.tids.append(tid)
+        self.iutils.append(iutil)
+        self.rutils.append(rutil)
+        self.sum_iutils += iutil
+        self.sum_rutils += rutil
 
-class ItemUtilPair:
-    def __init__(self, item: int, util: int) -> None:
-        self.item = item
-        self.util = util
+    def nbytes(self) -> int:
+        return 3 * self.tids.itemsize * len(self.tids)
+
+
+class LazyUtilList:
+    """
+    Utility list of the itemset prefix U {x, y} that has not been constructed yet, holding
+    what it is constructed from: the utility lists of prefix, prefix U {x} and prefix U {y}
+    (which may itself be a LazyUtilList).
+    """
+
+    __slots__ = ("item", "prefix_UL", "prefix_x_UL", "prefix_y_UL")
+
+    def __init__(
+        self,
+        prefix_UL: Union[UtilList, None],
+        prefix_x_UL: UtilList,
+        prefix_y_UL: Union[UtilList, "LazyUtilList"],
+    ) -> None:
+        self.item = prefix_y_UL.item
+        self.prefix_UL = prefix_UL
+        self.prefix_x_UL = prefix_x_UL
+        self.prefix_y_UL = prefix_y_UL
+
+
+# a join walks the shorter of two tid lists and gallops through the longer one
+# when the longer one has more than GALLOP_RATIO times as many elements
+GALLOP_RATIO = 8
+
+
+def gallop(tids: array, tid: int, lo: int) -> int:
+    """
+    Get the index of the first element of tids at or after lo that is >= tid
+    via exponential search followed by binary search.
+
+    Parameters:
+        tids: sorted array of transaction IDs
+        tid: transaction ID to find
+        lo: index to start searching from
+
+    Returns:
+        the index of the first element >= tid, or len(tids) if there is none
+    """
+    n = len(tids)
+    hi = lo
+    step = 1
+    while hi < n and tids[hi] < tid:
+        lo = hi + 1
+        hi += step
+        step <<= 1
+    return bisect_left(tids, tid, lo, min(hi, n))
+
+
+# the EUCS is stored as a packed upper triangular array for up to this many items
+# and as a sparse matrix for larger alphabets
+DENSE_EUCS_MAX_ITEMS = 4096
+# number of distinct transactions buffered before their pairs are added to the EUCS
+EUCS_BATCH_SIZE = 10_000
+
+
+class EUCS:
+    """
+    Estimated Utility Co-Occurrence Structure over items recoded to the ranks 0, ..., n - 1.
+    It holds the TWU of every pair of items (x, y) with x < y.
+
+    Transactions are buffered and identical ones are merged before their pairs are added,
+    and the pairs are stored either in a packed upper triangular array (row x holds the
+    pairs (x, x + 1), ..., (x, n - 1)) or, for large alphabets, in a CSR sparse matrix.
+    """
+
+    def __init__(self, n_items: int, dense: Union[bool, None] = None) -> None:
+        self.n_items = n_items
+        self.dense = n_items <= DENSE_EUCS_MAX_ITEMS if dense is None else dense
+        self.batch = {}
+        if self.dense:
+            # index of the pair (x, y) is row_bases[x] + y
+            self.row_bases = [x * (2 * n_items - x - 1) // 2 - x - 1 for x in range(n_items)]
+            self.values = array("q", bytes(8 * (n_items * (n_items - 1) // 2)))
+        else:
+            # pairs are accumulated in a dictionary keyed by x * n + y until finalize()
+            self.pairs = {}
+            self.indptr = None
+            self.indices = None
+            self.values = None
+
+    def add_transaction(self, ranks: Tuple[int, ...], transac_util: int) -> None:
+        """
+        Add the TWU of a transaction to the pairs of its items.
+
+        Parameters:
+            ranks: ranks of the items of the transaction in ascending order
+            transac_util: utility of the transaction
+        """
+        if len(ranks) < 2:
+            return
+        batch = self.batch
+        batch[ranks] = batch.get(ranks, 0) + transac_util
+        if len(batch) >= EUCS_BATCH_SIZE:
+            self.flush()
+
+    def add_pair(self, x: int, y: int, TWU: int) -> None:
+        """
+        Add to the TWU of the pair of items (x, y), where x < y.
+
+        Parameters:
+            x: rank of the first item
+            y: rank of the second item
+            TWU: utility of the transactions added that contain both items
+        """
+        if self.dense:
+            self.values[self.row_bases[x] + y] += TWU
+        else:
+            key = x * self.n_items + y
+            self.pairs[key] = self.pairs.get(key, 0) + TWU
+
+    def flush(self) -> None:
+        """
+        Add the pairs of the buffered transactions to the EUCS.
+        """
+        if self.dense:
+            values, row_bases = self.values, self.row_bases
+            for ranks, transac_util in self.batch.items():
+                for i in range(len(ranks) - 1):
+                    base = row_bases[ranks[i]]
+                    for y in ranks[i + 1 :]:
+                        values[base + y] += transac_util
+        else:
+            pairs, n = self.pairs, self.n_items
+            for ranks, transac_util in self.batch.items():
+                for i in range(len(ranks) - 1):
+                    base = ranks[i] * n
+                    for y in ranks[i + 1 :]:
+                        key = base + y
+                        pairs[key] = pairs.get(key, 0) + transac_util
+        self.batch = {}
+
+    def finalize(self) -> None:
+        """
+        Flush the buffered transactions and, for a sparse EUCS, build the CSR matrix.
+        """
+        self.flush()
+        if self.dense:
+            return
+        n = self.n_items
+        self.indptr = array("q", bytes(8 * (n + 1)))
+        self.indices = array("q")
+        self.values = array("q")
+        for key in sorted(self.pairs):
+            x, y = divmod(key, n)
+            self.indptr[x + 1] += 1
+            self.indices.append(y)
+            self.values.append(self.pairs[key])
+        for x in range(n):
+            self.indptr[x + 1] += self.indptr[x]
+        self.pairs = None
+
+    def get(self, x: int, y: int) -> int:
+        """
+        Get the TWU of the pair of items (x, y), where x < y.
+
+        Returns:
+            the TWU of the pair, or 0 if x and y never occur in the same transaction
+        """
+        if self.dense:
+            return self.values[self.row_bases[x] + y]
+        start, end = self.indptr[x], self.indptr[x + 1]
+        index = bisect_left(self.indices, y, start, end)
+        if index < end and self.indices[index] == y:
+            return self.values[index]
+        return 0
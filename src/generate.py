@@ -0,0 +1,333 @@
+import math
+import heapq
+import random
+import argparse
+from itertools import accumulate
+from typing import Iterator, List, Set, Tuple
+from dataset import DBWriter
+
+# distributions of the number of items drawn for a transaction
+LENGTH_DISTRIBUTIONS = ("poisson", "uniform", "geometric")
+# distributions of the unit profits of the items
+PROFIT_DISTRIBUTIONS = ("uniform", "lognormal")
+# number of lines written to a text file at once
+WRITE_BATCH_SIZE = 10_000
+# number of bulk draws of the items of a transaction, redrawing the duplicates, before the
+# items left to draw are drawn without replacement over all the items
+MAX_BULK_DRAWS = 10
+
+
+class Generator:
+    """
+    Generator of synthetic transaction databases with utilities.
+
+    Each transaction draws a number of items from a length distribution, and draws that many
+    distinct items with a Zipfian popularity (the popularity of the item of rank r is
+    proportional to 1 / r^zipf_exponent, and the ranks are shuffled over the item IDs).
+    With probability cluster_prob, it also contains the items of one of n_clusters clusters of
+    items that tend to occur together, each with probability cluster_density.
+    The utility of an item in a transaction is a quantity drawn between 1 and max_quantity
+    times the unit profit of the item, which is drawn once per item.
+
+    Transactions are generated one at a time, so the memory used only depends on the number
+    of items, and the same parameters and seed always give the same transactions.
+
+    Attributes:
+        n_transacs: number of transactions
+        n_items: number of distinct items, with IDs 1 to n_items
+        avg_length: average number of items drawn for a transaction
+        length_dist: distribution of the number of items drawn, from LENGTH_DISTRIBUTIONS
+        zipf_exponent: exponent of the Zipfian item popularity (0 for uniform popularity)
+        n_clusters: number of clusters of correlated items
+        cluster_size: number of items in a cluster
+        cluster_prob: probability that a transaction contains a cluster
+        cluster_density: probability that each item of the cluster is in that transaction
+        profit_dist: distribution of the unit profits, from PROFIT_DISTRIBUTIONS
+        max_profit: maximum unit profit for a uniform distribution,
+            median unit profit for a lognormal distribution
+        profit_sigma: standard deviation of the log of the unit profits (lognormal only)
+        max_quantity: maximum quantity of an item in a transaction
+        seed: seed of the random number generator
+    """
+
+    def __init__(
+        self,
+        n_transacs: int,
+        n_items: int = 1000,
+        avg_length: float = 8,
+        length_dist: str = "poisson",
+        zipf_exponent: float = 1.0,
+        n_clusters: int = 0,
+        cluster_size: int = 5,
+        cluster_prob: float = 0.1,
+        cluster_density: float = 0.8,
+        profit_dist: str = "uniform",
+        max_profit: int = 100,
+        profit_sigma: float = 1.0,
+        max_quantity: int = 5,
+        seed: int = 0,
+    ) -> None:
+        """
+        Constructor for Generator. See the class attributes for the parameters.
+        """
+        if length_dist not in LENGTH_DISTRIBUTIONS:
+            raise ValueError(f"unknown length distribution {length_dist}")
+        if profit_dist not in PROFIT_DISTRIBUTIONS:
+            raise ValueError(f"unknown profit distribution {profit_dist}")
+        self.n_transacs = n_transacs
+        self.n_items = n_items
+        self.avg_length = avg_length
+        self.length_dist = length_dist
+        self.zipf_exponent = zipf_exponent
+        self.n_clusters = n_clusters
+        self.cluster_size = min(cluster_size, n_items)
+        self.cluster_prob = cluster_prob
+        self.cluster_density = cluster_density
+        self.profit_dist = profit_dist
+        self.max_profit = max_profit
+        self.profit_sigma = profit_sigma
+        self.max_quantity = max_quantity
+        self.seed = seed
+
+    def transactions(self) -> Iterator[Tuple[List[int], int, List[int]]]:
+        """
+        Generate the transactions.
+
+        Returns:
+            an iterator of (items, transaction utility, utilities) for each transaction,
+            with the items in ascending order
+        """
+        rng = random.Random(self.seed)
+
+        # item IDs in order of decreasing popularity, their popularity and its cumulative sum
+        items = list(range(1, self.n_items + 1))
+        rng.shuffle(items)
+        weights = [1 / rank**self.zipf_exponent for rank in range(1, self.n_items + 1)]
+        cum_weights = list(accumulate(weights))
+
+        # unit profit of each item, indexed by item ID
+        if self.profit_dist == "uniform":
+            profits = [rng.randint(1, self.max_profit) for _ in range(self.n_items + 1)]
+        else:
+            mu = math.log(self.max_profit)
+            profits = [
+                max(1, round(rng.lognormvariate(mu, self.profit_sigma)))
+                for _ in range(self.n_items + 1)
+            ]
+
+        clusters = [rng.sample(items, self.cluster_size) for _ in range(self.n_clusters)]
+
+        for _ in range(self.n_transacs):
+            length = min(self.length(rng), self.n_items)
+
+            transac_items = self.draw_items(rng, length, items, weights, cum_weights)
+
+            if clusters and rng.random() < self.cluster_prob:
+                for item in rng.choice(clusters):
+                    if rng.random() < self.cluster_density:
+                        transac_items.add(item)
+
+            transac_items = sorted(transac_items)
+            utils = [rng.randint(1, self.max_quantity) * profits[item] for item in transac_items]
+            yield transac_items, sum(utils), utils
+
+    def draw_items(
+        self,
+        rng: random.Random,
+        length: int,
+        items: List[int],
+        weights: List[float],
+        cum_weights: List[float],
+    ) -> Set[int]:
+        """
+        Draw distinct items without replacement, each with a probability proportional to its
+        popularity among the items not drawn yet.
+
+        With a skewed popularity, drawing the items in bulk and redrawing the duplicates is
+        much faster than removing each drawn item from the population, and gives the same
+        distribution. When the items left have so little popularity that the duplicates keep
+        coming back, the rest are drawn at once with exponential keys (Efraimidis-Spirakis)
+        over all the items.
+
+        Parameters:
+            rng: random number generator
+            length: number of items to draw, at most the number of items
+            items: item IDs in order of decreasing popularity
+            weights: popularity of each item of items
+            cum_weights: cumulative sums of weights
+
+        Returns:
+            the items drawn
+        """
+        if self.zipf_exponent == 0:
+            return set(rng.sample(items, length))
+        transac_items = set()
+        for _ in range(MAX_BULK_DRAWS):
+            transac_items.update(
+                rng.choices(items, cum_weights=cum_weights, k=length - len(transac_items))
+            )
+            if len(transac_items) == length:
+                return transac_items
+        keys = [
+            (math.log(1 - rng.random()) / weight, item)
+            for item, weight in zip(items, weights)
+            if item not in transac_items
+        ]
+        best_keys = heapq.nlargest(length - len(transac_items), keys)
+        transac_items.update([item for _, item in best_keys])
+        return transac_items
+
+    def length(self, rng: random.Random) -> int:
+        """
+        Draw the number of items of a transaction.
+
+        Parameters:
+            rng: random number generator
+
+        Returns:
+            a number of items >= 1
+        """
+        mean = self.avg_length
+        if self.length_dist == "uniform":
+            return rng.randint(1, max(1, round(2 * mean - 1)))
+        if self.length_dist == "geometric":
+            # number of trials until the first success, with success probability 1 / mean
+            if mean <= 1:
+                return 1
+            return 1 + int(math.log(1 - rng.random()) / math.log(1 - 1 / mean))
+        # Poisson, by multiplying uniforms (Knuth) for small means and with its normal
+        # approximation for large ones
+        if mean > 30:
+            return max(1, round(rng.gauss(mean, math.sqrt(mean))))
+        limit = math.exp(-mean)
+        length = 0
+        product = rng.random()
+        while product > limit:
+            length += 1
+            product *= rng.random()
+        return max(1, length)
+
+    def write(self, path: str, binary: bool = False) -> None:
+        """
+        Write the transactions to a file.
+
+        Parameters:
+            path: path to the file to write
+            binary: whether to write the binary layout read by dataset.TransactionDB
+                instead of the SPMF format "items:transaction utility:utilities"
+        """
+        if binary:
+            writer = DBWriter(path)
+            for items, transac_util, utils in self.transactions():
+                writer.add_transaction(items, transac_util, utils)
+            writer.close()
+            return
+
+        with open(path, "w") as f:
+            lines = []
+            for items, transac_util, utils in self.transactions():
+                lines.append(
+                    " ".join([str(item) for item in items])
+                    + f":{transac_util}:"
+                    + " ".join([str(util) for util in utils])
+                    + "\n"
+                )
+                if len(lines) >= WRITE_BATCH_SIZE:
+                    f.writelines(lines)
+                    lines = []
+            f.writelines(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic transaction database with utilities."
+    )
+    parser.add_argument("output_path", help="relative path to the dataset to write")
+    parser.add_argument("n_transacs", type=int, help="number of transactions")
+    parser.add_argument(
+        "--items", type=int, default=1000, help="number of distinct items (default: 1000)"
+    )
+    parser.add_argument(
+        "--avg-length",
+        type=float,
+        default=8,
+        help="average number of items drawn for a transaction (default: 8)",
+    )
+    parser.add_argument(
+        "--length-dist",
+        choices=LENGTH_DISTRIBUTIONS,
+        default="poisson",
+        help="distribution of the number of items drawn (default: poisson)",
+    )
+    parser.add_argument(
+        "--zipf",
+        type=float,
+        default=1.0,
+        help="exponent of the Zipfian item popularity, 0 for uniform (default: 1.0)",
+    )
+    parser.add_argument(
+        "--clusters", type=int, default=0, help="number of clusters of correlated items"
+    )
+    parser.add_argument(
+        "--cluster-size", type=int, default=5, help="number of items in a cluster (default: 5)"
+    )
+    parser.add_argument(
+        "--cluster-prob",
+        type=float,
+        default=0.1,
+        help="probability that a transaction contains a cluster (default: 0.1)",
+    )
+    parser.add_argument(
+        "--cluster-density",
+        type=float,
+        default=0.8,
+        help="probability that each item of the cluster is in that transaction (default: 0.8)",
+    )
+    parser.add_argument(
+        "--profit-dist",
+        choices=PROFIT_DISTRIBUTIONS,
+        default="uniform",
+        help="distribution of the unit profits of the items (default: uniform)",
+    )
+    parser.add_argument(
+        "--max-profit",
+        type=int,
+        default=100,
+        help="maximum unit profit (uniform) or median unit profit (lognormal) (default: 100)",
+    )
+    parser.add_argument(
+        "--profit-sigma",
+        type=float,
+        default=1.0,
+        help="standard deviation of the log of the unit profits (lognormal only, default: 1.0)",
+    )
+    parser.add_argument(
+        "--max-quantity",
+        type=int,
+        default=5,
+        help="maximum quantity of an item in a transaction (default: 5)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument(
+        "--binary",
+        action="store_true",
+        help="write the binary layout of the dataset cache instead of the SPMF format",
+    )
+    args = parser.parse_args()
+    generator = Generator(
+        args.n_transacs,
+        n_items=args.items,
+        avg_length=args.avg_length,
+        length_dist=args.length_dist,
+        zipf_exponent=args.zipf,
+        n_clusters=args.clusters,
+        cluster_size=args.cluster_size,
+        cluster_prob=args.cluster_prob,
+        cluster_density=args.cluster_density,
+        profit_dist=args.profit_dist,
+        max_profit=args.max_profit,
+        profit_sigma=args.profit_sigma,
+        max_quantity=args.max_quantity,
+        seed=args.seed,
+    )
+    generator.write(args.output_path, binary=args.binary)
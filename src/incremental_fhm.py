@@ -0,0 +1,395 @@
+import os
+import time
+import pickle
+import argparse
+from array import array
+from typing import Dict, Iterable, List, Set, Tuple, Union
+from fhm import FHM
+from fhm_utils import UtilList, EUCS
+from dataset import MAGIC, parse_transactions
+from instrument import log_experiment
+from sinks import ResultSink
+
+# suffix of the mining state saved next to a dataset
+STATE_SUFFIX = ".fhmstate"
+# suffix of the log of the changes of each run, appended to the path of the mining state
+LOG_SUFFIX = ".log"
+# version of the layout of the saved mining state; a state with another version is ignored
+STATE_VERSION = 2
+# number of bytes at the end of the processed part of the dataset kept in the state
+# to check that the dataset was only appended to
+TAIL_SIZE = 4096
+
+
+class IncrementalFHM(FHM):
+    """
+    FHM over a dataset that only grows by appended transactions. The mining state (the TWU
+    and utility list of every item, the TWU of every pair of items and the high utility
+    itemsets of every top-level branch) is saved after each run, and the next run only reads
+    the transactions appended since. Then it only searches the top-level branches of the
+    items that occur in those transactions: every itemset of a branch contains its item,
+    so the itemsets of the other branches keep their utilities.
+
+    Appended transactions only add elements to the utility lists and TWU to the pairs of
+    their items, so each run appends what it changed to a log (the new elements of each
+    item, the TWU added to each pair and the itemsets of the branches it searched) instead of
+    saving the whole state again. The state file only holds the TWU of each item, where the
+    processed part of the dataset ends and how much of the log is valid.
+
+    The items keep the ranks they were given when they were first seen (in order of
+    ascending TWU for the items of the first run), and all items are kept in the state
+    so that an item can become promising as transactions are added.
+
+    Attributes:
+        state_path: path to the file the mining state is saved to
+        log_path: path to the log of the changes of each run
+        log_size: number of bytes of the log written by the runs so far
+        offset: number of bytes of the dataset processed so far
+        tail: last bytes of the processed part of the dataset
+        n_transacs: number of transactions processed so far
+        item_TWUs: TWU of each item, indexed by its rank
+        branch_huis: high utility itemsets of each top-level branch, keyed by the rank of its item
+        added_count: number of transactions added in this run
+        explored_count: number of top-level branches searched in this run
+        promising_count: number of top-level branches, one per item with TWU >= minutil
+    """
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        minutil: int,
+        state_path: Union[str, None] = None,
+        sink: Union[ResultSink, None] = None,
+    ) -> None:
+        """
+        Constructor for IncrementalFHM.
+
+        Parameters:
+            input_path: relative path to the data file
+            output_path: relative path to the output file
+            minutil: minimum utility
+            state_path: path to the file the mining state is saved to,
+                or None to save it next to the data file
+            sink: destination of the high utility itemsets, or None to write them
+                to output_path in the text format
+        """
+        super().__init__(input_path, output_path, minutil, sink=sink)
+        self.state_path = state_path if state_path is not None else input_path + STATE_SUFFIX
+        self.log_path = self.state_path + LOG_SUFFIX
+        self.log_size = 0
+        self.offset = 0
+        self.tail = b""
+        self.n_transacs = 0
+        self.item_TWUs = []
+        self.branch_huis = {}
+        self.branch = []
+        self.added_count = 0
+        self.explored_count = 0
+        self.promising_count = 0
+
+    def fhm(self) -> None:
+        """
+        Run the FHM algorithm on the transactions appended since the previous run.
+        """
+        start_time = time.time()  # start timing algorithm
+        self.profiler.phase("delta scan")
+
+        self.itemset_buffer = []
+        self.live_bytes = 0
+
+        # the high utility itemsets of every branch change with minutil
+        saved_minutil, pair_deltas = self.load_state()
+        search_all = saved_minutil != self.minutil
+
+        # read the transactions appended since the previous run; a last line without a
+        # newline is a transaction too, so the next run checks that it was not continued
+        with open(self.input_path, "rb") as f:
+            f.seek(self.offset)
+            delta = f.read()
+        if self.offset == 0 and delta.startswith(MAGIC):
+            raise ValueError(f"{self.input_path} is not a dataset in the SPMF format")
+        if delta and self.tail and not self.tail.endswith(b"\n") and not delta.startswith(b"\n"):
+            raise ValueError(
+                f"the last transaction of {self.input_path} was continued after it was mined;"
+                f" remove {self.state_path} to mine it from scratch"
+            )
+        lengths = [len(util_list) for util_list in self.util_lists]
+        changed_ranks, pairs = self.add_transactions(parse_transactions(delta.splitlines()))
+        self.offset += len(delta)
+        self.tail = (self.tail + delta)[-TAIL_SIZE:]
+
+        # the EUCS over the ranks of all the items, from the TWU each run added to the pairs
+        self.profiler.phase("list/EUCS build")
+        pair_deltas.append(pairs)
+        self.EUCS = EUCS(len(self.items))
+        for xs, ys, TWUs in pair_deltas:
+            for x, y, TWU in zip(xs, ys, TWUs):
+                self.EUCS.add_pair(x, y, TWU)
+        self.EUCS.finalize()
+        del pair_deltas
+
+        # search the branches of the items with TWU >= minutil in order of rank;
+        # the other branches are written from the state
+        promising_ranks = [
+            rank
+            for rank, TWU in enumerate(self.item_TWUs)
+            if TWU >= self.minutil or "twu" not in self.pruning
+        ]
+        self.count_prunes("twu", len(self.items) - len(promising_ranks))
+        self.promising_count = len(promising_ranks)
+        ext_ULs = [self.util_lists[rank] for rank in promising_ranks]
+        searched_huis = {}
+        self.profiler.phase("search")
+        self.sink.open()
+        try:
+            for i, rank in enumerate(promising_ranks):
+                if search_all or rank in changed_ranks:
+                    self.explored_count += 1
+                    self.branch = []
+                    self.search(None, ext_ULs, [i])
+                    searched_huis[rank] = self.branch
+                else:
+                    for itemset, util in self.branch_huis.get(rank, []):
+                        self.hui_count += 1
+                        self.sink.write(itemset, util)
+        finally:
+            self.sink.close()
+
+        # log the new elements of the utility lists, the TWU added to the pairs
+        # and the itemsets of the branches searched
+        self.profiler.phase("state save")
+        elements = {}
+        for rank in changed_ranks:
+            util_list = self.util_lists[rank]
+            start = lengths[rank] if rank < len(lengths) else 0
+            elements[rank] = (
+                util_list.tids[start:],
+                util_list.iutils[start:],
+                util_list.rutils[start:],
+            )
+        if search_all:
+            self.branch_huis = searched_huis
+        else:
+            self.branch_huis.update(searched_huis)
+        self.save_state(
+            {
+                "elements": elements,
+                "pairs": pairs,
+                "branch_huis": searched_huis,
+                "search_all": search_all,
+            }
+        )
+        self.profiler.stop()
+
+        self.runtime = (time.time() - start_time) * 1_000  # stop timing algorithm
+
+    def add_transactions(
+        self, transactions: Iterable[tuple]
+    ) -> Tuple[Set[int], Tuple[array, array, array]]:
+        """
+        Add transactions to the TWUs and utility lists. The items of the first run are ranked
+        in order of ascending TWU and the items seen later are ranked after all the known items.
+
+        Parameters:
+            transactions: (items, transaction utility, utilities) of each transaction
+
+        Returns:
+            the ranks of the items that occur in the transactions, and the ranks x and y
+            of each pair of items (x, y) with x < y that occur together in them and the TWU
+            they add to the pair
+        """
+        transactions = list(transactions)
+        self.added_count = len(transactions)
+
+        # rank the items of the first run like FHM does
+        if not self.items:
+            item_TWU_dict = {}
+            for items, transac_util, _ in transactions:
+                for item in items:
+                    item_TWU_dict[item] = item_TWU_dict.get(item, 0) + transac_util
+            self.items = sorted(item_TWU_dict, key=lambda item: item_TWU_dict[item])
+            self.item_TWUs = [0] * len(self.items)
+            self.util_lists = [UtilList(rank) for rank in range(len(self.items))]
+
+        item_rank_dict = {item: rank for rank, item in enumerate(self.items)}
+        pair_TWUs = {}
+        changed_ranks = set()
+        for items, transac_util, item_utils in transactions:
+            tid = self.n_transacs
+            self.n_transacs += 1
+            self.total_trans_util += transac_util
+
+            # get (rank, util) pairs of the items, ranking new items
+            rank_pairs = []
+            rutil = 0
+            for item, util in zip(items, item_utils):
+                rank = item_rank_dict.get(item)
+                if rank is None:
+                    rank = len(self.items)
+                    item_rank_dict[item] = rank
+                    self.items.append(item)
+                    self.item_TWUs.append(0)
+                    self.util_lists.append(UtilList(rank))
+                self.item_TWUs[rank] += transac_util
+                rank_pairs.append((rank, util))
+                rutil += util
+            rank_pairs.sort()
+
+            # append (tid, iutil, rutil) to the utility lists of the items
+            for rank, util in rank_pairs:
+                rutil -= util
+                self.util_lists[rank].add_elem(tid, util, rutil)
+
+            # add the transaction utility to the TWU of each pair of items
+            ranks = [rank for rank, _ in rank_pairs]
+            changed_ranks.update(ranks)
+            for i in range(len(ranks) - 1):
+                x = ranks[i]
+                for y in ranks[i + 1 :]:
+                    pair_TWUs[x, y] = pair_TWUs.get((x, y), 0) + transac_util
+        pairs = (
+            array("q", [x for x, _ in pair_TWUs]),
+            array("q", [y for _, y in pair_TWUs]),
+            array("q", pair_TWUs.values()),
+        )
+        return changed_ranks, pairs
+
+    def output(self, item: int, util: int) -> None:
+        """
+        Keep the given high utility itemset in the itemsets of the current branch
+        and write it to self.sink.
+
+        Parameters:
+            item: item extension of the prefix itemset in self.itemset_buffer
+            util: utility of the itemset
+        """
+        self.branch.append((tuple(self.itemset_buffer) + (item,), util))
+        super().output(item, util)
+
+    def load_state(self) -> Tuple[Union[int, None], List[Tuple[array, array, array]]]:
+        """
+        Restore the mining state saved by the previous runs, checking that the dataset
+        was only appended to since, and replay their log into the utility lists and the
+        itemsets of the branches.
+
+        Returns:
+            the minimum utility of the previous run, or None if there is no saved state,
+            and the pairs of items whose TWU each run added to, with the TWU it added
+        """
+        if not os.path.exists(self.state_path):
+            return None, []
+        with open(self.state_path, "rb") as f:
+            state = pickle.load(f)
+        if state["version"] != STATE_VERSION:
+            return None, []
+
+        offset, tail = state["offset"], state["tail"]
+        with open(self.input_path, "rb") as f:
+            f.seek(offset - len(tail))
+            if f.read(len(tail)) != tail:
+                raise ValueError(
+                    f"{self.input_path} was changed, not only appended to, since {self.state_path}"
+                    " was saved; remove the state file to mine it from scratch"
+                )
+
+        self.offset = offset
+        self.tail = tail
+        self.n_transacs = state["n_transacs"]
+        self.total_trans_util = state["total_trans_util"]
+        self.items = state["items"]
+        self.item_TWUs = state["item_TWUs"]
+        self.log_size = state["log_size"]
+
+        # the log may go on past log_size if a run stopped before saving the state
+        self.util_lists = [UtilList(rank) for rank in range(len(self.items))]
+        pair_deltas = []
+        with open(self.log_path, "rb") as f:
+            while f.tell() < self.log_size:
+                changes = pickle.load(f)
+                for rank, (tids, iutils, rutils) in changes["elements"].items():
+                    util_list = self.util_lists[rank]
+                    util_list.tids.extend(tids)
+                    util_list.iutils.extend(iutils)
+                    util_list.rutils.extend(rutils)
+                    util_list.sum_iutils += sum(iutils)
+                    util_list.sum_rutils += sum(rutils)
+                pair_deltas.append(changes["pairs"])
+                if changes["search_all"]:
+                    self.branch_huis = changes["branch_huis"]
+                else:
+                    self.branch_huis.update(changes["branch_huis"])
+        return state["minutil"], pair_deltas
+
+    def save_state(self, changes: Dict[str, object]) -> None:
+        """
+        Append the changes of this run to the log, then save the mining state to
+        self.state_path, replacing the previous one at once.
+
+        Parameters:
+            changes: new elements of the utility lists keyed by rank ("elements"), pairs
+                of items and the TWU added to them ("pairs"), itemsets of the branches
+                searched ("branch_huis") and whether every branch was searched ("search_all")
+        """
+        # drop what a run that stopped before saving the state appended to the log
+        with open(self.log_path, "ab") as f:
+            f.truncate(self.log_size)
+            if changes["elements"] or changes["branch_huis"] or changes["search_all"]:
+                f.seek(self.log_size)
+                pickle.dump(changes, f, protocol=pickle.HIGHEST_PROTOCOL)
+                self.log_size = f.tell()
+
+        state = {
+            "version": STATE_VERSION,
+            "minutil": self.minutil,
+            "offset": self.offset,
+            "tail": self.tail,
+            "n_transacs": self.n_transacs,
+            "total_trans_util": self.total_trans_util,
+            "items": self.items,
+            "item_TWUs": self.item_TWUs,
+            "log_size": self.log_size,
+        }
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.state_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def print_stats(self) -> None:
+        """
+        Print statistics for the incremental FHM algorithm.
+        """
+        super().print_stats()
+        print(f"transactions added: {self.added_count}")
+        print(f"top-level branches searched: {self.explored_count} of {self.promising_count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mine high utility itemsets with FHM, only processing the transactions"
+        " appended to the data file since the previous run."
+    )
+    parser.add_argument("input_path", help="relative path to the data file")
+    parser.add_argument("output_path", help="relative path to the output file")
+    parser.add_argument("minutil", type=int, help="minimum utility")
+    parser.add_argument(
+        "--state",
+        default=None,
+        help=f"path to the mining state (default: the data file path + {STATE_SUFFIX})",
+    )
+    parser.add_argument(
+        "--experiment-csv",
+        default=None,
+        help="path to a csv file of experiments to append the statistics of the run to",
+    )
+    args = parser.parse_args()
+    fhm = IncrementalFHM(args.input_path, args.output_path, args.minutil, state_path=args.state)
+    fhm.run()
+    fhm.print_stats()
+    if args.experiment_csv is not None:
+        log_experiment(args.experiment_csv, fhm)
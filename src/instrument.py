@@ -0,0 +1,278 @@
+import os
+import sys
+import csv
+import json
+import time
+import resource
+import tracemalloc
+from typing import Dict, List, Union
+
+# counters kept per search depth when they are enabled: utility lists (or projected databases)
+# constructed, elements in them, extensions pruned by the EUCS (or by TWU), utility lists whose
+# construction was abandoned by LA-prune and branches pruned by a utility upper bound
+DEPTH_COUNTERS = ("joins", "elements", "eucs_prunes", "la_prunes", "bound_prunes")
+
+
+class PhaseStats:
+    """
+    Statistics of one phase of an algorithm.
+
+    Attributes:
+        name: name of the phase
+        wall_time_ms: wall time of the phase
+        cpu_time_ms: CPU time of the process during the phase
+        peak_memory_mb: peak memory during the phase
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.wall_time_ms = 0.0
+        self.cpu_time_ms = 0.0
+        self.peak_memory_mb = 0.0
+
+    def to_dict(self) -> Dict[str, Union[str, float]]:
+        return {
+            "name": self.name,
+            "wall_time_ms": self.wall_time_ms,
+            "cpu_time_ms": self.cpu_time_ms,
+            "peak_memory_mb": self.peak_memory_mb,
+        }
+
+
+class Profiler:
+    """
+    Instrumentation of an algorithm run as consecutive phases: the wall time, CPU time and
+    peak memory of each phase, and optionally counters per search depth. Phases only cost
+    a few system calls at their boundaries, so a profiler can always be on; the depth counters
+    are updated once per node of the search and are off by default.
+
+    The peak memory of a phase is the peak resident set size of the process (and of the
+    worker processes that ended during the phase). On Linux, the peak is reset at the start of
+    each phase; elsewhere it is the peak since the process started. With trace_memory, it is
+    the peak of the memory allocated by Python as traced by tracemalloc, which is precise
+    but slows the algorithm down.
+
+    Attributes:
+        trace_memory: whether memory is traced by tracemalloc instead of read from the RSS
+        phases: statistics of the phases in the order they ran
+        depth_counters: list of the values of each counter of DEPTH_COUNTERS indexed by
+            search depth, or None if the counters are disabled
+    """
+
+    def __init__(self, depth_counters: bool = False, trace_memory: bool = False) -> None:
+        """
+        Constructor for Profiler.
+
+        Parameters:
+            depth_counters: whether to keep the counters per search depth
+            trace_memory: whether to trace memory with tracemalloc instead of reading the RSS
+        """
+        self.trace_memory = trace_memory
+        self.phases = []
+        self.depth_counters = {name: [] for name in DEPTH_COUNTERS} if depth_counters else None
+        self.current = None
+        self.start_wall = 0.0
+        self.start_cpu = 0.0
+        self.start_children_rss = 0
+        self.started_tracing = False
+
+    def phase(self, name: str) -> None:
+        """
+        End the current phase, if any, and start a new one.
+
+        Parameters:
+            name: name of the new phase
+        """
+        self.end_phase()
+        self.current = PhaseStats(name)
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+        else:
+            _reset_peak_rss()
+            self.start_children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        self.start_cpu = time.process_time()
+        self.start_wall = time.perf_counter()
+
+    def end_phase(self) -> None:
+        """
+        End the current phase, if any, and record its statistics.
+        """
+        if self.current is None:
+            return
+        phase = self.current
+        phase.wall_time_ms = (time.perf_counter() - self.start_wall) * 1_000
+        phase.cpu_time_ms = (time.process_time() - self.start_cpu) * 1_000
+        if self.trace_memory:
+            phase.peak_memory_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        else:
+            peak_memory = _peak_rss_mb()
+            children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            if children_rss > self.start_children_rss:
+                peak_memory = max(peak_memory, _rss_to_mb(children_rss))
+            phase.peak_memory_mb = peak_memory
+        self.phases.append(phase)
+        self.current = None
+
+    def stop(self) -> None:
+        """
+        End the current phase and stop tracing memory if this profiler started it.
+        """
+        self.end_phase()
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def count(self, counter: str, depth: int, n: int = 1) -> None:
+        """
+        Add to a counter at a search depth. Callers check that depth_counters is not None.
+
+        Parameters:
+            counter: name of the counter in DEPTH_COUNTERS
+            depth: search depth
+            n: value to add
+        """
+        counts = self.depth_counters[counter]
+        if len(counts) <= depth:
+            counts.extend([0] * (depth + 1 - len(counts)))
+        counts[depth] += n
+
+    def reset_counters(self) -> Dict[str, List[int]]:
+        """
+        Reset the counters per search depth.
+
+        Returns:
+            the counters before they were reset
+        """
+        counters = self.depth_counters
+        if counters is not None:
+            self.depth_counters = {name: [] for name in DEPTH_COUNTERS}
+        return counters
+
+    def merge_counters(self, counters: Union[Dict[str, List[int]], None]) -> None:
+        """
+        Add counters per search depth, e.g. those of a worker process, to this profiler's.
+
+        Parameters:
+            counters: counters per search depth, or None
+        """
+        if counters is None or self.depth_counters is None:
+            return
+        for counter, counts in counters.items():
+            for depth, n in enumerate(counts):
+                if n:
+                    self.count(counter, depth, n)
+
+    @property
+    def peak_memory_mb(self) -> float:
+        return max([phase.peak_memory_mb for phase in self.phases], default=0.0)
+
+    @property
+    def phase_times(self) -> Dict[str, float]:
+        return {phase.name: phase.wall_time_ms for phase in self.phases}
+
+    def to_dict(self) -> Dict:
+        return {
+            "phases": [phase.to_dict() for phase in self.phases],
+            "peak_memory_mb": self.peak_memory_mb,
+            "memory": "tracemalloc" if self.trace_memory else "rss",
+            "depth_counters": self.depth_counters,
+        }
+
+
+def dump_profile(path: str, algorithm: object) -> None:
+    """
+    Write the statistics of a run of an algorithm and of its profiler to a JSON file.
+
+    Parameters:
+        path: path to the JSON file
+        algorithm: algorithm that has run, with a profiler attribute
+    """
+    report = {
+        "algorithm": type(algorithm).__name__,
+        "input_path": algorithm.input_path,
+        "minutil": algorithm.minutil,
+        "runtime_ms": algorithm.runtime,
+        "hui_count": algorithm.hui_count,
+        "candidate_count": algorithm.candidate_count,
+        "prune_count": algorithm.prune_count,
+    }
+    if hasattr(algorithm, "prune_counts"):
+        report["prune_counts"] = algorithm.prune_counts
+    if getattr(algorithm, "stop_reason", None) is not None:
+        report["stop_reason"] = algorithm.stop_reason
+        report["finished_branches"] = algorithm.finished_branches
+    report.update(algorithm.profiler.to_dict())
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+# columns of the csv files of experiments, one row per run
+EXPERIMENT_FIELDS = (
+    "minimum utility",
+    "total runtime (ms)",
+    "high utility itemSet count",
+    "candidate itemSet count",
+    "pruned itemSet count",
+    "maximum memory used (MB)",
+)
+
+
+def log_experiment(path: str, algorithm: object) -> None:
+    """
+    Append the statistics of a run of an algorithm as a row of a csv file of experiments,
+    writing the column names first if the file does not exist.
+
+    Parameters:
+        path: path to the csv file
+        algorithm: algorithm that has run
+    """
+    is_new = not os.path.exists(path)
+    with open(path, "a+", newline="") as csvfile:
+        _writer = csv.writer(csvfile)
+        if is_new:
+            _writer.writerow(EXPERIMENT_FIELDS)
+        _writer.writerow(
+            [
+                algorithm.minutil,
+                algorithm.runtime,
+                algorithm.hui_count,
+                algorithm.candidate_count,
+                algorithm.prune_count,
+                algorithm.mem_usage,
+            ]
+        )
+
+def _reset_peak_rss() -> None:
+    """
+    Reset the peak RSS of the process, where the kernel supports it (Linux).
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> float:
+    """
+    Get the peak RSS of the process since it started or since it was last reset.
+
+    Returns:
+        the peak RSS in MB
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _rss_to_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def _rss_to_mb(max_rss: int) -> float:
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
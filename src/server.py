@@ -0,0 +1,532 @@
+import os
+import json
+import bisect
+import argparse
+import threading
+import multiprocessing
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+from fhm import FHM
+from fhm_utils import UtilList, EUCS
+from dataset import load
+from sinks import CallbackSink
+
+# default number of (dataset, minimum utility) results kept in the cache
+DEFAULT_CACHE_SIZE = 64
+
+# datasets of the service, set before the worker processes are forked
+# so that they inherit the resident utility lists instead of rebuilding them
+_datasets = {}
+
+
+class Dataset:
+    """
+    Dataset kept in memory in the form FHM searches: the utility lists of all of its items
+    in order of ascending TWU and the EUCS over their ranks. They are built without
+    a minimum utility, so a search at any minimum utility starts from them: the items and
+    pairs of items whose TWU is below it are pruned by the search instead of by the scans.
+
+    Attributes:
+        path: path to the data file
+        n_transacs: number of transactions
+        total_trans_util: total transaction utility of the dataset
+        items: items in order of ascending TWU, indexed by their rank
+        item_ranks: rank of each item
+        util_lists: utility list of each item, indexed by its rank
+        EUCS: Estimated Utility Co-Occurrence Structure over the ranks of the items
+        pair_utils: utility of each pair of items that occur in the same transaction, keyed
+            by x * n + y for the ranks x < y of n items, which top-k queries start from
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Constructor for Dataset: scan the data file to build the utility lists and EUCS.
+
+        Parameters:
+            path: path to the data file
+        """
+        self.path = path
+
+        # TWU of each item, held by the binary layout of DB
+        with load(path) as db:
+            self.n_transacs = len(db)
+            item_TWU_dict = db.item_TWUs()
+        self.items = sorted(item_TWU_dict, key=lambda item: item_TWU_dict[item])
+        item_rank_dict = self.item_ranks = {item: rank for rank, item in enumerate(self.items)}
+
+        # second DB scan to populate utility lists and EUCS
+        self.util_lists = [UtilList(rank) for rank in range(len(self.items))]
+        self.EUCS = EUCS(len(self.items))
+        self.pair_utils = {}
+        n_items = len(self.items)
+        self.total_trans_util = 0
+        with load(path) as db:
+            for tid, (items, transac_util, item_utils) in enumerate(db):
+                self.total_trans_util += transac_util
+                rank_pairs = sorted(
+                    [(item_rank_dict[item], util) for item, util in zip(items, item_utils)]
+                )
+                rutil = transac_util
+                for rank, util in rank_pairs:
+                    rutil -= util
+                    self.util_lists[rank].add_elem(tid, util, rutil)
+                self.EUCS.add_transaction(tuple([rank for rank, _ in rank_pairs]), transac_util)
+                for i in range(len(rank_pairs)):
+                    rank, util = rank_pairs[i]
+                    base = rank * n_items
+                    for next_rank, next_util in rank_pairs[i + 1 :]:
+                        key = base + next_rank
+                        self.pair_utils[key] = self.pair_utils.get(key, 0) + util + next_util
+        self.EUCS.finalize()
+
+    def mine(
+        self, minutil: int, top_k: Union[int, None] = None, item: Union[int, None] = None
+    ) -> List[Tuple[tuple, int]]:
+        """
+        Search the resident utility lists for high utility itemsets.
+
+        Parameters:
+            minutil: minimum utility; in top-k mode, the threshold the search starts from
+            top_k: number of itemsets with the highest utility to mine, or None to mine
+                all the itemsets with utility >= minutil
+            item: in top-k mode, item that the itemsets must contain, or None for any itemsets
+
+        Returns:
+            (itemset, utility) of each high utility itemset, in the order FHM writes them
+        """
+        huis = []
+        sink = CallbackSink(lambda itemset, util: huis.append((itemset, util)))
+        if item is None:
+            fhm = FHM(self.path, None, minutil, top_k=top_k, sink=sink)
+        elif item not in self.item_ranks:
+            return huis
+        else:
+            fhm = ItemTopKFHM(self.path, None, minutil, item, top_k=top_k, sink=sink)
+        fhm.items = self.items
+        fhm.util_lists = self.util_lists
+        fhm.EUCS = self.EUCS
+        fhm.total_trans_util = self.total_trans_util
+        util_lists = self.util_lists
+        if top_k is None:
+            fhm.search(None, util_lists)
+        else:
+            # start from the k-th highest utility of a 1- or 2-itemset, like FHM does in top-k
+            # mode; the itemsets that contain an item start with an item of the same or a lower
+            # rank, and only the item itself and its pairs are known to contain it
+            if item is None:
+                utils = [util_list.sum_iutils for util_list in util_lists]
+                utils.extend(self.pair_utils.values())
+                ranks = None
+            else:
+                rank = self.item_ranks[item]
+                n_items = len(self.items)
+                utils = [util_lists[rank].sum_iutils]
+                utils.extend(
+                    [
+                        util
+                        for key, util in self.pair_utils.items()
+                        if key // n_items == rank or key % n_items == rank
+                    ]
+                )
+                ranks = range(rank + 1)
+            fhm.search_top_k(util_lists, utils, ranks)
+            fhm.output_top_huis()
+        return huis
+
+
+class ItemTopKFHM(FHM):
+    """
+    FHM in top-k mode that only keeps the itemsets that contain a given item, so that its
+    threshold rises to the k-th highest utility of those itemsets and prunes the search
+    with it.
+
+    Attributes:
+        item: item that the itemsets must contain
+    """
+
+    def __init__(
+        self, input_path: str, output_path: str, minutil: int, item: int, **kwargs
+    ) -> None:
+        """
+        Constructor for ItemTopKFHM.
+
+        Parameters:
+            input_path: relative path to the data file
+            output_path: relative path to the output file
+            minutil: threshold the search starts from
+            item: item that the itemsets must contain
+            kwargs: keyword arguments of FHM, with top_k set
+        """
+        super().__init__(input_path, output_path, minutil, **kwargs)
+        self.item = item
+
+    def keep_top_hui(self, itemset: tuple, util: int) -> None:
+        if self.item in itemset:
+            super().keep_top_hui(itemset, util)
+
+
+class ResultCache:
+    """
+    Least recently used cache of the high utility itemsets of the datasets at minimum
+    utilities and of their top-k itemsets. A query at a minimum utility is answered from the
+    cached result of the same dataset at the highest minimum utility that does not exceed it,
+    since that result holds all of its itemsets. Results are kept in order of descending
+    utility, so the itemsets that reach a higher minimum utility are a prefix of them.
+
+    Attributes:
+        capacity: maximum number of results kept, where 0 disables the cache
+        results: (itemsets, negated utilities) keyed by (dataset name, "minutil", minimum
+            utility) or (dataset name, "top", item or None, k), from the least to the most
+            recently used
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CACHE_SIZE) -> None:
+        if capacity < 0:
+            raise ValueError("capacity must not be negative")
+        self.capacity = capacity
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, name: str, minutil: int) -> Union[List[Tuple[tuple, int]], None]:
+        """
+        Get the itemsets of a dataset with utility >= minutil from the cache.
+
+        Parameters:
+            name: name of the dataset
+            minutil: minimum utility
+
+        Returns:
+            the itemsets in order of descending utility, or None if no cached result holds them
+        """
+        with self.lock:
+            best_key = None
+            for key in self.results:
+                if key[:2] == (name, "minutil") and key[2] <= minutil:
+                    if best_key is None or key[2] > best_key[2]:
+                        best_key = key
+            if best_key is None:
+                return None
+            self.results.move_to_end(best_key)
+            huis, neg_utils = self.results[best_key]
+        return huis[: bisect.bisect_right(neg_utils, -minutil)]
+
+    def get_top(
+        self, name: str, k: int, item: Union[int, None] = None
+    ) -> Union[List[Tuple[tuple, int]], None]:
+        """
+        Get the k itemsets of a dataset with the highest utility from the cache, either from
+        the top-k' itemsets of the same query with k' >= k (or fewer than k' if the dataset
+        has no more), or from the itemsets at a minimum utility if at least k of them qualify.
+
+        Parameters:
+            name: name of the dataset
+            k: number of itemsets
+            item: item that the itemsets must contain, or None for any itemsets
+
+        Returns:
+            the itemsets in order of descending utility, or None if no cached result holds them
+        """
+        with self.lock:
+            for key, (huis, _) in reversed(self.results.items()):
+                if key[0] != name:
+                    continue
+                if key[1] == "top":
+                    if key[2] != item or (key[3] < k and len(huis) == key[3]):
+                        continue
+                elif item is not None:
+                    huis = [hui for hui in huis if item in hui[0]]
+                    if len(huis) < k:
+                        continue
+                elif len(huis) < k:
+                    continue
+                self.results.move_to_end(key)
+                return huis[:k]
+        return None
+
+    def put(self, name: str, minutil: int, huis: List[Tuple[tuple, int]]) -> None:
+        """
+        Cache all the itemsets of a dataset with utility >= minutil.
+
+        Parameters:
+            name: name of the dataset
+            minutil: minimum utility
+            huis: (itemset, utility) of each itemset with utility >= minutil
+        """
+        self.store((name, "minutil", minutil), huis)
+
+    def put_top(
+        self, name: str, k: int, item: Union[int, None], huis: List[Tuple[tuple, int]]
+    ) -> None:
+        """
+        Cache the k itemsets of a dataset with the highest utility.
+
+        Parameters:
+            name: name of the dataset
+            k: number of itemsets
+            item: item that the itemsets contain, or None for any itemsets
+            huis: (itemset, utility) of each of the k itemsets, or of all the itemsets
+                if there are fewer than k
+        """
+        self.store((name, "top", item, k), huis)
+
+    def store(self, key: tuple, huis: List[Tuple[tuple, int]]) -> None:
+        """
+        Cache a result in order of descending utility, evicting the least recently used ones.
+        """
+        if self.capacity == 0:
+            return
+        huis = sorted(huis, key=lambda hui: hui[1], reverse=True)
+        neg_utils = [-util for _, util in huis]
+        with self.lock:
+            self.results[key] = (huis, neg_utils)
+            self.results.move_to_end(key)
+            while len(self.results) > self.capacity:
+                self.results.popitem(last=False)
+
+
+class MiningService:
+    """
+    Answer high utility itemset queries over resident datasets from a cache or a pool of
+    worker processes. The workers are forked once the datasets are loaded, so that they share
+    the utility lists; identical queries that arrive while one is mined wait for its result.
+
+    Attributes:
+        datasets: resident datasets keyed by name
+        cache: cache of the results
+        workers: number of worker processes
+    """
+
+    def __init__(
+        self, datasets: Dict[str, Dataset], workers: int = 1, cache_size: int = DEFAULT_CACHE_SIZE
+    ) -> None:
+        self.datasets = datasets
+        self.cache = ResultCache(cache_size)
+        self.workers = workers
+        self.pool = None
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+        Fork the worker processes.
+        """
+        global _datasets
+        _datasets = self.datasets
+        self.pool = multiprocessing.get_context("fork").Pool(self.workers)
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def mine(
+        self, name: str, minutil: int, top_k: Union[int, None], item: Union[int, None] = None
+    ) -> List[Tuple[tuple, int]]:
+        """
+        Mine a dataset in a worker process, or wait for the same query already being mined.
+        """
+        key = (name, minutil, top_k, item)
+        with self.lock:
+            result = self.pending.get(key)
+            if result is None:
+                result = self.pool.apply_async(_mine, key)
+                self.pending[key] = result
+        try:
+            return result.get()
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def huis(self, name: str, minutil: int) -> Tuple[List[Tuple[tuple, int]], bool]:
+        """
+        Get the high utility itemsets of a dataset at a minimum utility.
+
+        Parameters:
+            name: name of the dataset
+            minutil: minimum utility
+
+        Returns:
+            the itemsets in order of descending utility, and whether they came from the cache
+        """
+        huis = self.cache.get(name, minutil)
+        if huis is not None:
+            return huis, True
+        huis = self.mine(name, minutil, None)
+        self.cache.put(name, minutil, huis)
+        return sorted(huis, key=lambda hui: hui[1], reverse=True), False
+
+    def top_k(
+        self, name: str, k: int, item: Union[int, None] = None
+    ) -> Tuple[List[Tuple[tuple, int]], bool]:
+        """
+        Get the k itemsets of a dataset with the highest utility.
+
+        Parameters:
+            name: name of the dataset
+            k: number of itemsets
+            item: item that the itemsets must contain, or None for any itemsets
+
+        Returns:
+            the itemsets in order of descending utility, and whether they came from the cache
+        """
+        huis = self.cache.get_top(name, k, item)
+        if huis is not None:
+            return huis, True
+        huis = self.mine(name, 1, k, item)
+        self.cache.put_top(name, k, item, huis)
+        # fewer than k itemsets are all the itemsets of the dataset
+        if item is None and len(huis) < k:
+            self.cache.put(name, 1, huis)
+        return huis, False
+
+    def parse_minutil(self, name: str, value: str) -> int:
+        """
+        Parse a minimum utility, where a value ending with % is a percentage of the total
+        transaction utility of the dataset.
+        """
+        if value.endswith("%"):
+            return int(self.datasets[name].total_trans_util * float(value[:-1]) / 100)
+        return int(value)
+
+
+def _mine(
+    name: str, minutil: int, top_k: Union[int, None], item: Union[int, None]
+) -> List[Tuple[tuple, int]]:
+    """
+    Mine a resident dataset in a worker process.
+    """
+    return _datasets[name].mine(minutil, top_k, item)
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler of the queries of a MiningService (self.server.service):
+        GET /datasets
+        GET /huis?dataset=NAME&minutil=MINUTIL[&item=ITEM][&limit=N]
+        GET /top-k?dataset=NAME&k=K[&item=ITEM]
+    Itemsets are returned as [items, utility] pairs in order of descending utility;
+    with item, only the itemsets that contain it are returned (for top-k, the k itemsets
+    with the highest utility among those that contain it).
+    """
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        service = self.server.service
+        try:
+            if url.path == "/datasets":
+                self.reply(
+                    200,
+                    {
+                        "datasets": [
+                            {
+                                "name": name,
+                                "path": dataset.path,
+                                "transactions": dataset.n_transacs,
+                                "items": len(dataset.items),
+                                "total_trans_util": dataset.total_trans_util,
+                            }
+                            for name, dataset in service.datasets.items()
+                        ]
+                    },
+                )
+                return
+            if url.path not in ("/huis", "/top-k"):
+                self.reply(404, {"error": f"unknown path {url.path}"})
+                return
+            name = params.get("dataset")
+            if name not in service.datasets:
+                self.reply(404, {"error": f"unknown dataset {name}"})
+                return
+
+            if url.path == "/huis":
+                minutil = service.parse_minutil(name, params["minutil"])
+                if minutil < 1:
+                    raise ValueError("minutil must be positive")
+                huis, cached = service.huis(name, minutil)
+                reply = {"dataset": name, "minutil": minutil}
+                if "item" in params:
+                    item = int(params["item"])
+                    huis = [hui for hui in huis if item in hui[0]]
+            else:
+                k = int(params["k"])
+                if k < 1:
+                    raise ValueError("k must be positive")
+                item = int(params["item"]) if "item" in params else None
+                huis, cached = service.top_k(name, k, item)
+                reply = {"dataset": name, "k": k}
+            if "limit" in params:
+                limit = int(params["limit"])
+                if limit < 0:
+                    raise ValueError("limit must not be negative")
+                huis = huis[:limit]
+            reply.update(
+                {
+                    "cached": cached,
+                    "count": len(huis),
+                    "itemsets": [[list(itemset), util] for itemset, util in huis],
+                }
+            )
+            self.reply(200, reply)
+        except KeyError as e:
+            self.reply(400, {"error": f"missing parameter {e.args[0]}"})
+        except ValueError as e:
+            self.reply(400, {"error": str(e)})
+
+    def reply(self, status: int, body: Dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve high utility itemset queries over HTTP, keeping the datasets"
+        " resident in memory."
+    )
+    parser.add_argument("datasets", nargs="+", help="relative paths to the data files to serve")
+    parser.add_argument(
+        "--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)"
+    )
+    parser.add_argument("--port", type=int, default=8421, help="port to listen on (default: 8421)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="number of processes that mine queries (default: the number of CPUs)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help=f"number of query results kept in the cache, or 0 to disable it"
+        f" (default: {DEFAULT_CACHE_SIZE})",
+    )
+    args = parser.parse_args()
+    if args.cache_size < 0:
+        parser.error("--cache-size must not be negative")
+
+    # datasets are named after their file names
+    datasets = {}
+    for path in args.datasets:
+        name = os.path.splitext(os.path.basename(path))[0]
+        print(f"loading {name} from {path}")
+        datasets[name] = Dataset(path)
+    service = MiningService(datasets, workers=args.workers, cache_size=args.cache_size)
+    service.start()
+    server = ThreadingHTTPServer((args.host, args.port), QueryHandler)
+    server.service = service
+    print(f"serving {', '.join(datasets)} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,652 @@
+import os
+import mmap
+import time
+import shutil
+import argparse
+import tempfile
+from array import array
+from typing import Iterable, List, Tuple, Union
+from fhm import FHM, PRUNING_STRATEGIES
+from fhm_utils import UtilList, EUCS, DENSE_EUCS_MAX_ITEMS
+from dataset import load
+from instrument import Profiler, dump_profile, log_experiment
+from sinks import ResultSink
+
+# number of transactions per shard when neither a shard size nor a memory budget is given
+DEFAULT_SHARD_SIZE = 100_000
+# fraction of the memory budget the utility lists of one shard may take while it is built
+SHARD_MEMORY_FRACTION = 0.25
+# bytes taken by an element of a utility list (tid, iutil and rutil as int64)
+ELEMENT_SIZE = 24
+# bytes taken by an element of one column of a utility list
+COLUMN_SIZE = ELEMENT_SIZE // 3
+# bytes taken by an empty utility list (the object, its attributes and three empty arrays),
+# of which a shard holds one per item while it is built
+UTIL_LIST_SIZE = 600
+# bytes taken by the entry of an item in the index of a shard file (offset and length as int64)
+INDEX_ENTRY_SIZE = 16
+# bytes taken by a pair of items of a sparse EUCS while it is built (a dictionary entry)
+SPARSE_PAIR_SIZE = 100
+
+
+class MappedUtilList:
+    """
+    Utility list of an item in a shard, read from the memory-mapped shard file.
+    Its sums are only set for the utility lists of a branch file.
+    """
+
+    __slots__ = ("item", "tids", "iutils", "rutils", "sum_iutils", "sum_rutils")
+
+    def __init__(self, item: int, tids: memoryview, iutils: memoryview, rutils: memoryview) -> None:
+        self.item = item
+        self.tids = tids
+        self.iutils = iutils
+        self.rutils = rutils
+        self.sum_iutils = 0
+        self.sum_rutils = 0
+
+    def __len__(self) -> int:
+        return len(self.tids)
+
+    def nbytes(self) -> int:
+        # the elements are in the page cache, which the kernel reclaims under pressure
+        return 0
+
+
+class Shard:
+    """
+    Memory-mapped shard file: the utility lists of all the items over a range of tids.
+
+    The file starts with the offset (in elements) and the length of the utility list of each
+    item, as int64 pairs indexed by rank, followed by the tids, iutils and rutils of each
+    utility list as int64 arrays.
+    """
+
+    def __init__(self, path: str, n_items: int) -> None:
+        self.path = path
+        self.n_items = n_items
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mmap).cast("q")
+        self.slices = []
+
+    def util_list(self, rank: int) -> MappedUtilList:
+        """
+        Get the utility list of an item in the shard without copying it.
+
+        Parameters:
+            rank: rank of the item
+
+        Returns:
+            the utility list, valid until the shard is closed or its lists are released
+        """
+        start = 2 * self.n_items + self.view[2 * rank]
+        length = self.view[2 * rank + 1]
+        columns = [self.view[start + k * length : start + (k + 1) * length] for k in range(3)]
+        self.slices += columns
+        return MappedUtilList(rank, *columns)
+
+    def release(self) -> None:
+        """
+        Release the utility lists got from the shard so far, which must no longer be used.
+        """
+        for view in self.slices:
+            view.release()
+        self.slices = []
+
+    def close(self) -> None:
+        self.release()
+        self.view.release()
+        self.mmap.close()
+
+    def __enter__(self) -> "Shard":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_shard(path: str, util_lists: List[UtilList]) -> None:
+    """
+    Write the utility lists of all the items over a range of tids to a shard file.
+
+    Parameters:
+        path: path to the shard file
+        util_lists: utility list of each item, indexed by rank
+    """
+    index = array("q")
+    offset = 0
+    for util_list in util_lists:
+        index.append(offset)
+        index.append(len(util_list))
+        offset += 3 * len(util_list)
+    with open(path, "wb") as f:
+        index.tofile(f)
+        for util_list in util_lists:
+            util_list.tids.tofile(f)
+            util_list.iutils.tofile(f)
+            util_list.rutils.tofile(f)
+
+
+def write_branch(path: str, pieces_path: str, pieces: List[List[Tuple[int, int]]]) -> None:
+    """
+    Write utility lists whose elements were spilled shard by shard to a branch file in the
+    layout of a shard file, copying one column of a piece at a time.
+
+    Parameters:
+        path: path to the branch file
+        pieces_path: path to the file of the pieces, each one the tids, iutils and rutils
+            of a utility list over a shard as int64 arrays
+        pieces: (offset, length) in elements of the pieces of each utility list, in order
+    """
+    index = array("q")
+    offset = 0
+    for list_pieces in pieces:
+        length = sum([piece_length for _, piece_length in list_pieces])
+        index.append(offset)
+        index.append(length)
+        offset += 3 * length
+    with open(path, "wb") as f:
+        index.tofile(f)
+        if offset == 0:
+            return
+        with open(pieces_path, "rb") as pieces_file:
+            with mmap.mmap(pieces_file.fileno(), 0, access=mmap.ACCESS_READ) as pieces_mmap:
+                with memoryview(pieces_mmap) as view:
+                    for list_pieces in pieces:
+                        for k in range(3):
+                            for start, length in list_pieces:
+                                first = (start + k * length) * COLUMN_SIZE
+                                f.write(view[first : first + length * COLUMN_SIZE])
+
+
+def EUCS_bytes(n_items: int, db) -> int:
+    """
+    Get an upper bound on the memory taken by the EUCS of the promising items of a dataset.
+
+    Parameters:
+        n_items: number of promising items
+        db: binary layout of the dataset, to bound the number of pairs of a sparse EUCS
+            by the pairs of items of each transaction
+
+    Returns:
+        the bytes of the packed triangle of a dense EUCS, or of the pairs of a sparse one
+    """
+    n_pairs = n_items * (n_items - 1) // 2
+    if n_items <= DENSE_EUCS_MAX_ITEMS:
+        return n_pairs * 8
+    offsets = db.offsets
+    transac_pairs = 0
+    for tid in range(len(db)):
+        length = offsets[tid + 1] - offsets[tid]
+        transac_pairs += length * (length - 1) // 2
+    return min(n_pairs, transac_pairs) * SPARSE_PAIR_SIZE
+
+
+def extend_column(column: array, view: memoryview) -> None:
+    # append the elements of a memory-mapped column to an in-memory one
+    with view.cast("B") as raw:
+        column.frombytes(raw)
+
+
+class ShardedFHM(FHM):
+    """
+    FHM for datasets whose utility lists do not fit in memory. The database is partitioned
+    by tid range into shards, and the utility lists of each shard are written to disk and
+    memory-mapped back when they are joined.
+
+    Since the shards hold disjoint ranges of tids, the utility list of an itemset is the
+    concatenation of its utility lists in each shard, and its sums are the sums over the shards.
+    The 1-itemsets are searched from these sums and the EUCS alone, so a branch that is pruned
+    never touches disk. The utility lists of the 2-itemsets of each other branch are joined
+    shard by shard, and the rest of the branch is searched in memory like FHM does.
+    The itemsets are written in the same order as FHM.
+
+    Memory is bounded by the EUCS and the utility lists of one shard while the shards are
+    built. Without max_memory, the utility lists of a branch (the list of its item and of its
+    2-itemsets) are held in memory while it is searched. With max_memory, what is left of
+    the budget once the EUCS and the empty utility list and index entry of each item are taken
+    out of it bounds the size of a shard, and the lists of a branch that would exceed it are
+    joined shard by shard into a branch file that is memory-mapped back instead. Deeper
+    utility lists are constructed lazily past the budget.
+
+    Attributes:
+        shard_size: number of transactions per shard, or None to derive it from max_memory
+        shard_dir: directory the shard files are written to, or None for the temporary directory
+        shard_paths: paths to the shard files
+        shards: shard files memory-mapped while the search runs
+        list_budget: bytes of the memory budget left for utility lists once the EUCS and the
+            per-item overhead of a shard are taken out of it, or None without a budget
+        sum_iutils: sum of the iutils of each item over all the shards, indexed by rank
+        sum_rutils: sum of the rutils of each item over all the shards, indexed by rank
+        list_lengths: number of elements of the utility list of each item over all the shards,
+            indexed by rank
+    """
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        minutil: int,
+        shard_size: Union[int, None] = None,
+        shard_dir: Union[str, None] = None,
+        max_memory: Union[float, None] = None,
+        sink: Union[ResultSink, None] = None,
+        profiler: Union[Profiler, None] = None,
+        pruning: Union[Iterable[str], None] = None,
+    ) -> None:
+        """
+        Constructor for ShardedFHM.
+
+        Parameters:
+            input_path: relative path to the data file
+            output_path: relative path to the output file
+            minutil: minimum utility
+            shard_size: number of transactions per shard, or None to fit the utility lists
+                of a shard in a quarter of max_memory (or DEFAULT_SHARD_SIZE without a budget)
+            shard_dir: directory to write the shard files to, or None for the
+                temporary directory
+            max_memory: budget (MB) for the utility lists held by the search, or None
+            sink: destination of the high utility itemsets, or None to write them
+                to output_path in the text format
+            profiler: profiler of the phases of the algorithm, or None for one
+                without counters per search depth
+            pruning: pruning strategies of PRUNING_STRATEGIES to enable, or None for all of them
+        """
+        super().__init__(
+            input_path,
+            output_path,
+            minutil,
+            sink=sink,
+            max_memory=max_memory,
+            profiler=profiler,
+            pruning=pruning,
+        )
+        self.shard_size = shard_size
+        self.shard_dir = shard_dir
+        self.shard_paths = []
+        self.shards = []
+        self.list_budget = None
+        self.sum_iutils = []
+        self.sum_rutils = []
+        self.list_lengths = []
+
+    def fhm(self) -> None:
+        """
+        Run the FHM algorithm over shards of the database.
+        """
+        start_time = time.time()  # start timing algorithm
+        self.profiler.phase("TWU scan")
+        self.itemset_buffer = []
+        self.live_bytes = 0
+
+        # the TWU of each item and the number of entries of the transactions
+        # are read from the binary layout of DB without scanning it
+        with load(self.input_path) as db:
+            n_transacs = len(db)
+            n_entries = len(db.items)
+            item_TWU_dict = db.item_TWUs()  # dictionary of items and their TWU
+
+            # recode the items with TWU >= minutil to their ranks in order of ascending TWU
+            promising_items = []
+            for item, TWU in item_TWU_dict.items():
+                if TWU >= self.minutil or "twu" not in self.pruning:
+                    promising_items.append(item)
+                else:
+                    self.count_prunes("twu")
+            promising_items.sort(key=lambda item: item_TWU_dict[item])
+            self.items = promising_items
+
+            # the EUCS and the empty utility list and index entry of each item of a shard
+            # are held whatever the size of the shards
+            if self.max_memory is not None:
+                n_items = len(promising_items)
+                overhead = EUCS_bytes(n_items, db) + n_items * (UTIL_LIST_SIZE + INDEX_ENTRY_SIZE)
+                self.list_budget = self.max_memory * 1024 * 1024 - overhead
+
+        # fit the utility lists of a shard in a fraction of what is left of the memory budget
+        shard_size = self.shard_size
+        if shard_size is None:
+            if self.max_memory is not None and n_entries > 0:
+                if self.list_budget <= 0:
+                    raise ValueError(
+                        f"a memory budget of {self.max_memory} MB does not fit the EUCS and the"
+                        f" utility lists of {len(self.items)} items; give a larger budget"
+                        " or a shard size"
+                    )
+                shard_bytes = self.list_budget * SHARD_MEMORY_FRACTION
+                shard_size = max(1, int(shard_bytes / (ELEMENT_SIZE * n_entries / n_transacs)))
+            else:
+                shard_size = DEFAULT_SHARD_SIZE
+
+        shard_dir = tempfile.mkdtemp(prefix="fhm-shards-", dir=self.shard_dir)
+        try:
+            # second DB scan to write the utility lists of each shard and populate EUCS
+            self.profiler.phase("list/EUCS build")
+            self.build_shards(shard_dir, shard_size)
+
+            # search for itemsets depth first
+            self.profiler.phase("search")
+            self.sink.open()
+            try:
+                self.sharded_search(shard_dir)
+            finally:
+                self.profiler.phase("output")
+                self.sink.close()
+        finally:
+            shutil.rmtree(shard_dir)
+            self.shard_paths = []
+        self.profiler.stop()
+
+        self.runtime = (time.time() - start_time) * 1_000  # stop timing algorithm
+
+    def build_shards(self, shard_dir: str, shard_size: int) -> None:
+        """
+        Write the utility lists of the items over each range of shard_size tids to a shard
+        file, add up their sums over all the shards and populate EUCS.
+
+        Parameters:
+            shard_dir: directory to write the shard files to
+            shard_size: number of transactions per shard
+        """
+        n_items = len(self.items)
+        item_rank_dict = {item: rank for rank, item in enumerate(self.items)}
+        self.sum_iutils = [0] * n_items
+        self.sum_rutils = [0] * n_items
+        self.list_lengths = [0] * n_items
+        self.EUCS = EUCS(n_items)
+        util_lists = []
+
+        with load(self.input_path) as db:
+            for tid, (items, transac_util, item_utils) in enumerate(db):
+                self.total_trans_util += transac_util
+                if tid % shard_size == 0:
+                    self.spill(shard_dir, util_lists)
+                    util_lists = [UtilList(rank) for rank in range(n_items)]
+
+                # get (rank, util) pairs of items that have TWU >= minutil
+                rank_pairs = []
+                rutil = 0
+                for item, util in zip(items, item_utils):
+                    rank = item_rank_dict.get(item)
+                    if rank is not None:
+                        rank_pairs.append((rank, util))
+                        rutil += util
+
+                # sort rank_pairs in order of ascending TWU
+                rank_pairs.sort()
+
+                # append (tid, iutil, rutil) to the utility lists of the items in the shard
+                for rank, util in rank_pairs:
+                    rutil -= util
+                    util_lists[rank].add_elem(tid, util, rutil)
+
+                # populate EUCS
+                self.EUCS.add_transaction(tuple([rank for rank, _ in rank_pairs]), transac_util)
+        self.spill(shard_dir, util_lists)
+        self.EUCS.finalize()
+
+    def spill(self, shard_dir: str, util_lists: List[UtilList]) -> None:
+        """
+        Write the utility lists of a shard to a new shard file and add their sums to
+        the sums over all the shards.
+
+        Parameters:
+            shard_dir: directory to write the shard file to
+            util_lists: utility list of each item in the shard, indexed by rank
+        """
+        if not util_lists or not any(util_lists):
+            return
+        for util_list in util_lists:
+            self.sum_iutils[util_list.item] += util_list.sum_iutils
+            self.sum_rutils[util_list.item] += util_list.sum_rutils
+            self.list_lengths[util_list.item] += len(util_list)
+        path = os.path.join(shard_dir, f"shard_{len(self.shard_paths)}.bin")
+        write_shard(path, util_lists)
+        self.shard_paths.append(path)
+
+    def sharded_search(self, shard_dir: str) -> None:
+        """
+        Search all high utility itemsets, reading the utility lists of the 1-itemsets
+        from the shards only for the branches that are not pruned. The shards are mapped
+        once for the whole search.
+
+        Parameters:
+            shard_dir: directory of the shard files, where branch files are written
+        """
+        n_items = len(self.items)
+        self.shards = []
+        try:
+            for path in self.shard_paths:
+                self.shards.append(Shard(path, n_items))
+            self.search_branches(shard_dir)
+        finally:
+            for shard in self.shards:
+                shard.close()
+            self.shards = []
+
+    def search_branches(self, shard_dir: str) -> None:
+        """
+        Search the branch of each item from the shards mapped in self.shards.
+
+        Parameters:
+            shard_dir: directory where branch files are written
+        """
+        n_items = len(self.items)
+        counters = self.profiler.depth_counters
+        minutil = self.minutil if "eucs" in self.pruning else 1
+
+        # for each item x
+        for x in range(n_items):
+            x_iutils = self.sum_iutils[x]
+
+            # output itemset if it has high utility
+            if x_iutils >= self.minutil:
+                self.output(self.items[x], x_iutils)
+
+            # condition to explore extensions of {x}, from the sums over the shards
+            if x_iutils + self.sum_rutils[x] < self.minutil and "bound" in self.pruning:
+                self.count_prunes("bound")
+                if counters is not None:
+                    self.profiler.count("bound_prunes", 1)
+                continue
+
+            # items y > x such that {x, y} may have high utility, from EUCS
+            candidates = []
+            eucs_prunes = 0
+            for y in range(x + 1, n_items):
+                x_y_TWU = self.EUCS.get(x, y)
+                if x_y_TWU > 0:
+                    if x_y_TWU >= minutil:
+                        self.candidate_count += 1
+                        candidates.append(y)
+                    else:
+                        eucs_prunes += 1
+            if eucs_prunes:
+                self.count_prunes("eucs", eucs_prunes)
+            if counters is not None:
+                self.profiler.count("eucs_prunes", 2, eucs_prunes)
+            if not candidates:
+                continue
+
+            # search the itemsets with the prefix {x} in memory, or from a branch file if
+            # its utility lists (each {x, y} has at most the elements of {x}) exceed the budget
+            branch_bytes = ELEMENT_SIZE * self.list_lengths[x] * (1 + len(candidates))
+            branch = None
+            if self.list_budget is not None and branch_bytes > self.list_budget:
+                branch, prefix_x_UL, prefix_x_ext_ULs = self.map_branch(x, candidates, shard_dir)
+            else:
+                prefix_x_UL, prefix_x_ext_ULs = self.load_branch(x, candidates)
+            try:
+                if counters is not None:
+                    self.profiler.count("joins", 2, len(prefix_x_ext_ULs))
+                    self.profiler.count("elements", 2, sum(map(len, prefix_x_ext_ULs)))
+                self.live_bytes = sum([util_list.nbytes() for util_list in prefix_x_ext_ULs])
+                self.itemset_buffer.append(self.items[x])
+                self.search(prefix_x_UL, prefix_x_ext_ULs, prefix_length=1)
+                self.itemset_buffer.pop()
+                self.live_bytes = 0
+            finally:
+                if branch is not None:
+                    branch.close()
+                    os.remove(os.path.join(shard_dir, "branch.bin"))
+
+    def load_branch(self, x: int, candidates: List[int]) -> Tuple[UtilList, List[UtilList]]:
+        """
+        Read the utility list of the item x from the shards and join it with the utility
+        lists of the items y in candidates, shard by shard.
+
+        Parameters:
+            x: rank of the item
+            candidates: ranks of the items y > x that may extend {x}
+
+        Returns:
+            the utility lists of {x} and of each itemset {x, y}
+        """
+        prefix_x_UL = UtilList(x)
+        prefix_x_ext_ULs = [UtilList(y) for y in candidates]
+        for shard in self.shards:
+            x_UL = shard.util_list(x)
+            if len(x_UL):
+                extend_column(prefix_x_UL.tids, x_UL.tids)
+                extend_column(prefix_x_UL.iutils, x_UL.iutils)
+                extend_column(prefix_x_UL.rutils, x_UL.rutils)
+                for x_y_UL in prefix_x_ext_ULs:
+                    shard_x_y_UL = self.construct(None, x_UL, shard.util_list(x_y_UL.item))
+                    x_y_UL.tids.extend(shard_x_y_UL.tids)
+                    x_y_UL.iutils.extend(shard_x_y_UL.iutils)
+                    x_y_UL.rutils.extend(shard_x_y_UL.rutils)
+                    x_y_UL.sum_iutils += shard_x_y_UL.sum_iutils
+                    x_y_UL.sum_rutils += shard_x_y_UL.sum_rutils
+            shard.release()
+        prefix_x_UL.sum_iutils = self.sum_iutils[x]
+        prefix_x_UL.sum_rutils = self.sum_rutils[x]
+        return prefix_x_UL, prefix_x_ext_ULs
+
+    def map_branch(
+        self, x: int, candidates: List[int], shard_dir: str
+    ) -> Tuple[Shard, MappedUtilList, List[MappedUtilList]]:
+        """
+        Join the utility list of the item x with the utility lists of the items y in
+        candidates shard by shard like load_branch, but spill the lists of each shard to disk
+        and memory-map them back from a branch file, so that they are never all in memory.
+
+        Parameters:
+            x: rank of the item
+            candidates: ranks of the items y > x that may extend {x}
+            shard_dir: directory to write the branch file to
+
+        Returns:
+            the branch file, to close once the branch has been searched, and the utility
+            lists of {x} and of each itemset {x, y} mapped from it
+        """
+        pieces_path = os.path.join(shard_dir, "pieces.bin")
+        branch_path = os.path.join(shard_dir, "branch.bin")
+        # pieces of the utility list of {x} and of each {x, y}, and the sums of each {x, y}
+        pieces = [[] for _ in range(len(candidates) + 1)]
+        sums = [[0, 0] for _ in candidates]
+        offset = 0
+        try:
+            with open(pieces_path, "wb") as pieces_file:
+                for shard in self.shards:
+                    x_UL = shard.util_list(x)
+                    if len(x_UL):
+                        for column in (x_UL.tids, x_UL.iutils, x_UL.rutils):
+                            pieces_file.write(column)
+                        pieces[0].append((offset, len(x_UL)))
+                        offset += 3 * len(x_UL)
+                        for c, y in enumerate(candidates):
+                            shard_x_y_UL = self.construct(None, x_UL, shard.util_list(y))
+                            shard_x_y_UL.tids.tofile(pieces_file)
+                            shard_x_y_UL.iutils.tofile(pieces_file)
+                            shard_x_y_UL.rutils.tofile(pieces_file)
+                            pieces[c + 1].append((offset, len(shard_x_y_UL)))
+                            offset += 3 * len(shard_x_y_UL)
+                            sums[c][0] += shard_x_y_UL.sum_iutils
+                            sums[c][1] += shard_x_y_UL.sum_rutils
+                    shard.release()
+            write_branch(branch_path, pieces_path, pieces)
+        finally:
+            os.remove(pieces_path)
+
+        branch = Shard(branch_path, len(pieces))
+        prefix_x_UL = branch.util_list(0)
+        prefix_x_UL.item = x
+        prefix_x_UL.sum_iutils = self.sum_iutils[x]
+        prefix_x_UL.sum_rutils = self.sum_rutils[x]
+        prefix_x_ext_ULs = []
+        for c, y in enumerate(candidates):
+            x_y_UL = branch.util_list(c + 1)
+            x_y_UL.item = y
+            x_y_UL.sum_iutils, x_y_UL.sum_rutils = sums[c]
+            prefix_x_ext_ULs.append(x_y_UL)
+        return branch, prefix_x_UL, prefix_x_ext_ULs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mine high utility itemsets with FHM over shards of the database on disk."
+    )
+    parser.add_argument("input_path", help="relative path to the data file")
+    parser.add_argument("output_path", help="relative path to the output file")
+    parser.add_argument("minutil", type=int, help="minimum utility")
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=None,
+        help="number of transactions per shard (default: derived from --max-memory,"
+        f" or {DEFAULT_SHARD_SIZE})",
+    )
+    parser.add_argument(
+        "--shard-dir",
+        default=None,
+        help="directory to write the shard files to (default: the temporary directory)",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=float,
+        default=None,
+        help="memory budget (MB): once the EUCS and the per-item overhead are taken out of it,"
+        " a shard's utility lists take at most a quarter of the rest, and the search"
+        " constructs utility lists lazily past it",
+    )
+    parser.add_argument(
+        "--pruning",
+        type=lambda value: [strategy for strategy in value.split(",") if strategy],
+        default=list(PRUNING_STRATEGIES),
+        help="comma-separated pruning strategies to enable, or an empty string for none"
+        f" (default: {','.join(PRUNING_STRATEGIES)})",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="path to a JSON file to write the time and memory of each phase"
+        " and the counters per search depth to",
+    )
+    parser.add_argument(
+        "--experiment-csv",
+        default=None,
+        help="path to a csv file of experiments to append the statistics of the run to",
+    )
+    args = parser.parse_args()
+    for strategy in args.pruning:
+        if strategy not in PRUNING_STRATEGIES:
+            parser.error(
+                f"unknown pruning strategy {strategy}; choose from {', '.join(PRUNING_STRATEGIES)}"
+            )
+    fhm = ShardedFHM(
+        args.input_path,
+        args.output_path,
+        args.minutil,
+        shard_size=args.shard_size,
+        shard_dir=args.shard_dir,
+        max_memory=args.max_memory,
+        pruning=args.pruning,
+        profiler=Profiler(depth_counters=args.profile is not None),
+    )
+    fhm.run()
+    fhm.print_stats()
+    if args.profile is not None:
+        dump_profile(args.profile, fhm)
+    if args.experiment_csv is not None:
+        log_experiment(args.experiment_csv, fhm)
@@ -0,0 +1,352 @@
+import mmap
+from bisect import bisect_right
+import queue
+import threading
+from typing import BinaryIO, Callable, Iterator, List, Sequence, Tuple
+
+# magic number at the start of a binary result file
+MAGIC = b"HUIBIN01"
+# number of itemsets a sink buffers before writing them out
+BATCH_SIZE = 4096
+
+
+class ResultSink:
+    """
+    Destination of the high utility itemsets found by a miner.
+    Itemsets are written between open() and close().
+    """
+
+    def open(self) -> None:
+        pass
+
+    def write(self, itemset: Sequence[int], util: int) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class TextSink(ResultSink):
+    """
+    Write itemsets in the text format "items #UTIL: utility", formatting them in batches.
+    """
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.batch = []
+        self.file = None
+
+    def open(self) -> None:
+        self.file = open(self.path, "w")
+
+    def write(self, itemset: Sequence[int], util: int) -> None:
+        self.batch.append((itemset, util))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self.file.write(
+            "".join(
+                [
+                    " ".join([str(item) for item in itemset]) + f" #UTIL: {util}\n"
+                    for itemset, util in self.batch
+                ]
+            )
+        )
+        self.batch = []
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+
+class BinarySink(ResultSink):
+    """
+    Write itemsets in a compact binary format: after the magic number, each itemset is the
+    number of its items, its items and its utility, all encoded as unsigned LEB128 varints.
+    """
+
+    def __init__(self, path: str, header: bool = True, batch_size: int = BATCH_SIZE) -> None:
+        self.path = path
+        self.header = header
+        self.batch_size = batch_size
+        self.buffer = bytearray()
+        self.count = 0
+        self.file = None
+
+    def open(self) -> None:
+        self.file = open(self.path, "wb")
+        if self.header:
+            self.file.write(MAGIC)
+
+    def write(self, itemset: Sequence[int], util: int) -> None:
+        encode_varint(self.buffer, len(itemset))
+        for item in itemset:
+            encode_varint(self.buffer, item)
+        encode_varint(self.buffer, util)
+        self.count += 1
+        if self.count >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self.file.write(self.buffer)
+        self.buffer = bytearray()
+        self.count = 0
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+
+class ClosedTextSink(TextSink):
+    """
+    Write closed itemsets in the text format
+    "items #UTIL: utility #SUP: support #IUTILS: utility of each item", which is enough
+    to recover every high utility itemset (see closed_fhm.recover_huis).
+    """
+
+    def write(
+        self, itemset: Sequence[int], util: int, support: int, item_utils: Sequence[int]
+    ) -> None:
+        self.batch.append((itemset, util, support, item_utils))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self.file.write(
+            "".join(
+                [
+                    " ".join([str(item) for item in itemset])
+                    + f" #UTIL: {util} #SUP: {support} #IUTILS: "
+                    + " ".join([str(item_util) for item_util in item_utils])
+                    + "\n"
+                    for itemset, util, support, item_utils in self.batch
+                ]
+            )
+        )
+        self.batch = []
+
+
+class ApproxTextSink(TextSink):
+    """
+    Write itemsets with an estimated utility in the text format
+    "items #UTIL: estimated utility #CI: lower bound upper bound", where the bounds are those
+    of a confidence interval of the utility.
+    """
+
+    def write(self, itemset: Sequence[int], util: int, low: int, high: int) -> None:
+        self.batch.append((itemset, util, low, high))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self.file.write(
+            "".join(
+                [
+                    " ".join([str(item) for item in itemset])
+                    + f" #UTIL: {util} #CI: {low} {high}\n"
+                    for itemset, util, low, high in self.batch
+                ]
+            )
+        )
+        self.batch = []
+
+
+class CallbackSink(ResultSink):
+    """
+    Pass each itemset and its utility to a function instead of writing them out.
+    """
+
+    def __init__(self, callback: Callable[[Tuple[int, ...], int], None]) -> None:
+        self.callback = callback
+
+    def write(self, itemset: Sequence[int], util: int) -> None:
+        self.callback(tuple(itemset), util)
+
+
+class ThresholdSink(ResultSink):
+    """
+    Split the itemsets found by a search at the lowest of several minimum utilities between
+    one sink per minimum utility, each receiving the itemsets whose utility reaches it.
+
+    Attributes:
+        minutils: minimum utilities in ascending order
+        sinks: sink of each minimum utility
+        counts: number of itemsets written to the sink of each minimum utility
+    """
+
+    def __init__(self, minutils: Sequence[int], sinks: Sequence[ResultSink]) -> None:
+        self.minutils = list(minutils)
+        self.sinks = list(sinks)
+        self.counts = [0] * len(self.sinks)
+
+    def open(self) -> None:
+        for sink in self.sinks:
+            sink.open()
+
+    def write(self, itemset: Sequence[int], util: int) -> None:
+        # the itemset reaches every minimum utility up to the highest one it satisfies
+        for level in range(bisect_right(self.minutils, util)):
+            self.sinks[level].write(itemset, util)
+            self.counts[level] += 1
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+class SinkClosed(Exception):
+    """
+    Raised by QueueSink.write() once its reader has gone away, to stop the miner.
+    """
+
+
+class QueueSink(ResultSink):
+    """
+    Put batches of itemsets on a queue read by another thread.
+    """
+
+    def __init__(self, results: queue.Queue, batch_size: int = BATCH_SIZE) -> None:
+        self.results = results
+        self.batch_size = batch_size
+        self.batch = []
+        self.cancelled = threading.Event()
+
+    def write(self, itemset: Sequence[int], util: int) -> None:
+        self.batch.append((tuple(itemset), util))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.put(self.batch):
+            raise SinkClosed
+        self.batch = []
+
+    def put(self, obj: object) -> bool:
+        """
+        Put an object on the queue, waiting for room unless the reader cancels.
+
+        Parameters:
+            obj: object to put on the queue
+
+        Returns:
+            False if the reader cancelled before there was room
+        """
+        while not self.cancelled.is_set():
+            try:
+                self.results.put(obj, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def close(self) -> None:
+        if self.batch:
+            self.flush()
+
+
+def encode_varint(buffer: bytearray, value: int) -> None:
+    """
+    Append a non-negative integer to a buffer as an unsigned LEB128 varint.
+
+    Parameters:
+        buffer: buffer to append to
+        value: non-negative integer to encode
+    """
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def decode_huis(data: bytes, pos: int = 0) -> Iterator[Tuple[Tuple[int, ...], int]]:
+    """
+    Decode itemsets written by a BinarySink.
+
+    Parameters:
+        data: encoded itemsets
+        pos: offset of the first itemset in data
+
+    Returns:
+        an iterator of (itemset, utility) in the order they were written
+    """
+    end = len(data)
+    while pos < end:
+        values = []
+        n_values = None
+        # read the number of items, then the items and the utility
+        while n_values is None or len(values) < n_values:
+            value = 0
+            shift = 0
+            while True:
+                byte = data[pos]
+                pos += 1
+                value |= (byte & 0x7F) << shift
+                if byte < 0x80:
+                    break
+                shift += 7
+            if n_values is None:
+                n_values = value + 1
+            else:
+                values.append(value)
+        yield tuple(values[:-1]), values[-1]
+
+
+def read_binary_huis(path: str) -> Iterator[Tuple[Tuple[int, ...], int]]:
+    """
+    Read the itemsets of a binary result file.
+
+    Parameters:
+        path: path to a file written by a BinarySink
+
+    Returns:
+        an iterator of (itemset, utility) in the order they were written
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a binary result file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from decode_huis(data, len(MAGIC))
+
+
+def read_closed_huis(
+    path: str,
+) -> Iterator[Tuple[Tuple[int, ...], int, int, Tuple[int, ...]]]:
+    """
+    Read the closed itemsets of a file written by a ClosedTextSink.
+
+    Parameters:
+        path: path to the file
+
+    Returns:
+        an iterator of (itemset, utility, support, utility of each item)
+        in the order they were written
+    """
+    with open(path) as f:
+        for line in f:
+            items, line = line.split(" #UTIL: ")
+            util, line = line.split(" #SUP: ")
+            support, item_utils = line.split(" #IUTILS: ")
+            yield (
+                tuple([int(item) for item in items.split()]),
+                int(util),
+                int(support),
+                tuple([int(item_util) for item_util in item_utils.split()]),
+            )
+
+
+def read_part(part_file: BinaryIO, start: int, end: int) -> List[Tuple[Tuple[int, ...], int]]:
+    """
+    Read the itemsets written to a byte range of a headerless binary file.
+
+    Parameters:
+        part_file: file opened in binary mode
+        start: offset of the first itemset
+        end: offset after the last itemset
+
+    Returns:
+        list of (itemset, utility) in the order they were written
+    """
+    part_file.seek(start)
+    return list(decode_huis(part_file.read(end - start)))
@@ -1,9 +1,23 @@
-import sys
 import time
 import csv
 import os
-from typing import List
-from memory_profiler import memory_usage
+import argparse
+import multiprocessing
+from array import array
+from operator import add
+from typing import List, Tuple, Union
+from dataset import load
+from instrument import Profiler, dump_profile
+from two_phase_utils import VerticalDB, slice_bitmap
+
+# number of tid ranges the transactions are split into per worker, so that workers that
+# finish their ranges early take more instead of idling
+CHUNKS_PER_WORKER = 4
+
+# vertical database and keys (tid bitmaps or itemsets) of a parallel count,
+# set before the worker processes are forked so that they inherit them instead of
+# receiving them pickled
+_shared_count = None
 
 
 class TwoPhase:
@@ -20,10 +34,20 @@ class TwoPhase:
         candidate_count: number of candidate high utility itemsets
         prune_count: number of itemsets pruned
         runtime: total runtime of the algorithm
+        workers: number of processes that count TWUs and utilities over ranges of transactions
+        profiler: wall time, CPU time and peak memory of each phase of the algorithm
+            ("scan", "phase 1", "phase 2" and "output"), and optionally counters per level
         total_trans_util: total transaction utility of the dataset
     """
 
-    def __init__(self, input_path: str, output_path: str, minutil: int) -> None:
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        minutil: int,
+        workers: int = 1,
+        profiler: Union[Profiler, None] = None,
+    ) -> None:
         """
         Constructor for TwoPhase.
 
@@ -31,6 +55,10 @@ class TwoPhase:
             input_path: relative path to the data file
             output_path: relative path to the output file
             minutil: minimum utility
+            workers: number of processes that count TWUs and utilities
+                over ranges of transactions
+            profiler: profiler of the phases of the algorithm, or None for one
+                without counters per level
         """
         self.input_path = input_path
         self.output_path = output_path
@@ -42,36 +70,35 @@ class TwoPhase:
         self.candidate_count = 0
         self.prune_count = 0
         self.runtime = 0
+        self.workers = workers
+        self.profiler = profiler if profiler is not None else Profiler()
         self.total_trans_util = 0
 
     def run(self) -> None:
         """
-        Wrapper of the two_phase() method that tracks memory usage.
+        Wrapper of the two_phase() method that records the maximum memory usage.
         """
-        # get max memory usage for one run of Two Phase
-        self.mem_usage = memory_usage(self.two_phase, max_usage=True, max_iterations=1)
+        # max memory usage of the phases of one run of Two Phase
+        self.two_phase()
+        self.mem_usage = self.profiler.peak_memory_mb
 
     def two_phase(self) -> None:
         """
         Run the Two-Phase algorithm.
         """
         start_time = time.time()
+        self.profiler.phase("scan")
+
+        # scan DB once to build its vertical layout (a tid bitmap per item);
+        # every later count is computed from the bitmaps instead of rescanning DB
+        with load(self.input_path) as db:
+            vertical_db = VerticalDB(db)
+        self.total_trans_util = vertical_db.total_trans_util
 
         # Phase 1
-        # scan DB to calculate TWU of each item
-        item_TWU_dict = {}
-        with open(self.input_path) as db:
-            for transac in db:
-                transac_data = transac.split(":")
-                items = transac_data[0].split()
-                transac_util = int(transac_data[1])
-                self.total_trans_util += transac_util
-                for item in items:
-                    item = int(item)
-                    if item in item_TWU_dict:
-                        item_TWU_dict[item] += transac_util
-                    else:
-                        item_TWU_dict[item] = transac_util
+        self.profiler.phase("phase 1")
+        # calculate TWU of each item
+        item_TWU_dict = vertical_db.item_TWUs()
 
         # get candidate high utility 1-itemsets with TWU >= minutil
         one_itemsets = []
@@ -83,70 +110,92 @@ class TwoPhase:
 
         self.candidates += one_itemsets
 
+        # the utility of each candidate 1-itemset is read from the full dataset before it is
+        # projected; each later level is counted in Phase 2 over the dataset projected for it
+        itemset_util_dict = {
+            (item,): sum(vertical_db.item_utils[item].values()) for [item] in one_itemsets
+        }
+        levels = []
+
         k_min_one_itemsets = one_itemsets
+        k_min_one_itemset_tids = None
         k = 2
         while True:
             print("k:", k)
 
+            # project DB on the items of the candidate (k-1)-itemsets, the only items of the
+            # candidate k-itemsets, and drop the transactions with fewer than k of them
+            projected_db = vertical_db.project(
+                {item for itemset in k_min_one_itemsets for item in itemset}, k
+            )
+            # the tids of the projected transactions differ from the ones of the bitmaps
+            if projected_db is not vertical_db and k_min_one_itemset_tids is not None:
+                k_min_one_itemset_tids = {
+                    itemset: projected_db.tids(itemset) for itemset in k_min_one_itemset_tids
+                }
+            vertical_db = projected_db
+
+            # candidate (k-1)-itemsets left in no transaction are not joined
+            if k_min_one_itemset_tids is None:
+                k_min_one_itemsets = [
+                    itemset for itemset in k_min_one_itemsets if vertical_db.item_tids[itemset[0]]
+                ]
+            else:
+                k_min_one_itemsets = [
+                    itemset
+                    for itemset in k_min_one_itemsets
+                    if k_min_one_itemset_tids[tuple(itemset)]
+                ]
+
             # generate candidate high utility k-itemsets
             k_itemsets = self.itemset_generation(k_min_one_itemsets)
 
-            # scan DB to calculate TWU of each candidate high utility k-itemset
-            k_itemset_TWU_dict = {}
-            with open(self.input_path) as db:
-                for transac in db:
-                    transac_data = transac.split(":")
-                    items = {int(item) for item in transac_data[0].split()}
-                    transac_util = int(transac_data[1])
-                    for k_itemset in k_itemsets:
-                        if set(k_itemset).issubset(items):
-                            k_itemset_tuple = tuple(k_itemset)
-                            if k_itemset_tuple in k_itemset_TWU_dict:
-                                k_itemset_TWU_dict[k_itemset_tuple] += transac_util
-                            else:
-                                k_itemset_TWU_dict[k_itemset_tuple] = transac_util
-
-            # get candidate high utility k-itemsets with TWU >= minutil
-            k_itemsets = []
-            for k_itemset, TWU in k_itemset_TWU_dict.items():
+            # calculate TWU of each candidate high utility k-itemset from its tid bitmap,
+            # the AND of the bitmaps of the two (k-1)-itemsets it was generated from,
+            # and keep the ones with TWU >= minutil
+            # (candidates that are not contained in any transaction are skipped)
+            k_itemset_bitmaps = [
+                (k_itemset, bitmap)
+                for k_itemset, bitmap in vertical_db.candidate_tids(
+                    k_itemsets, k_min_one_itemset_tids
+                )
+                if bitmap
+            ]
+            TWUs = self.TWUs(vertical_db, [bitmap for _, bitmap in k_itemset_bitmaps])
+            k_itemset_tids = {}
+            prune_count = self.prune_count
+            for (k_itemset, bitmap), TWU in zip(k_itemset_bitmaps, TWUs):
                 if TWU >= self.minutil:
-                    k_itemsets.append(list(k_itemset))
+                    k_itemset_tids[k_itemset] = bitmap
                 else:
                     self.prune_count += 1
+            if self.profiler.depth_counters is not None:
+                self.profiler.count("joins", k, len(k_itemsets))
+                self.profiler.count("bound_prunes", k, self.prune_count - prune_count)
+            k_itemsets = [list(k_itemset) for k_itemset in k_itemset_tids]
 
             self.candidates += k_itemsets
 
             # break if there are no more candidate high utility k-itemsets
             if len(k_itemsets) == 0:
                 break
+            levels.append((list(k_itemset_tids), vertical_db))
             # otherwise, proceed to next k level
             k_min_one_itemsets = k_itemsets
+            k_min_one_itemset_tids = k_itemset_tids
             k += 1
 
         self.candidate_count = len(self.candidates)
 
         # Phase 2
-        # scan DB to calculate the utility of each candidate itemset
-        itemset_util_dict = {}
-        with open(self.input_path) as db:
-            for transac in db:
-                transac_data = transac.split(":")
-                items = [int(item) for item in transac_data[0].split()]
-                utils = [int(util) for util in transac_data[2].split()]
-                item_util_dict = dict(zip(items, utils))
-                items = set(items)
-                for itemset in self.candidates:
-                    if set(itemset).issubset(items):
-                        itemset_transac_util = 0
-                        for item in itemset:
-                            itemset_transac_util += item_util_dict[item]
-                        itemset_tuple = tuple(itemset)
-                        if itemset_tuple in itemset_util_dict:
-                            itemset_util_dict[itemset_tuple] += itemset_transac_util
-                        else:
-                            itemset_util_dict[itemset_tuple] = itemset_transac_util
+        self.profiler.phase("phase 2")
+        # calculate the utility of each candidate k-itemset over the transactions in its tid
+        # bitmap, in the projected dataset its TWU was counted over
+        for itemsets, projected_db in levels:
+            itemset_util_dict.update(zip(itemsets, self.utilities(projected_db, itemsets)))
 
         # output each candidate itemset with util >= minutil
+        self.profiler.phase("output")
         with open(self.output_path, "w") as self.output_file:
             for itemset, util in itemset_util_dict.items():
                 if util >= self.minutil:
@@ -158,42 +207,115 @@ class TwoPhase:
                     line.append(str(util))
                     self.output_file.write(" ".join(line) + "\n")
 
+        self.profiler.stop()
+
         self.runtime = (time.time() - start_time) * 1_000
 
+    def TWUs(self, vertical_db: VerticalDB, bitmaps: List[int]) -> List[int]:
+        """
+        Get the TWU of each itemset from its tid bitmap.
+
+        Parameters:
+            vertical_db: vertical layout of the dataset
+            bitmaps: tid bitmap of each itemset
+
+        Returns:
+            the TWU of each itemset
+        """
+        if self.workers > 1:
+            return self.parallel_count(vertical_db, "TWU", bitmaps)
+        return [vertical_db.TWU(bitmap) for bitmap in bitmaps]
+
+    def utilities(self, vertical_db: VerticalDB, itemsets: List[Tuple[int, ...]]) -> List[int]:
+        """
+        Get the utility of each itemset.
+
+        Parameters:
+            vertical_db: vertical layout of the dataset
+            itemsets: items of each itemset
+
+        Returns:
+            the utility of each itemset
+        """
+        if self.workers > 1:
+            return self.parallel_count(vertical_db, "utility", itemsets)
+        return [vertical_db.utility(itemset, vertical_db.tids(itemset)) for itemset in itemsets]
+
+    def parallel_count(
+        self, vertical_db: VerticalDB, measure: str, keys: Union[List[int], List[Tuple[int, ...]]]
+    ) -> List[int]:
+        """
+        Count the TWU or the utility of each itemset in a pool of self.workers processes.
+        The transactions are split into ranges of tids; each worker counts the itemsets
+        over a range at a time, and the partial counts of the ranges are added up.
+
+        Parameters:
+            vertical_db: vertical layout of the dataset
+            measure: "TWU" to count TWUs from tid bitmaps, "utility" to count utilities
+                of itemsets
+            keys: tid bitmap of each itemset for TWUs, items of each itemset for utilities
+
+        Returns:
+            the TWU or the utility of each itemset
+        """
+        global _shared_count
+        if not keys:
+            return []
+        n_transacs = len(vertical_db.transac_utils)
+        n_chunks = max(1, min(n_transacs, self.workers * CHUNKS_PER_WORKER))
+        bounds = [n_transacs * c // n_chunks for c in range(n_chunks + 1)]
+        chunks = [(measure, bounds[c], bounds[c + 1]) for c in range(n_chunks)]
+
+        # fork the workers so that they inherit the vertical database and the keys
+        _shared_count = (vertical_db, keys)
+        try:
+            with multiprocessing.get_context("fork").Pool(self.workers) as pool:
+                counts = [0] * len(keys)
+                for chunk_counts in pool.imap_unordered(_count_chunk, chunks):
+                    counts = list(map(add, counts, chunk_counts))
+        finally:
+            _shared_count = None
+        return counts
+
     def itemset_generation(self, k_min_one_itemsets: List[List[int]]) -> List[List[int]]:
         """
         Generate candidate itemsets of length k using
         itemsets of length k-1 via algorithm described in
         Data Mining - The Textbook (page 100 - 101).
+
+        Only (k-1)-itemsets that share their first k-2 items are joined, and a joined
+        k-itemset is pruned if one of its (k-1)-subsets is not a candidate, since its TWU
+        cannot be greater than the TWU of that subset.
         """
+        # group the (k-1)-itemsets by their first k-2 items
+        prefix_groups = {}
+        for k_min_1_itemset in k_min_one_itemsets:
+            prefix = tuple(k_min_1_itemset[:-1])
+            if prefix in prefix_groups:
+                prefix_groups[prefix].append(k_min_1_itemset[-1])
+            else:
+                prefix_groups[prefix] = [k_min_1_itemset[-1]]
+
+        k_min_1_itemset_set = {tuple(k_min_1_itemset) for k_min_1_itemset in k_min_one_itemsets}
         k_itemsets = []
-        # compare all pairs of candidate itemsets of length k-1
-        for i in range(len(k_min_one_itemsets)):
-            k_min_1_itemset_i = k_min_one_itemsets[i]
-            for j in range(i + 1, len(k_min_one_itemsets)):
-                k_min_1_itemset_j = k_min_one_itemsets[j]
-                # check to see if all but the last items are the same in the two itemsets
-                if self.sublist_equal(
-                    k_min_1_itemset_i, k_min_1_itemset_j, len(k_min_1_itemset_i) - 1
-                ):
-                    k_itemset = k_min_1_itemset_i[:-1]
-                    # add last item of the two itemsets in order
-                    if k_min_1_itemset_i[-1] < k_min_1_itemset_j[-1]:
-                        k_itemset.append(k_min_1_itemset_i[-1])
-                        k_itemset.append(k_min_1_itemset_j[-1])
+        # join all pairs of (k-1)-itemsets in each group
+        for prefix, last_items in prefix_groups.items():
+            # add last item of the two itemsets in order
+            last_items.sort()
+            for i in range(len(last_items)):
+                for j in range(i + 1, len(last_items)):
+                    k_itemset = prefix + (last_items[i], last_items[j])
+                    # the two (k-1)-subsets without one of the last two items are the joined
+                    # itemsets, so only the subsets without one of the prefix items are checked
+                    if all(
+                        k_itemset[:index] + k_itemset[index + 1 :] in k_min_1_itemset_set
+                        for index in range(len(prefix))
+                    ):
+                        k_itemsets.append(list(k_itemset))
                     else:
-                        k_itemset.append(k_min_1_itemset_j[-1])
-                        k_itemset.append(k_min_1_itemset_i[-1])
-                    k_itemsets.append(k_itemset)
+                        self.prune_count += 1
         return k_itemsets
 
-    @staticmethod
-    def sublist_equal(list_i, list_j, to_index):
-        for i in range(to_index):
-            if list_i[i] != list_j[i]:
-                return False
-        return True
-
     def print_stats(self) -> None:
         """
         Print statistics for the Two Phase algorithm.
@@ -245,14 +367,60 @@ class TwoPhase:
             _writer.writerows(rows)
 
 
+def _count_chunk(chunk: Tuple[str, int, int]) -> array:
+    """
+    Count the TWU or the utility of each itemset of a parallel count over a range of tids
+    in a worker process.
+
+    Parameters:
+        chunk: measure ("TWU" or "utility"), first tid and tid after the last one of the range
+
+    Returns:
+        the TWU or the utility of each itemset over the range
+    """
+    measure, start, end = chunk
+    vertical_db, keys = _shared_count
+    if measure == "TWU":
+        counts = [vertical_db.TWU(slice_bitmap(bitmap, start, end), start) for bitmap in keys]
+    else:
+        counts = [
+            vertical_db.utility(itemset, slice_bitmap(vertical_db.tids(itemset), start, end), start)
+            for itemset in keys
+        ]
+    return array("q", counts)
+
+
 if __name__ == "__main__":
-    args = sys.argv
-    input_path = args[1]
-    output_path = args[2]
-    minutil = int(args[3])
-    two_phase = TwoPhase(input_path, output_path, minutil)
+    parser = argparse.ArgumentParser(description="Mine high utility itemsets with Two-Phase.")
+    parser.add_argument("input_path", help="relative path to the data file")
+    parser.add_argument("output_path", help="relative path to the output file")
+    parser.add_argument("minutil", type=int, help="minimum utility")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes that count TWUs and utilities over ranges of transactions"
+        " (default: 1)",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="path to a JSON file to write the time and memory of each phase"
+        " and the counters per level to",
+    )
+    args = parser.parse_args()
+    input_path = args.input_path
+    two_phase = TwoPhase(
+        input_path,
+        args.output_path,
+        args.minutil,
+        workers=args.workers,
+        profiler=Profiler(depth_counters=args.profile is not None),
+    )
     two_phase.run()
     two_phase.print_stats()
+    if args.profile is not None:
+        dump_profile(args.profile, two_phase)
 
     # initializes csv file by adding column names if csv file does not exist
     # adds rows to the csv file
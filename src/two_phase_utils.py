@@ -0,0 +1,223 @@
+from operator import add
+from typing import Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+
+def iter_tids(bitmap: int, offset: int = 0) -> Iterator[int]:
+    """
+    Iterate over the transaction IDs whose bits are set in a tid bitmap.
+
+    Parameters:
+        bitmap: tid bitmap whose bit t is set if transaction offset + t is in the tid set
+        offset: transaction ID of the first bit of the bitmap
+
+    Returns:
+        an iterator of the transaction IDs in ascending order
+    """
+    # bits of the bitmap from least to most significant
+    bits = bin(bitmap)[:1:-1]
+    tid = bits.find("1")
+    while tid != -1:
+        yield offset + tid
+        tid = bits.find("1", tid + 1)
+
+
+def slice_bitmap(bitmap: int, start: int, end: int) -> int:
+    """
+    Get the bits of a tid bitmap for a range of transaction IDs.
+
+    Parameters:
+        bitmap: tid bitmap
+        start: first transaction ID of the range
+        end: transaction ID after the last one of the range
+
+    Returns:
+        the tid bitmap of the range, whose bit t is set if transaction start + t is in bitmap
+    """
+    return (bitmap >> start) & ((1 << (end - start)) - 1)
+
+
+def to_bitmap(tids: Iterable[int], n_transacs: int) -> int:
+    """
+    Build the tid bitmap of a set of transaction IDs.
+
+    Parameters:
+        tids: transaction IDs of the tid set
+        n_transacs: number of transactions in the database
+
+    Returns:
+        the tid bitmap whose bit t is set if t is in tids
+    """
+    bits = bytearray((n_transacs + 7) // 8)
+    for tid in tids:
+        bits[tid >> 3] |= 1 << (tid & 7)
+    return int.from_bytes(bits, "little")
+
+
+class VerticalDB:
+    """
+    Vertical layout of a dataset: one tid bitmap per item, the utility of each transaction
+    and the utility of each item in each of its transactions.
+
+    Attributes:
+        transac_utils: utility of each transaction, indexed by tid
+        item_tids: tid bitmap of each item
+        item_utils: utility of each item in each transaction that contains it, keyed by tid
+        total_trans_util: total transaction utility of the dataset
+    """
+
+    def __init__(self, db: Iterable[Tuple[Sequence[int], int, Sequence[int]]]) -> None:
+        """
+        Constructor for VerticalDB.
+
+        Parameters:
+            db: items, transaction utility and item utilities of each transaction of the dataset
+        """
+        self.transac_utils = []
+        self.item_utils = {}
+        for tid, (items, transac_util, utils) in enumerate(db):
+            self.transac_utils.append(transac_util)
+            for item, util in zip(items, utils):
+                if item in self.item_utils:
+                    self.item_utils[item][tid] = util
+                else:
+                    self.item_utils[item] = {tid: util}
+        self.total_trans_util = sum(self.transac_utils)
+        n_transacs = len(self.transac_utils)
+        self.item_tids = {
+            item: to_bitmap(tid_utils, n_transacs) for item, tid_utils in self.item_utils.items()
+        }
+
+    def project(self, items: Set[int], min_length: int) -> "VerticalDB":
+        """
+        Project the dataset on a set of items: drop the other items from the transactions,
+        drop the transactions left with fewer than min_length items and merge the transactions
+        left with the same items, adding up the utilities of their items. The utility of a
+        projected transaction is the sum of the utilities of its items, so the TWU of an
+        itemset of the projected items stays an upper bound on the utility of its supersets
+        of projected items, and gets tighter.
+
+        Parameters:
+            items: items to keep
+            min_length: minimum number of items of a transaction to keep
+
+        Returns:
+            the vertical layout of the projected dataset, or self if no transaction changes
+        """
+        n_transacs = len(self.transac_utils)
+        transac_items = [[] for _ in range(n_transacs)]
+        transac_item_utils = [[] for _ in range(n_transacs)]
+        for item in sorted(items):
+            for tid, util in self.item_utils[item].items():
+                transac_items[tid].append(item)
+                transac_item_utils[tid].append(util)
+
+        # item utilities of each projected transaction, keyed by its items
+        projected = {}
+        for projected_items, utils in zip(transac_items, transac_item_utils):
+            if len(projected_items) < min_length:
+                continue
+            projected_items = tuple(projected_items)
+            if projected_items in projected:
+                projected[projected_items] = list(map(add, projected[projected_items], utils))
+            else:
+                projected[projected_items] = utils
+        if len(items) == len(self.item_utils) and len(projected) == n_transacs:
+            return self
+        projected_db = VerticalDB(
+            (projected_items, sum(utils), utils) for projected_items, utils in projected.items()
+        )
+
+        # items only in dropped transactions keep an empty tid set
+        for item in items:
+            if item not in projected_db.item_utils:
+                projected_db.item_utils[item] = {}
+                projected_db.item_tids[item] = 0
+        return projected_db
+
+    def item_TWUs(self) -> Dict[int, int]:
+        """
+        Get the TWU of each item.
+
+        Returns:
+            dictionary of items and their TWU
+        """
+        transac_utils = self.transac_utils
+        return {
+            item: sum([transac_utils[tid] for tid in tid_utils])
+            for item, tid_utils in self.item_utils.items()
+        }
+
+    def tids(self, itemset: Tuple[int, ...]) -> int:
+        """
+        Get the tid bitmap of an itemset as the AND of the bitmaps of its items.
+
+        Parameters:
+            itemset: items of the itemset
+
+        Returns:
+            the tid bitmap of the transactions that contain the itemset
+        """
+        bitmap = self.item_tids[itemset[0]]
+        for item in itemset[1:]:
+            bitmap &= self.item_tids[item]
+        return bitmap
+
+    def TWU(self, bitmap: int, offset: int = 0) -> int:
+        """
+        Get the TWU of an itemset from its tid bitmap.
+
+        Parameters:
+            bitmap: tid bitmap of the itemset
+            offset: transaction ID of the first bit of the bitmap, for a range of transactions
+
+        Returns:
+            the sum of the utilities of the transactions that contain the itemset
+        """
+        transac_utils = self.transac_utils
+        return sum([transac_utils[tid] for tid in iter_tids(bitmap, offset)])
+
+    def utility(self, itemset: Tuple[int, ...], bitmap: int, offset: int = 0) -> int:
+        """
+        Get the utility of an itemset from its tid bitmap.
+
+        Parameters:
+            itemset: items of the itemset
+            bitmap: tid bitmap of the itemset
+            offset: transaction ID of the first bit of the bitmap, for a range of transactions
+
+        Returns:
+            the sum of the utilities of the items of the itemset
+            in the transactions that contain it
+        """
+        tids = list(iter_tids(bitmap, offset))
+        util = 0
+        for item in itemset:
+            tid_utils = self.item_utils[item]
+            util += sum([tid_utils[tid] for tid in tids])
+        return util
+
+    def candidate_tids(
+        self, k_itemsets: List[List[int]], parent_tids: Dict[Tuple[int, ...], int]
+    ) -> Iterator[Tuple[Tuple[int, ...], int]]:
+        """
+        Get the tid bitmap of each candidate k-itemset as the AND of the bitmaps of the two
+        (k-1)-itemsets it was generated from.
+
+        Parameters:
+            k_itemsets: candidate k-itemsets generated by joining two (k-1)-itemsets
+                that share all but their last item
+            parent_tids: tid bitmaps of the (k-1)-itemsets, or None if k = 2
+
+        Returns:
+            an iterator of (itemset, tid bitmap) for each candidate k-itemset
+        """
+        item_tids = self.item_tids
+        for k_itemset in k_itemsets:
+            k_itemset = tuple(k_itemset)
+            if parent_tids is None:
+                bitmap = item_tids[k_itemset[0]] & item_tids[k_itemset[1]]
+            else:
+                parent_i = k_itemset[:-1]
+                parent_j = k_itemset[:-2] + k_itemset[-1:]
+                bitmap = parent_tids[parent_i] & parent_tids[parent_j]
+            yield k_itemset, bitmap
@@ -0,0 +1,76 @@
+import os
+import sys
+import shutil
+from typing import Dict, FrozenSet, Iterable, Tuple
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASETS = os.path.join(ROOT, "datasets")
+RESULTS = os.path.join(ROOT, "results")
+
+# the algorithms are scripts in src that import each other as top-level modules
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+# result files of results/ that the algorithms must reproduce, by dataset and minimum utility
+EXPECTED = {
+    ("DB_Utility.txt", 30): "fhm_test.txt",
+    ("foodmart.txt", 7206): "foodmart_fhm_7206.txt",
+    ("foodmart.txt", 9609): "foodmart_fhm_9609.txt",
+    ("foodmart.txt", 12011): "foodmart_fhm_12011.txt",
+}
+
+# datasets and minimum utilities the algorithms are run on
+CASES = [("DB_Utility.txt", 30), ("foodmart.txt", 7206)]
+
+
+def read_huis(path: str) -> Dict[FrozenSet[int], int]:
+    """
+    Read a result file in the text format as the utility of each itemset, so that results
+    that list the itemsets or their items in another order compare equal.
+    """
+    huis = {}
+    with open(path) as f:
+        for line in f:
+            items, util = line.split(" #UTIL: ")
+            huis[frozenset([int(item) for item in items.split()])] = int(util)
+    return huis
+
+
+def as_huis(pairs: Iterable[Tuple[Iterable[int], int]]) -> Dict[FrozenSet[int], int]:
+    return {frozenset(itemset): util for itemset, util in pairs}
+
+
+def expected_huis(name: str, minutil: int) -> Dict[FrozenSet[int], int]:
+    return read_huis(os.path.join(RESULTS, EXPECTED[name, minutil]))
+
+
+@pytest.fixture(scope="session")
+def data(tmp_path_factory):
+    """
+    Get the path to a copy of a dataset in a temporary directory shared by the session, so
+    that the binary caches written next to it do not go to datasets/ and are built once.
+    """
+    directory = tmp_path_factory.mktemp("datasets")
+
+    def path(name: str) -> str:
+        copy = directory / name
+        if not copy.exists():
+            shutil.copyfile(os.path.join(DATASETS, name), copy)
+        return str(copy)
+
+    return path
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """
+    Get the path to a copy of a dataset of its own for a test that modifies it.
+    """
+
+    def path(name: str) -> str:
+        copy = tmp_path / name
+        shutil.copyfile(os.path.join(DATASETS, name), copy)
+        return str(copy)
+
+    return path
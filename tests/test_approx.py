@@ -0,0 +1,62 @@
+import pytest
+
+from conftest import CASES, expected_huis, read_huis
+from approx_fhm import SampledFHM
+
+
+@pytest.mark.parametrize("name,minutil", CASES)
+def test_whole_sample_matches_expected(name, minutil, data, tmp_path):
+    # a sample larger than the dataset holds all of its transactions, so the estimates are
+    # the exact utilities
+    output_path = str(tmp_path / "output.txt")
+    fhm = SampledFHM(data(name), output_path, minutil, sample_size=10**6, verify=True)
+    fhm.run()
+    expected = expected_huis(name, minutil)
+    assert read_huis(output_path) == expected
+    assert fhm.sample_count == fhm.n_transacs
+    assert {frozenset(itemset): util for itemset, util, _, _ in fhm.estimates} == expected
+
+
+def test_verify_has_no_false_positives(data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    fhm = SampledFHM(
+        data("foodmart.txt"),
+        output_path,
+        12011,
+        sample_size=2000,
+        strata=4,
+        slack=0.2,
+        verify=True,
+    )
+    fhm.run()
+    expected = expected_huis("foodmart.txt", 12011)
+    huis = read_huis(output_path)
+    assert huis
+    assert all(expected.get(itemset) == util for itemset, util in huis.items())
+    assert fhm.hui_count == len(huis) <= len(fhm.estimates)
+
+
+def test_intervals_hold_estimates(data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    kwargs = {"sample_size": 2000, "strata": 4, "seed": 3}
+    fhm = SampledFHM(data("foodmart.txt"), output_path, 12011, **kwargs)
+    fhm.run()
+    assert fhm.sample_count == 2000
+    assert fhm.sample_minutil < 12011
+    assert fhm.estimates
+    assert all(low <= util <= high for _, util, low, high in fhm.estimates)
+    with open(output_path) as f:
+        assert sum(1 for _ in f) == len(fhm.estimates)
+
+    # the same seed draws the same sample
+    same = SampledFHM(data("foodmart.txt"), str(tmp_path / "same.txt"), 12011, **kwargs)
+    same.run()
+    assert same.estimates == fhm.estimates
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"sample_size": 0}, {"strata": 0}, {"confidence": 1}, {"slack": 1}]
+)
+def test_invalid_parameters_rejected(kwargs):
+    with pytest.raises(ValueError):
+        SampledFHM("db.txt", None, 1, **kwargs)
@@ -0,0 +1,69 @@
+import os
+import sys
+import subprocess
+import tempfile
+
+import pytest
+
+from conftest import ROOT, RESULTS, expected_huis
+from benchmark import checksum, compare, parse_suite, run_trials
+
+
+def test_parse_suite(data, tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    path = data("DB_Utility.txt")
+    suite = parse_suite([f"{path}:30,50%", "synthetic-100:1%"], seed=1)
+    assert suite[0] == ("DB_Utility", path, [("30", 30), ("50%", 48)])
+    name, synthetic_path, minutils = suite[1]
+    assert name == "synthetic-100"
+    assert synthetic_path.startswith(str(tmp_path))
+    assert minutils[0][0] == "1%"
+
+
+@pytest.mark.parametrize(
+    "spec,message",
+    [
+        ("DB_Utility.txt", "not of the form"),
+        ("synthetic-x:1%", "synthetic-N"),
+        ("missing.txt:30", "no dataset"),
+        ("{path}:30,abc", "invalid minimum utility"),
+    ],
+)
+def test_parse_suite_rejects_malformed_specs(spec, message, data):
+    with pytest.raises(ValueError, match=message):
+        parse_suite([spec.format(path=data("DB_Utility.txt"))], seed=0)
+
+
+def test_cli_reports_malformed_specs():
+    process = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "src", "benchmark.py"), "DB_Utility.txt"],
+        capture_output=True,
+        text=True,
+    )
+    assert process.returncode == 2
+    assert "not of the form dataset:minutil" in process.stderr
+
+
+def test_checksum_ignores_order(tmp_path):
+    path = str(tmp_path / "reordered.txt")
+    with open(os.path.join(RESULTS, "fhm_test.txt")) as f:
+        lines = f.readlines()
+    with open(path, "w") as f:
+        for line in reversed(lines):
+            items, util = line.split(" #UTIL: ")
+            f.write(" ".join(reversed(items.split())) + f" #UTIL: {util}")
+    assert checksum(path) == checksum(os.path.join(RESULTS, "fhm_test.txt"))
+
+
+def test_run_trials_and_compare(data):
+    result = run_trials("fhm", data("DB_Utility.txt"), 30, 2, timeout=60)
+    assert result["hui_count"] == len(expected_huis("DB_Utility.txt", 30))
+    assert len(result["wall_times_ms"]) == 2
+    result.update({"engine": "fhm", "dataset": "DB_Utility", "minutil": 30})
+    assert compare([result], [result], 0.1) == []
+
+    slower = dict(result, wall_time_ms=result["wall_time_ms"] * 2, checksum="0")
+    regressions = compare([slower], [result], 0.1)
+    assert len(regressions) == 2
+    assert "itemsets differ" in regressions[0]
+    assert "wall_time_ms" in regressions[1]
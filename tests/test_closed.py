@@ -0,0 +1,45 @@
+import pytest
+
+from conftest import EXPECTED, as_huis, expected_huis
+from closed_fhm import ClosedFHM, recover_huis
+from dataset import load
+from sinks import read_closed_huis
+
+
+@pytest.mark.parametrize("name,minutil", sorted(EXPECTED))
+def test_recovered_huis_match_expected(name, minutil, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    fhm = ClosedFHM(data(name), output_path, minutil)
+    fhm.run()
+    closed_huis = list(read_closed_huis(output_path))
+    assert fhm.hui_count == len(closed_huis)
+    assert as_huis(recover_huis(closed_huis, minutil)) == expected_huis(name, minutil)
+
+
+def test_closed_itemsets_with_zero_minutil(data, tmp_path):
+    # every itemset that occurs in a transaction has high utility, so each closed one
+    # is written with the utilities of its items in all of its transactions
+    output_path = str(tmp_path / "output.txt")
+    ClosedFHM(data("DB_Utility.txt"), output_path, 0).run()
+    with load(data("DB_Utility.txt")) as db:
+        transacs = [dict(zip(items, utils)) for items, _, utils in db]
+    closed_huis = list(read_closed_huis(output_path))
+    assert closed_huis
+    all_items = set().union(*transacs)
+    closed_itemsets = set()
+    for itemset, util, support, item_utils in closed_huis:
+        containing = [transac for transac in transacs if set(itemset) <= transac.keys()]
+        assert support == len(containing) > 0
+        utils = [sum([transac[item] for transac in containing]) for item in itemset]
+        assert list(item_utils) == utils
+        assert util == sum(item_utils)
+        # no item can be added to a closed itemset without losing a transaction
+        assert not all_items.difference(itemset).intersection(*containing)
+        closed_itemsets.add(frozenset(itemset))
+
+    # the closure of every itemset of a transaction is among them
+    for transac in transacs:
+        closure = set(all_items).intersection(
+            *[other for other in transacs if transac.keys() <= other.keys()]
+        )
+        assert frozenset(closure) in closed_itemsets
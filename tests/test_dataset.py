@@ -0,0 +1,105 @@
+import os
+import gzip
+import shutil
+
+import pytest
+
+import dataset as dataset_module
+from dataset import CACHE_SUFFIX, DBWriter, convert, load
+
+
+def parse_text(path: str) -> list:
+    transactions = []
+    with open(path) as f:
+        for line in f:
+            items, transac_util, utils = line.split(":")
+            transactions.append(
+                (
+                    [int(item) for item in items.split()],
+                    int(transac_util),
+                    [int(util) for util in utils.split()],
+                )
+            )
+    return transactions
+
+
+@pytest.mark.parametrize("name", ["DB_Utility.txt", "foodmart.txt"])
+def test_cache_matches_text(name, dataset):
+    path = dataset(name)
+    with load(path) as db:
+        assert len(db) == len(parse_text(path))
+        assert list(db) == parse_text(path)
+    assert os.path.exists(path + CACHE_SUFFIX)
+
+    # the cache is read instead of the text once it is written
+    with load(path) as db:
+        assert list(db) == parse_text(path)
+
+
+def test_cache_rebuilt_when_dataset_changes(dataset):
+    path = dataset("DB_Utility.txt")
+    with load(path) as db:
+        n_transacs = len(db)
+    with open(path, "a") as f:
+        f.write("1 2:5:2 3\n")
+    with load(path) as db:
+        assert len(db) == n_transacs + 1
+        assert list(db)[-1] == ([1, 2], 5, [2, 3])
+
+
+def test_item_TWUs_match_scan(data):
+    path = data("foodmart.txt")
+    expected = {}
+    for items, transac_util, _ in parse_text(path):
+        for item in items:
+            expected[item] = expected.get(item, 0) + transac_util
+    with load(path) as db:
+        assert db.item_TWUs() == expected
+
+
+def test_parallel_chunks_match_single_process(data, tmp_path, monkeypatch):
+    path = data("foodmart.txt")
+    single_path = str(tmp_path / "single.huimdb")
+    convert(path, single_path, workers=1)
+
+    # ranges and blocks of 4 KB split the dataset into many chunks parsed by the workers
+    chunk_bounds, iter_blocks = dataset_module.chunk_bounds, dataset_module.iter_blocks
+    monkeypatch.setattr(dataset_module, "chunk_bounds", lambda path: chunk_bounds(path, 4096))
+    monkeypatch.setattr(dataset_module, "iter_blocks", lambda db: iter_blocks(db, 4096))
+    parallel_path = str(tmp_path / "parallel.huimdb")
+    convert(path, parallel_path, workers=3)
+    gz_path = str(tmp_path / "foodmart.txt.gz")
+    with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    gz_parallel_path = str(tmp_path / "gz_parallel.huimdb")
+    convert(gz_path, gz_parallel_path, workers=3)
+
+    assert len(chunk_bounds(path, 4096)) > 10
+    with load(single_path) as single:
+        for other_path in (parallel_path, gz_parallel_path):
+            with load(other_path) as other:
+                assert list(other) == list(single) == parse_text(path)
+                assert other.item_TWUs() == single.item_TWUs()
+
+
+def test_gzip_dataset_matches_text(data, tmp_path):
+    path = data("foodmart.txt")
+    gz_path = str(tmp_path / "foodmart.txt.gz")
+    with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    with load(gz_path) as db:
+        assert list(db) == parse_text(path)
+    assert os.path.exists(gz_path + CACHE_SUFFIX)
+
+
+def test_binary_dataset_loaded_directly(tmp_path):
+    transactions = [([1, 3], 7, [2, 5]), ([2], 4, [4]), ([1, 2, 3], 9, [1, 2, 6])]
+    path = str(tmp_path / "db.huimdb")
+    writer = DBWriter(path)
+    for transaction in transactions:
+        writer.add_transaction(*transaction)
+    writer.close()
+    with load(path) as db:
+        assert list(db) == transactions
+    assert not os.path.exists(path + CACHE_SUFFIX)
+
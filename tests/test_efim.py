@@ -0,0 +1,13 @@
+import pytest
+
+from conftest import EXPECTED, expected_huis, read_huis
+from efim import EFIM
+
+
+@pytest.mark.parametrize("name,minutil", sorted(EXPECTED))
+def test_efim_matches_expected(name, minutil, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    efim = EFIM(data(name), output_path, minutil)
+    efim.run()
+    assert read_huis(output_path) == expected_huis(name, minutil)
+    assert efim.hui_count == len(expected_huis(name, minutil))
@@ -0,0 +1,212 @@
+import sys
+import random
+import inspect
+import threading
+from array import array
+
+import pytest
+
+from conftest import EXPECTED, expected_huis, read_huis
+from fhm import FHM
+from fhm_utils import UtilList, gallop
+
+
+@pytest.mark.parametrize("name,minutil", sorted(EXPECTED))
+def test_fhm_matches_expected(name, minutil, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    fhm = FHM(data(name), output_path, minutil)
+    fhm.run()
+    assert read_huis(output_path) == expected_huis(name, minutil)
+    assert fhm.hui_count == len(expected_huis(name, minutil))
+
+
+def test_util_list_columns():
+    util_list = UtilList(3)
+    for tid, iutil, rutil in [(0, 5, 2), (4, 1, 0), (7, 3, 9)]:
+        util_list.add_elem(tid, iutil, rutil)
+    assert len(util_list) == 3
+    assert list(util_list.tids) == [0, 4, 7]
+    assert list(util_list.iutils) == [5, 1, 3]
+    assert list(util_list.rutils) == [2, 0, 9]
+    assert (util_list.sum_iutils, util_list.sum_rutils) == (9, 11)
+    assert util_list.nbytes() == 3 * 3 * util_list.tids.itemsize
+
+
+def util_list_of(transactions, itemset, item):
+    """
+    Build the utility list of an itemset directly from transactions of (rank, util) pairs
+    in ascending order of rank, where item is the last item of the itemset.
+    """
+    util_list = UtilList(item)
+    for tid, transaction in enumerate(transactions):
+        utils = dict(transaction)
+        if all(rank in utils for rank in itemset):
+            rutil = sum([util for rank, util in transaction if rank > max(itemset)])
+            util_list.add_elem(tid, sum([utils[rank] for rank in itemset]), rutil)
+    return util_list
+
+
+@pytest.mark.parametrize("n_transacs,density", [(50, 0.5), (400, 0.02), (400, 0.9)])
+def test_construct_matches_direct_lists(n_transacs, density, data):
+    # items 0 and 1 are dense, items 2 and 3 have the given density, so that the joins
+    # both step through and gallop through the longer list
+    rng = random.Random(n_transacs)
+    transactions = []
+    for _ in range(n_transacs):
+        transactions.append(
+            [
+                (rank, rng.randint(1, 9))
+                for rank in range(4)
+                if rank < 2 and rng.random() < 0.95 or rng.random() < density
+            ]
+        )
+    fhm = FHM(data("DB_Utility.txt"), None, 1)
+    for prefix in [(), (0,), (0, 1)]:
+        prefix_UL = util_list_of(transactions, prefix, prefix[-1]) if prefix else None
+        x, y = len(prefix), len(prefix) + 1
+        constructed = fhm.construct(
+            prefix_UL,
+            util_list_of(transactions, prefix + (x,), x),
+            util_list_of(transactions, prefix + (y,), y),
+        )
+        direct = util_list_of(transactions, prefix + (x, y), y)
+        assert list(constructed.tids) == list(direct.tids)
+        assert list(constructed.iutils) == list(direct.iutils)
+        assert list(constructed.rutils) == list(direct.rutils)
+        assert (constructed.sum_iutils, constructed.sum_rutils) == (
+            direct.sum_iutils,
+            direct.sum_rutils,
+        )
+
+
+def test_gallop():
+    tids = array("q", [1, 3, 5, 7, 9, 11, 13])
+    assert [gallop(tids, tid, 0) for tid in (0, 1, 2, 9, 10, 13, 14)] == [0, 0, 1, 4, 5, 6, 7]
+    assert gallop(tids, 4, 3) == 3
+
+
+@pytest.mark.parametrize("name,minutil", [("DB_Utility.txt", 30), ("foodmart.txt", 7206)])
+def test_parallel_search_matches_expected(name, minutil, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    single_path = str(tmp_path / "single.txt")
+    fhm = FHM(data(name), output_path, minutil, workers=3)
+    fhm.run()
+    FHM(data(name), single_path, minutil).run()
+    assert read_huis(output_path) == expected_huis(name, minutil)
+
+    # the workers' itemsets are written in the order of a single process
+    with open(output_path) as f, open(single_path) as single:
+        assert f.read() == single.read()
+    assert sum(fhm.prune_counts.values()) == fhm.prune_count
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_top_k_keeps_highest_utilities(workers, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    fhm = FHM(data("foodmart.txt"), output_path, 1, workers=workers, top_k=50)
+    fhm.run()
+    best = sorted(expected_huis("foodmart.txt", 7206).values(), reverse=True)[:50]
+    huis = read_huis(output_path)
+    assert len(huis) == 50
+    assert sorted(huis.values(), reverse=True) == best
+    assert fhm.minutil == best[-1]
+
+    # the itemsets are written in order of descending utility
+    with open(output_path) as f:
+        utils = [int(line.split(" #UTIL: ")[1]) for line in f]
+    assert utils == best
+
+
+def test_top_k_larger_than_itemsets(data, tmp_path):
+    all_path = str(tmp_path / "all.txt")
+    FHM(data("DB_Utility.txt"), all_path, 1).run()
+    output_path = str(tmp_path / "output.txt")
+    FHM(data("DB_Utility.txt"), output_path, 1, top_k=10**6).run()
+    assert read_huis(output_path) == read_huis(all_path)
+
+
+@pytest.mark.parametrize("max_memory", [0, 0.05])
+def test_memory_budget_matches_expected(max_memory, data, tmp_path):
+    # without room for the utility lists of a prefix's extensions, they are all deferred
+    output_path = str(tmp_path / "output.txt")
+    fhm = FHM(data("foodmart.txt"), output_path, 7206, max_memory=max_memory)
+    fhm.run()
+    assert read_huis(output_path) == expected_huis("foodmart.txt", 7206)
+    assert fhm.live_bytes == 0
+
+
+def test_search_deeper_than_recursion_limit(tmp_path):
+    # every transaction holds all the items, so the longest itemset holds them all
+    n_items = 300
+    input_path = str(tmp_path / "long.txt")
+    items = " ".join(map(str, range(1, n_items + 1)))
+    with open(input_path, "w") as f:
+        for _ in range(2):
+            f.write(f"{items}:{n_items}:" + " 1" * n_items + "\n")
+    output_path = str(tmp_path / "output.txt")
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(len(inspect.stack()) + n_items // 3)
+    try:
+        FHM(input_path, output_path, 2 * n_items).run()
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+    assert read_huis(output_path) == {frozenset(range(1, n_items + 1)): 2 * n_items}
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_max_huis_stops_after_finished_branches(workers, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    fhm = FHM(data("foodmart.txt"), output_path, 7206, workers=workers, max_huis=300)
+    fhm.run()
+    expected = expected_huis("foodmart.txt", 7206)
+    huis = read_huis(output_path)
+    assert fhm.stop_reason == "max huis"
+    assert fhm.hui_count == len(huis) == 300
+    assert all(expected[itemset] == util for itemset, util in huis.items())
+
+    # a branch holds the itemsets whose item of lowest rank is its item, and the branches
+    # listed as finished were searched entirely
+    ranks = {item: rank for rank, item in enumerate(fhm.items)}
+    finished = set(fhm.finished_branches)
+    assert finished
+    for itemset, util in expected.items():
+        if min(itemset, key=ranks.get) in finished:
+            assert huis[itemset] == util
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_spent_time_budget_and_cancel_stop_search(workers, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    fhm = FHM(data("foodmart.txt"), output_path, 7206, workers=workers, time_budget=0)
+    fhm.run()
+    assert fhm.stop_reason == "time budget"
+    assert read_huis(output_path).items() <= expected_huis("foodmart.txt", 7206).items()
+
+    cancel = threading.Event()
+    cancel.set()
+    fhm = FHM(data("foodmart.txt"), output_path, 7206, workers=workers, cancel=cancel)
+    fhm.run()
+    assert fhm.stop_reason == "cancelled"
+    # workers only see the cancellation once the first of their branches comes back
+    assert len(fhm.finished_branches) < len(fhm.items)
+    if workers == 1:
+        assert fhm.finished_branches == [] and fhm.hui_count == 0
+
+
+def test_progress_reaches_all_branches(data, tmp_path):
+    reports = []
+    output_path = str(tmp_path / "output.txt")
+    fhm = FHM(
+        data("foodmart.txt"), output_path, 7206, progress=reports.append, progress_interval=0
+    )
+    fhm.run()
+    assert fhm.stop_reason is None
+    assert len(reports) > 1
+    assert [report.branches_done for report in reports] == sorted(
+        [report.branches_done for report in reports]
+    )
+    last = reports[-1]
+    assert last.done and not any(report.done for report in reports[:-1])
+    assert last.branches_done == last.branch_count == len(fhm.items)
+    assert last.fraction == 1.0
+    assert last.hui_count == len(expected_huis("foodmart.txt", 7206))
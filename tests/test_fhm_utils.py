@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+import fhm_utils
+from conftest import expected_huis, read_huis
+from fhm import FHM
+from fhm_utils import EUCS
+
+
+@pytest.mark.parametrize("dense", [True, False])
+def test_eucs_holds_pair_TWUs(dense):
+    rng = random.Random(5)
+    n_items = 30
+    eucs = EUCS(n_items, dense=dense)
+    expected = {}
+    for _ in range(500):
+        ranks = tuple(sorted(rng.sample(range(n_items), rng.randint(1, 6))))
+        transac_util = rng.randint(1, 100)
+        eucs.add_transaction(ranks, transac_util)
+        for i, x in enumerate(ranks):
+            for y in ranks[i + 1 :]:
+                expected[x, y] = expected.get((x, y), 0) + transac_util
+    eucs.add_pair(3, 4, 7)
+    expected[3, 4] = expected.get((3, 4), 0) + 7
+    eucs.finalize()
+    for x in range(n_items):
+        for y in range(x + 1, n_items):
+            assert eucs.get(x, y) == expected.get((x, y), 0)
+
+
+def test_fhm_with_sparse_eucs_matches_expected(data, tmp_path, monkeypatch):
+    monkeypatch.setattr(fhm_utils, "DENSE_EUCS_MAX_ITEMS", 0)
+    output_path = str(tmp_path / "output.txt")
+    fhm = FHM(data("foodmart.txt"), output_path, 7206)
+    fhm.run()
+    assert not fhm.EUCS.dense
+    assert read_huis(output_path) == expected_huis("foodmart.txt", 7206)
+
+
+def test_items_recoded_in_order_of_TWU(data, tmp_path):
+    fhm = FHM(data("foodmart.txt"), str(tmp_path / "output.txt"), 7206)
+    fhm.run()
+    TWUs = {}
+    with open(data("foodmart.txt")) as f:
+        for line in f:
+            items, transac_util, _ = line.split(":")
+            for item in items.split():
+                TWUs[int(item)] = TWUs.get(int(item), 0) + int(transac_util)
+    assert [TWUs[item] for item in fhm.items] == sorted([TWUs[item] for item in fhm.items])
+    assert set(fhm.items) == {item for item, TWU in TWUs.items() if TWU >= 7206}
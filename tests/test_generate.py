@@ -0,0 +1,52 @@
+import random
+from itertools import accumulate
+
+import pytest
+
+from dataset import load
+from generate import Generator
+
+
+def test_same_seed_gives_same_dataset(tmp_path):
+    parameters = dict(n_items=100, n_clusters=5, profit_dist="lognormal", seed=7)
+    generator = Generator(500, **parameters)
+    text_path = str(tmp_path / "synthetic.txt")
+    binary_path = str(tmp_path / "synthetic.huimdb")
+    generator.write(text_path)
+    generator.write(binary_path, binary=True)
+    transactions = list(Generator(500, **parameters).transactions())
+    with load(text_path) as db:
+        assert list(db) == transactions
+    with load(binary_path) as db:
+        assert list(db) == transactions
+    assert transactions != list(Generator(500, n_items=100, seed=8).transactions())
+    for items, transac_util, utils in transactions:
+        assert items == sorted(set(items))
+        assert transac_util == sum(utils)
+
+
+@pytest.mark.parametrize("zipf_exponent", [0, 1, 4])
+def test_draw_items_without_replacement(zipf_exponent):
+    n_items = 30
+    generator = Generator(1, n_items=n_items, zipf_exponent=zipf_exponent)
+    rng = random.Random(0)
+    items = list(range(1, n_items + 1))
+    weights = [1 / rank**zipf_exponent for rank in range(1, n_items + 1)]
+    cum_weights = list(accumulate(weights))
+
+    # the least popular items are drawn even when their popularity is negligible
+    assert generator.draw_items(rng, n_items, items, weights, cum_weights) == set(items)
+    counts = dict.fromkeys(items, 0)
+    for _ in range(2000):
+        drawn = generator.draw_items(rng, 5, items, weights, cum_weights)
+        assert len(drawn) == 5
+        for item in drawn:
+            counts[item] += 1
+    if zipf_exponent:
+        assert counts[1] >= counts[2] > counts[n_items]
+
+
+def test_long_transactions_with_skewed_popularity():
+    generator = Generator(200, n_items=20, avg_length=100, length_dist="uniform", zipf_exponent=4)
+    lengths = [len(items) for items, _, _ in generator.transactions()]
+    assert lengths.count(20) > 150
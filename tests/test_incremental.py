@@ -0,0 +1,115 @@
+import os
+import pickle
+
+import pytest
+
+from conftest import read_huis
+from fhm import FHM
+from incremental_fhm import LOG_SUFFIX, STATE_SUFFIX, IncrementalFHM
+
+
+def mine_incremental(path: str, output_path: str, minutil: int) -> dict:
+    IncrementalFHM(path, output_path, minutil).run()
+    return read_huis(output_path)
+
+
+def mine_full(path: str, output_path: str, minutil: int) -> dict:
+    FHM(path, output_path, minutil).run()
+    return read_huis(output_path)
+
+
+@pytest.mark.parametrize(
+    "name,minutil,splits", [("DB_Utility.txt", 30, [2, 4]), ("foodmart.txt", 7206, [1000, 3000])]
+)
+def test_appended_transactions_match_full_mine(name, minutil, splits, dataset, tmp_path):
+    path = dataset(name)
+    with open(path) as f:
+        lines = f.readlines()
+    output_path = str(tmp_path / "output.txt")
+    full_path = str(tmp_path / "full.txt")
+
+    # mine a prefix of the transactions, then append the rest in batches
+    start = 0
+    for end in splits + [len(lines)]:
+        with open(path, "w" if start == 0 else "a") as f:
+            f.writelines(lines[start:end])
+        start = end
+        huis = mine_incremental(path, output_path, minutil)
+        assert huis == mine_full(path, full_path, minutil)
+
+
+def test_state_only_logs_appended_transactions(dataset, tmp_path):
+    path = dataset("foodmart.txt")
+    with open(path) as f:
+        lines = f.readlines()
+    output_path = str(tmp_path / "output.txt")
+    with open(path, "w") as f:
+        f.writelines(lines[:-10])
+    mine_incremental(path, output_path, 7206)
+    state_size = os.path.getsize(path + STATE_SUFFIX)
+    log_size = os.path.getsize(path + STATE_SUFFIX + LOG_SUFFIX)
+
+    # the second run appends the changes of ten transactions to the log
+    with open(path, "a") as f:
+        f.writelines(lines[-10:])
+    fhm = IncrementalFHM(path, output_path, 7206)
+    fhm.run()
+    assert fhm.added_count == 10
+    assert fhm.explored_count < fhm.promising_count
+    assert os.path.getsize(path + STATE_SUFFIX) == state_size
+    assert os.path.getsize(path + STATE_SUFFIX + LOG_SUFFIX) - log_size < log_size / 10
+
+
+def test_log_past_saved_size_is_dropped(dataset, tmp_path):
+    path = dataset("foodmart.txt")
+    output_path = str(tmp_path / "output.txt")
+    full_path = str(tmp_path / "full.txt")
+    mine_incremental(path, output_path, 7206)
+
+    # changes appended by a run that stopped before it saved the state
+    with open(path + STATE_SUFFIX + LOG_SUFFIX, "ab") as f:
+        pickle.dump({"elements": {}, "pairs": None}, f)
+    assert mine_incremental(path, output_path, 7206) == mine_full(path, full_path, 7206)
+    assert mine_incremental(path, output_path, 7206) == mine_full(path, full_path, 7206)
+
+
+def test_last_line_without_newline_is_mined(dataset, tmp_path):
+    path = dataset("foodmart.txt")
+    with open(path) as f:
+        lines = f.readlines()
+    output_path = str(tmp_path / "output.txt")
+    full_path = str(tmp_path / "full.txt")
+
+    with open(path, "w") as f:
+        f.writelines(lines[:2000])
+        f.write(lines[2000].rstrip("\n"))
+    assert mine_incremental(path, output_path, 7206) == mine_full(path, full_path, 7206)
+    with open(path, "a") as f:
+        f.write("\n")
+        f.writelines(lines[2001:])
+    assert mine_incremental(path, output_path, 7206) == mine_full(path, full_path, 7206)
+
+
+def test_continued_last_line_is_rejected(dataset, tmp_path):
+    path = dataset("DB_Utility.txt")
+    with open(path) as f:
+        lines = f.readlines()
+    with open(path, "w") as f:
+        f.writelines(lines[:-1])
+        f.write(lines[-1][:3])
+    mine_incremental(path, str(tmp_path / "output.txt"), 30)
+    with open(path, "a") as f:
+        f.write(lines[-1][3:])
+    with pytest.raises(ValueError, match="continued"):
+        mine_incremental(path, str(tmp_path / "output.txt"), 30)
+
+
+def test_changed_minutil_searches_again(dataset, tmp_path):
+    path = dataset("foodmart.txt")
+    output_path = str(tmp_path / "output.txt")
+    full_path = str(tmp_path / "full.txt")
+    mine_incremental(path, output_path, 7206)
+    assert mine_incremental(path, output_path, 12011) == mine_full(path, full_path, 12011)
+    with open(path, "a") as f:
+        f.write("1 2:5:2 3\n")
+    assert mine_incremental(path, output_path, 12011) == mine_full(path, full_path, 12011)
@@ -0,0 +1,71 @@
+import csv
+import json
+
+from efim import EFIM
+from fhm import FHM
+from instrument import DEPTH_COUNTERS, EXPERIMENT_FIELDS, Profiler, dump_profile, log_experiment
+from two_phase import TwoPhase
+
+
+def test_profiler_phases_and_memory():
+    profiler = Profiler(trace_memory=True)
+    profiler.phase("small")
+    small = [0] * 1000
+    profiler.phase("large")
+    large = [0] * 10**6
+    profiler.stop()
+    assert [phase.name for phase in profiler.phases] == ["small", "large"]
+    assert profiler.phases[1].peak_memory_mb > 7 > profiler.phases[0].peak_memory_mb
+    assert profiler.peak_memory_mb == profiler.phases[1].peak_memory_mb
+    assert all(time >= 0 for time in profiler.phase_times.values())
+    del small, large
+
+
+def test_depth_counters_merge():
+    profiler = Profiler(depth_counters=True)
+    profiler.count("joins", 2, 3)
+    counters = profiler.reset_counters()
+    assert counters["joins"] == [0, 0, 3]
+    profiler.count("joins", 1)
+    profiler.merge_counters(counters)
+    assert profiler.depth_counters["joins"] == [0, 1, 3]
+    assert Profiler().reset_counters() is None
+
+
+def test_dump_profile(data, tmp_path):
+    fhm = FHM(data("foodmart.txt"), str(tmp_path / "output.txt"), 7206, profiler=Profiler(True))
+    fhm.run()
+    profile_path = str(tmp_path / "profile.json")
+    dump_profile(profile_path, fhm)
+    with open(profile_path) as f:
+        report = json.load(f)
+    assert report["hui_count"] == fhm.hui_count
+    assert [phase["name"] for phase in report["phases"]] == [
+        "TWU scan",
+        "list/EUCS build",
+        "search",
+        "output",
+    ]
+    assert set(report["depth_counters"]) == set(DEPTH_COUNTERS)
+    assert sum(report["depth_counters"]["joins"]) == fhm.candidate_count
+    assert sum(report["prune_counts"].values()) == fhm.prune_count
+
+
+def test_two_phase_phases(data, tmp_path):
+    two_phase = TwoPhase(data("DB_Utility.txt"), str(tmp_path / "output.txt"), 30)
+    two_phase.run()
+    assert list(two_phase.profiler.phase_times) == ["scan", "phase 1", "phase 2", "output"]
+    assert two_phase.mem_usage == two_phase.profiler.peak_memory_mb > 0
+
+
+def test_log_experiment_appends_rows(data, tmp_path):
+    csv_path = str(tmp_path / "experiments.csv")
+    for minutil in (30, 40):
+        efim = EFIM(data("DB_Utility.txt"), str(tmp_path / "output.txt"), minutil)
+        efim.run()
+        log_experiment(csv_path, efim)
+    with open(csv_path) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(EXPERIMENT_FIELDS)
+    assert [row[0] for row in rows[1:]] == ["30", "40"]
+    assert rows[2][2] == str(efim.hui_count)
@@ -0,0 +1,123 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from conftest import as_huis, expected_huis, read_huis
+from fhm import FHM
+from server import Dataset, MiningService, QueryHandler, ResultCache
+
+
+@pytest.fixture(scope="module")
+def foodmart(data):
+    return Dataset(data("foodmart.txt"))
+
+
+@pytest.fixture
+def service(foodmart):
+    def start(**kwargs):
+        service = MiningService({"foodmart": foodmart}, **kwargs)
+        service.start()
+        services.append(service)
+        return service
+
+    services = []
+    yield start
+    for service in services:
+        service.close()
+
+
+@pytest.mark.parametrize("minutil", [7206, 12011])
+def test_dataset_mine_matches_expected(minutil, foodmart):
+    assert as_huis(foodmart.mine(minutil)) == expected_huis("foodmart.txt", minutil)
+
+
+def test_dataset_top_k_matches_fhm(foodmart, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    fhm = FHM(data("foodmart.txt"), output_path, 1, top_k=30)
+    fhm.run()
+    huis = foodmart.mine(1, top_k=30)
+    assert [util for _, util in huis] == sorted(read_huis(output_path).values(), reverse=True)
+
+
+def test_huis_served_from_cache(service):
+    service = service(workers=2)
+    huis, cached = service.huis("foodmart", 7206)
+    assert not cached
+    assert as_huis(huis) == expected_huis("foodmart.txt", 7206)
+
+    # a higher minimum utility is a prefix of the cached result
+    huis, cached = service.huis("foodmart", 12011)
+    assert cached
+    assert as_huis(huis) == expected_huis("foodmart.txt", 12011)
+
+
+def test_top_k_served_from_cache(service):
+    service = service(workers=1)
+    huis, cached = service.top_k("foodmart", 20)
+    assert not cached
+    assert len(huis) == 20
+    assert service.top_k("foodmart", 20) == (huis, True)
+    assert service.top_k("foodmart", 5) == (huis[:5], True)
+
+
+def test_top_k_with_item(service):
+    service = service(workers=1)
+    all_huis = expected_huis("foodmart.txt", 7206)
+    item = min(max(all_huis, key=all_huis.get))
+    expected = sorted([util for itemset, util in all_huis.items() if item in itemset], reverse=True)
+
+    huis, cached = service.top_k("foodmart", 10, item)
+    assert not cached
+    assert all(item in itemset for itemset, _ in huis)
+    assert [util for _, util in huis] == expected[:10]
+    assert service.top_k("foodmart", 10, item)[1]
+
+
+def test_disabled_cache(service):
+    service = service(workers=1, cache_size=0)
+    for _ in range(2):
+        huis, cached = service.huis("foodmart", 12011)
+        assert not cached
+        assert as_huis(huis) == expected_huis("foodmart.txt", 12011)
+    assert not service.top_k("foodmart", 3)[1]
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResultCache(capacity=2)
+    cache.put("db", 10, [((1,), 10)])
+    cache.put("db", 20, [((2,), 20)])
+    assert cache.get("db", 10) == [((1,), 10)]
+    cache.put("db", 30, [((3,), 30)])
+    assert list(cache.results) == [("db", "minutil", 10), ("db", "minutil", 30)]
+    assert cache.get("db", 5) is None
+    assert cache.get("db", 30) == [((3,), 30)]
+    with pytest.raises(ValueError):
+        ResultCache(capacity=-1)
+
+
+def test_queries_over_http(service):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), QueryHandler)
+    server.service = service(workers=1)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urlopen(f"{url}/huis?dataset=foodmart&minutil=12011&limit=3") as response:
+            reply = json.load(response)
+        assert reply["count"] == 3
+        best = sorted(expected_huis("foodmart.txt", 12011).values(), reverse=True)
+        assert [util for _, util in reply["itemsets"]] == best[:3]
+
+        for query in ["huis?dataset=foodmart&minutil=12011&limit=-1", "top-k?dataset=foodmart&k=0"]:
+            with pytest.raises(HTTPError) as error:
+                urlopen(f"{url}/{query}")
+            assert error.value.code == 400
+            error.value.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
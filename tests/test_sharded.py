@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from conftest import CASES, expected_huis, read_huis
+from sharded_fhm import ShardedFHM
+
+
+@pytest.mark.parametrize("name,minutil", CASES)
+def test_sharded_matches_expected(name, minutil, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    fhm = ShardedFHM(data(name), output_path, minutil, shard_size=1000, shard_dir=str(tmp_path))
+    fhm.run()
+    assert read_huis(output_path) == expected_huis(name, minutil)
+    assert fhm.hui_count == len(expected_huis(name, minutil))
+    assert fhm.shards == []
+    assert os.listdir(tmp_path) == ["output.txt"]
+
+
+@pytest.mark.parametrize("name,minutil", CASES)
+def test_sharded_mapped_branches_match_expected(name, minutil, data, tmp_path):
+    # a budget of about a hundred bytes maps every branch from a branch file and defers
+    # the deeper utility lists
+    output_path = str(tmp_path / "output.txt")
+    fhm = ShardedFHM(data(name), output_path, minutil, shard_size=1000, max_memory=0.0001)
+    fhm.run()
+    assert read_huis(output_path) == expected_huis(name, minutil)
+    assert fhm.list_budget < 0
+
+
+def test_shard_size_fits_what_is_left_of_budget(data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    fhm = ShardedFHM(data("foodmart.txt"), output_path, 7206, max_memory=10.5)
+    build_shards = fhm.build_shards
+    shard_sizes = []
+
+    def record_shard_size(shard_dir, shard_size):
+        shard_sizes.append(shard_size)
+        build_shards(shard_dir, shard_size)
+
+    fhm.build_shards = record_shard_size
+    fhm.run()
+    assert read_huis(output_path) == expected_huis("foodmart.txt", 7206)
+    assert 0 < fhm.list_budget < 1024 * 1024
+    # the 4141 transactions take several shards of a quarter of what is left
+    assert shard_sizes[0] < 4141 / 2
+
+    # the dense EUCS of the 1558 items takes most of the budget, and a budget that does not
+    # fit it is rejected instead of sized to no shard
+    with pytest.raises(ValueError, match="memory budget"):
+        ShardedFHM(data("foodmart.txt"), output_path, 7206, max_memory=0.01).run()
+
+
+@pytest.mark.parametrize("pruning", [(), ("twu",), ("eucs", "bound")])
+def test_sharded_pruning_strategies_match_expected(pruning, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    fhm = ShardedFHM(data("foodmart.txt"), output_path, 12011, shard_size=1000, pruning=pruning)
+    fhm.run()
+    assert read_huis(output_path) == expected_huis("foodmart.txt", 12011)
+    disabled = set(fhm.prune_counts).difference(pruning)
+    assert all(fhm.prune_counts[strategy] == 0 for strategy in disabled)
@@ -0,0 +1,86 @@
+import os
+import threading
+
+from conftest import as_huis, expected_huis, read_huis
+from fhm import FHM
+from sinks import BinarySink, CallbackSink, TextSink, ThresholdSink, read_binary_huis
+
+
+def test_binary_sink_round_trip(data, tmp_path):
+    output_path = str(tmp_path / "output.bin")
+    sink = BinarySink(output_path, batch_size=7)
+    FHM(data("foodmart.txt"), None, 7206, sink=sink).run()
+    huis = list(read_binary_huis(output_path))
+    assert len(huis) == len(expected_huis("foodmart.txt", 7206))
+    assert as_huis(huis) == expected_huis("foodmart.txt", 7206)
+
+
+def test_binary_sink_keeps_order(tmp_path):
+    itemsets = [((1, 2, 3), 10), ((300,), 2**40), ((), 0), ((127, 128, 16384), 1)]
+    output_path = str(tmp_path / "output.bin")
+    sink = BinarySink(output_path, batch_size=2)
+    sink.open()
+    for itemset, util in itemsets:
+        sink.write(itemset, util)
+    sink.close()
+    assert list(read_binary_huis(output_path)) == itemsets
+
+
+def test_callback_sink(data):
+    huis = []
+    sink = CallbackSink(lambda itemset, util: huis.append((itemset, util)))
+    FHM(data("DB_Utility.txt"), None, 30, sink=sink).run()
+    assert as_huis(huis) == expected_huis("DB_Utility.txt", 30)
+
+
+def test_iter_huis_matches_expected(data):
+    fhm = FHM(data("foodmart.txt"), None, 7206)
+    sink = fhm.sink
+    assert as_huis(fhm.iter_huis()) == expected_huis("foodmart.txt", 7206)
+    assert fhm.sink is sink
+    assert fhm.cancel is None
+
+
+class FirstHuiFHM(FHM):
+    """
+    FHM that only outputs its first itemset, at once, and then searches without output.
+    """
+
+    def output(self, item, util):
+        if self.hui_count == 0:
+            super().output(item, util)
+            self.sink.flush()
+        else:
+            self.hui_count += 1
+
+
+def test_iter_huis_closed_early_stops_search(data):
+    cancel = threading.Event()
+    fhm = FirstHuiFHM(data("foodmart.txt"), None, 1, cancel=cancel)
+    sink = fhm.sink
+    huis = fhm.iter_huis()
+    next(huis)
+    huis.close()
+    # the search is stopped by the closed iterator even though it writes nothing more
+    assert fhm.stop_reason == "cancelled"
+    assert fhm.sink is sink
+    assert fhm.cancel is cancel
+    assert not cancel.is_set()
+
+
+def test_iter_huis_workers_keep_part_files_out_of_cwd(data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    huis = FHM(data("foodmart.txt"), None, 7206, workers=3).iter_huis()
+    assert as_huis(huis) == expected_huis("foodmart.txt", 7206)
+    assert os.listdir(tmp_path) == []
+
+
+
+def test_threshold_sink_sweep_matches_expected(data, tmp_path):
+    minutils = [7206, 9609, 12011]
+    paths = [str(tmp_path / f"output_{minutil}.txt") for minutil in minutils]
+    sink = ThresholdSink(minutils, [TextSink(path) for path in paths])
+    FHM(data("foodmart.txt"), None, minutils[0], sink=sink).run()
+    for minutil, path, count in zip(minutils, paths, sink.counts):
+        assert read_huis(path) == expected_huis("foodmart.txt", minutil)
+        assert count == len(expected_huis("foodmart.txt", minutil))
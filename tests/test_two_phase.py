@@ -0,0 +1,123 @@
+import os
+import random
+
+import pytest
+
+from conftest import RESULTS, read_huis
+from two_phase import TwoPhase
+from two_phase_utils import VerticalDB, iter_tids, slice_bitmap, to_bitmap
+
+# result files of results/ that Two-Phase must reproduce, by dataset and minimum utility
+TWO_PHASE_EXPECTED = {
+    ("DB_Utility.txt", 30): "two_phase_test.txt",
+    ("foodmart.txt", 7206): "foodmart_two_phase_7206.txt",
+    ("foodmart.txt", 12011): "foodmart_two_phase_12011.txt",
+}
+
+
+@pytest.mark.parametrize("name,minutil", sorted(TWO_PHASE_EXPECTED))
+def test_two_phase_matches_expected(name, minutil, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    two_phase = TwoPhase(data(name), output_path, minutil)
+    two_phase.run()
+    expected = read_huis(os.path.join(RESULTS, TWO_PHASE_EXPECTED[name, minutil]))
+    assert read_huis(output_path) == expected
+    assert two_phase.hui_count == len(expected)
+
+
+@pytest.mark.parametrize("name,minutil", [("DB_Utility.txt", 30), ("foodmart.txt", 12011)])
+def test_two_phase_workers_match_single_process(name, minutil, data, tmp_path):
+    output_path = str(tmp_path / "output.txt")
+    single_path = str(tmp_path / "single.txt")
+    two_phase = TwoPhase(data(name), output_path, minutil, workers=3)
+    two_phase.run()
+    single = TwoPhase(data(name), single_path, minutil)
+    single.run()
+    expected = read_huis(os.path.join(RESULTS, TWO_PHASE_EXPECTED[name, minutil]))
+    assert read_huis(output_path) == expected
+    assert (two_phase.candidate_count, two_phase.prune_count) == (
+        single.candidate_count,
+        single.prune_count,
+    )
+
+
+def test_bitmap_round_trip():
+    tids = [0, 3, 7, 8, 64, 65, 200]
+    bitmap = to_bitmap(tids, 201)
+    assert list(iter_tids(bitmap)) == tids
+    assert list(iter_tids(bitmap, 10)) == [tid + 10 for tid in tids]
+    assert list(iter_tids(0)) == []
+    assert list(iter_tids(slice_bitmap(bitmap, 7, 65), 7)) == [7, 8, 64]
+
+
+def test_vertical_counts_match_scan():
+    rng = random.Random(6)
+    db = []
+    for _ in range(300):
+        items = sorted(rng.sample(range(1, 9), rng.randint(1, 5)))
+        utils = [rng.randint(1, 20) for _ in items]
+        db.append((items, sum(utils), utils))
+    vertical_db = VerticalDB(db)
+    for itemset in [(1,), (2, 5), (1, 3, 8)]:
+        bitmap = vertical_db.tids(itemset)
+        containing = [(tid, t) for tid, t in enumerate(db) if set(itemset) <= set(t[0])]
+        assert list(iter_tids(bitmap)) == [tid for tid, _ in containing]
+        assert vertical_db.TWU(bitmap) == sum([t[1] for _, t in containing])
+        assert vertical_db.utility(itemset, bitmap) == sum(
+            [util for _, t in containing for item, util in zip(t[0], t[2]) if item in itemset]
+        )
+
+
+def test_projection_keeps_utilities_and_tightens_TWUs():
+    rng = random.Random(22)
+    db = []
+    for _ in range(300):
+        items = sorted(rng.sample(range(1, 9), rng.randint(1, 5)))
+        utils = [rng.randint(1, 20) for _ in items]
+        db.append((items, sum(utils) + rng.randint(0, 10), utils))
+    vertical_db = VerticalDB(db)
+
+    kept = {1, 2, 4, 7}
+    projected_db = vertical_db.project(kept, 2)
+    projected = {}
+    for items, _, utils in db:
+        projected_items = tuple([item for item in items if item in kept])
+        if len(projected_items) >= 2:
+            item_utils = [util for item, util in zip(items, utils) if item in kept]
+            previous = projected.get(projected_items, [0] * len(item_utils))
+            projected[projected_items] = [a + b for a, b in zip(previous, item_utils)]
+    # the transactions left with the same items are merged
+    assert len(projected_db.transac_utils) == len(projected)
+    assert sorted(projected_db.transac_utils) == sorted(map(sum, projected.values()))
+    assert set(projected_db.item_utils) == kept
+
+    # itemsets of at least min_length projected items keep their utilities, and the TWU of
+    # an itemset bounds the utility of its supersets in the dataset, and gets tighter
+    for itemset in [(1, 2), (2, 4, 7), (1, 4)]:
+        bitmap = vertical_db.tids(itemset)
+        projected_bitmap = projected_db.tids(itemset)
+        assert projected_db.utility(itemset, projected_bitmap) == vertical_db.utility(
+            itemset, bitmap
+        )
+        projected_TWU = projected_db.TWU(projected_bitmap)
+        assert projected_TWU <= vertical_db.TWU(bitmap)
+        for item in kept.difference(itemset):
+            superset = tuple(sorted(itemset + (item,)))
+            assert vertical_db.utility(superset, vertical_db.tids(superset)) <= projected_TWU
+
+    # a projection that changes no transaction is the dataset itself
+    distinct_db = VerticalDB([([1, 2], 5, [2, 3]), ([2], 4, [4])])
+    assert distinct_db.project({1, 2}, 1) is distinct_db
+
+
+def test_itemset_generation_joins_prefixes_and_prunes_subsets():
+    two_phase = TwoPhase(None, None, 30)
+    # the 2-itemsets that start with 1 are joined, and a joined 3-itemset is kept only if
+    # its 2-subset without 1 is a candidate too
+    k_itemsets = two_phase.itemset_generation([[1, 2], [1, 3], [1, 5], [3, 4], [2, 5], [1, 4]])
+    assert sorted(k_itemsets) == [[1, 2, 5], [1, 3, 4]]
+    assert two_phase.prune_count == 4
+    assert two_phase.itemset_generation([[1, 2, 3], [1, 2, 4], [2, 3, 4]]) == []
+    assert two_phase.itemset_generation([[1, 2, 3], [1, 2, 4], [1, 3, 4], [2, 3, 4]]) == [
+        [1, 2, 3, 4]
+    ]